@@ -0,0 +1,65 @@
+import os
+import sys
+
+# Add the project's root directory to the PYTHONPATH
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+sys.path.append(project_root)
+from src.utils import create_table_query, quote_identifier
+from src.components.schemas import (
+    AGG_PLAYER_SEASON_COLUMNS, AGG_PLAYER_SEASON_GRAIN, AGG_PLAYER_SEASON_INDEXES,
+    AGG_PLAYER_SEASON_MEASURES, AGG_PLAYER_SEASON_PRIMARY_KEY,
+)
+
+
+def player_season_aggregate_query(source_table: str, aggregate_table: str, filtered: bool) -> str:
+    """
+    INSERT ... SELECT that aggregates the staged gameweeks to the player-season grain. With
+    `filtered` it takes the seasons to aggregate as its one parameter.
+    """
+    grain = ", ".join(quote_identifier(column) for column in AGG_PLAYER_SEASON_GRAIN)
+    columns = grain + ", " + ", ".join(quote_identifier(column) for column in AGG_PLAYER_SEASON_MEASURES)
+    measures = ", ".join(AGG_PLAYER_SEASON_MEASURES.values())
+    where = " WHERE season = ANY(%s)" if filtered else ""
+    return (
+        f"INSERT INTO {aggregate_table} ({columns}) "
+        f"SELECT {grain}, {measures} FROM {source_table}{where} GROUP BY {grain};"
+    )
+
+
+def refresh_player_season_aggregates(cursor, source_table: str, aggregate_table: str, seasons: list = None) -> int:
+    """
+    Recompute the player-season aggregates of `seasons` (every season when None) from
+    `source_table` and return the number of aggregate rows written. The old rows of those
+    seasons are replaced in the caller's transaction, so readers never see a partial refresh.
+    """
+    cursor.execute(create_table_query(aggregate_table, AGG_PLAYER_SEASON_COLUMNS, AGG_PLAYER_SEASON_PRIMARY_KEY))
+    for index_name, columns in AGG_PLAYER_SEASON_INDEXES.items():
+        column_list = ", ".join(quote_identifier(column) for column in columns)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {aggregate_table}_{index_name}_idx ON {aggregate_table} ({column_list});")
+
+    if seasons is None:
+        cursor.execute(f"TRUNCATE TABLE {aggregate_table};")
+        cursor.execute(player_season_aggregate_query(source_table, aggregate_table, filtered=False))
+    else:
+        if not seasons:
+            return 0
+        cursor.execute(f"DELETE FROM {aggregate_table} WHERE season = ANY(%s);", (list(seasons),))
+        cursor.execute(player_season_aggregate_query(source_table, aggregate_table, filtered=True), (list(seasons),))
+    row_count = cursor.rowcount
+    print(f"Refreshed '{aggregate_table}' for {'all seasons' if seasons is None else ', '.join(seasons)} ({row_count} rows).")
+    return row_count
+
+
+if __name__ == "__main__":
+    # Full refresh, e.g. after `dbt run` when the fact model is materialized as a table
+    from src.utils import postgres_connection, record_ingestion_run
+    from src.components.data_ingestion_gameweeks import DataIngestionConfig
+
+    config = DataIngestionConfig()
+    with postgres_connection(
+        config.postgres_database, config.postgres_host, config.postgres_user, config.postgres_password, config.postgres_port
+    ) as conn, conn.cursor() as cursor:
+        row_count = refresh_player_season_aggregates(cursor, config.aggregate_source, config.aggregate_table_name)
+        # bumps the dashboard's data version like an ingestion run
+        record_ingestion_run(cursor, config.postgres_table_name, row_count)
+        conn.commit()
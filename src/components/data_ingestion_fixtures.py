@@ -1,107 +1,127 @@
 import os
 import sys
 import pandas as pd
-from dotenv import load_dotenv
+import polars as pl
 from dataclasses import dataclass
-from sqlalchemy import create_engine
-from great_expectations.dataset import Dataset
 
 # Add the project's root directory to the PYTHONPATH
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
 sys.path.append(project_root)
-from src.utils import connect_to_minio, fetch_all_from_minio, connect_to_postgres, query_postgres
+from src.utils import connect_to_minio, fetch_all_from_minio, list_minio_objects, coerce_columns, derive_season
+from src.components.ingestion import IngestionConfig, StagingIngestion
+from src.components.pipeline import Pipeline, Stage
+from src.components.validation import FIXTURE_RULES
+from src.components.teams import TeamIndex, load_team_index, season_from_filename
+from src.components.schemas import (
+    FIXTURE_COLUMN_TYPES, STG_FIXTURES_COLUMNS, STG_FIXTURES_NATURAL_KEY, STG_FIXTURES_PRIMARY_KEY,
+    STG_FIXTURES_INDEXES, FIXTURE_RENAMES, SQL_COLUMN_TYPES,
+)
 
 
-# Load environment variables
-load_dotenv()
+# Raw fixture columns that the transform uses; the bulky 'stats' column is never parsed
+RAW_FIXTURE_COLUMNS = {
+    'code', 'event', 'finished', 'finished_provisional', 'id', 'kickoff_time', 'minutes',
+    'provisional_start_time', 'started', 'team_a', 'team_a_score', 'team_h', 'team_h_score',
+    'team_h_difficulty', 'team_a_difficulty', 'pulse_id',
+}
+
+# Type of every raw fixture column, for the Polars scan where each file is typed on its own
+RAW_FIXTURE_COLUMN_TYPES = {
+    column: SQL_COLUMN_TYPES[STG_FIXTURES_COLUMNS[FIXTURE_RENAMES.get(column, column)]]
+    for column in RAW_FIXTURE_COLUMNS
+}
+# Team id column -> team name column added by the transform
+TEAM_NAME_COLUMNS = {'team_h': 'team_h_name', 'team_a': 'team_a_name'}
 
 @dataclass
-class DataIngestionConfig:
-    postgres_database: str = os.getenv('PG_DATABASE')
-    postgres_host: str = os.getenv('PG_HOST')
-    postgres_user: str = os.getenv('PG_USER')
-    postgres_password: str = os.getenv('PG_PASSWORD')
-    postgres_port: int = os.getenv('PG_PORT')
+class DataIngestionConfig(IngestionConfig):
     postgres_table_name: str = os.getenv('PG_TABLE_NAME_FIXTURES')
-    minio_endpoint: str = os.getenv('MINIO_ENDPOINT')
-    access_key: str = os.getenv('MINIO_ACCESS_KEY')
-    secret_key: str = os.getenv('MINIO_SECRET_KEY')
-    minio_bucket_name: str = os.getenv('MINIO_BUCKET_NAME')
-
-class DataIngestion:
-    def __init__(self):
-        self.config = DataIngestionConfig()
-    
-    def _initiate_data_ingestion(self):
-        print("Entered the data ingestion component")
-        assert self.config.minio_endpoint == "minio-yokckg4o44wg40wogk0okgks.65.108.88.160.sslip.io", "Did not find the Minio endpoint"
-        assert self.config.postgres_table_name == "stg_fixtures", f"Not correct table naming (should be 'stg_fixtures', received {self.config.postgres_table_name})"
-        
-        try:
-            # fetch all data from MinIO
-            dfs = fetch_all_from_minio(
-                self.config.minio_endpoint, 
-                self.config.access_key, 
-                self.config.secret_key,
-                "fixtures"
-            )
+    teams_source: str = os.getenv('TEAMS_SOURCE', 'local')  # 'local' (src/data/teams, the teams bucket only for seasons not bundled) or 'minio' (local, overridden by the teams bucket)
 
+class DataIngestion(StagingIngestion):
+    bucket_name = "fixtures"
+    table_name = "stg_fixtures"
+    columns = STG_FIXTURES_COLUMNS
+    primary_key = STG_FIXTURES_PRIMARY_KEY
+    natural_key = STG_FIXTURES_NATURAL_KEY
+    indexes = STG_FIXTURES_INDEXES
+    raw_columns = RAW_FIXTURE_COLUMNS
+    raw_column_types = RAW_FIXTURE_COLUMN_TYPES
+    rules = FIXTURE_RULES
+    config_class = DataIngestionConfig
+
+    def _reference_buckets(self) -> tuple:
+        # with TEAMS_SOURCE=local the teams bucket is only read on demand, see `_fetch_teams`
+        return ("teams",) if self.config.teams_source == 'minio' else ()
+
+    def _fetch_teams(self, team_object_names: list, seasons: pd.Series) -> pd.DataFrame:
+        """
+        The (season, id, name) team dimension for the fixtures' `seasons`: the bundled
+        src/data/teams files, with the entries of the planned teams bucket objects taking
+        precedence when TEAMS_SOURCE=minio. With TEAMS_SOURCE=local the bucket is only read for
+        the seasons that aren't bundled (yet), so a new season's fixtures still get their team
+        names; nothing is fetched while every season is bundled.
+        """
+        team_index = load_team_index()
+        missing_seasons = None
+        if self.config.teams_source != 'minio':
+            missing_seasons = set(seasons.dropna().astype(str)) - set(team_index.teams_df['season'])
+            if not missing_seasons:
+                return team_index.teams_df
+            team_object_names = self._team_objects_for_seasons(missing_seasons)
+            if not team_object_names:
+                return team_index.teams_df  # `_check_team_seasons` reports the missing seasons
+
+        try:
             # fetch teams data for mapping
-            teams_dfs = fetch_all_from_minio(
+            fetched = fetch_all_from_minio(
                 self.config.minio_endpoint, 
                 self.config.access_key, 
                 self.config.secret_key,
-                "teams"
+                "teams",
+                max_workers=self.config.minio_max_workers,
+                object_names=team_object_names,
+                return_errors=True,
             )
+            if fetched is None or len(fetched[0]) == 0:
+                raise Exception("No data fetched from bucket 'teams'. Check if the bucket exists and contains objects.")
+            teams_dfs, errors = fetched
+            if errors:
+                raise Exception(f"Failed to fetch {len(errors)} of {len(team_object_names)} objects from bucket 'teams': {', '.join(sorted(errors))}")
 
-            if dfs is None or len(dfs) == 0:
-                raise Exception(f"No data fetched from bucket '{self.config.minio_bucket_name}'. Check if the bucket exists and contains objects.")
-            
-            print(f"Number of dataframes fetched: {len(dfs)}")
-            for key, df in dfs.items():
-                print(f"Dataframe {key} shape: {df.shape}")
-
-            combined_df = pd.concat(dfs.values(), ignore_index=True)
             combined_teams_df = pd.concat(teams_dfs.values(), ignore_index=True)
-            print(f"Combined fixtures dataframe shape: {combined_df.shape}")
             print(f"Combined teams dataframe shape: {combined_teams_df.shape}")
-            return combined_df, combined_teams_df
+            if missing_seasons is not None:
+                combined_teams_df = combined_teams_df[combined_teams_df['season'].astype(str).isin(missing_seasons)]
+                print(f"Using the teams bucket for seasons without bundled teams: {', '.join(sorted(missing_seasons))}")
+            return team_index.updated(combined_teams_df).teams_df
         except Exception as e:
             raise Exception(f"Error during data ingestion: {e}")
+
+    def _team_objects_for_seasons(self, seasons: set) -> list:
+        """
+        The teams bucket objects that may hold `seasons`: those named like the bundled files
+        (teams_2025_26.csv) for one of them, plus any object whose name has no season.
+        """
+        client = connect_to_minio(self.config.minio_endpoint, self.config.access_key, self.config.secret_key)
+        if client is None:
+            raise Exception("Failed to connect to MinIO")
+
+        object_names = []
+        for object_name in list_minio_objects(client, "teams"):
+            try:
+                season = season_from_filename(object_name)
+            except ValueError:
+                season = None
+            if season is None or season in seasons:
+                object_names.append(object_name)
+        return object_names
     
-    def _transform_and_dedupe_data(self, df: pd.DataFrame, teams_df: pd.DataFrame) -> pd.DataFrame:
+    def _transform_and_dedupe_data(self, df: pd.DataFrame) -> pd.DataFrame:
         print("Transforming and deduplicating data...")
         try:
-            # Define the columns and their corresponding transformations
-            columns_to_transform = {
-                'event': 'int',
-                'id': 'int',
-                'kickoff_time': 'datetime',
-                'minutes': 'int',
-                'team_a': 'int',
-                'team_a_score': 'float',
-                'team_h': 'int',
-                'team_h_score': 'float',
-                'team_h_difficulty': 'int',
-                'team_a_difficulty': 'int',
-                'pulse_id': 'int'
-            }
-
-            # Apply transformations
-            for column, dtype in columns_to_transform.items():
-                if column in df.columns:
-                    if dtype == 'int':
-                        df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
-                    elif dtype == 'float':
-                        df[column] = pd.to_numeric(df[column], errors='coerce')
-                    elif dtype == 'datetime':
-                        df[column] = pd.to_datetime(df[column], errors='coerce')
-
-            # Convert boolean columns
-            boolean_columns = ['finished', 'finished_provisional', 'started']
-            for column in boolean_columns:
-                if column in df.columns:
-                    df[column] = df[column].astype(bool)
+            # Coerce column types (a no-op for columns already typed, e.g. read from Parquet)
+            df = coerce_columns(df, FIXTURE_COLUMN_TYPES)
 
             # Determine the deduplication key
             if 'pulse_id' in df.columns and 'code' in df.columns:
@@ -118,122 +138,85 @@ class DataIngestion:
             if 'stats' in df.columns:
                 df = df.drop(columns=['stats'])
             
-            # add season column
-            def determine_season(date):
-                year = date.year
-                if date.month >= 7:  # July or later
-                    return f"{year}-{str(year + 1)[-2:]}"
-                else:  # Before July
-                    return f"{year - 1}-{str(year)[-2:]}"
-            
-            df['season'] = df['kickoff_time'].apply(determine_season)
+            # add season column; rows without a kickoff time get no season
+            df['season'] = derive_season(df['kickoff_time'], self.config.season_cutover_month)
 
             # rename columns
-            df.rename(columns={
-                'event': 'gameweek',
-                'id': 'seasonal_fixture_id'
-            }, inplace=True)
-            
-            # Map team names
-            teams_df = teams_df[['id', 'name', 'season']]
-            df = df.merge(teams_df, left_on=['team_h', 'season'], right_on=['id', 'season'], how='left')
-            df = df.rename(columns={'name': 'team_h_name'})
-            df = df.drop(columns=['id'])
-            
-            df = df.merge(teams_df, left_on=['team_a', 'season'], right_on=['id', 'season'], how='left')
-            df = df.rename(columns={'name': 'team_a_name'})
-            df = df.drop(columns=['id'])
-            
+            df.rename(columns=FIXTURE_RENAMES, inplace=True)
             return df
         except Exception as e:
             raise Exception(f"Error transforming data: {e}")
     
-    def _create_table_if_not_exists(self, cursor, table_name: str):
+    def _transform_and_dedupe_lazy(self, lf: pl.LazyFrame) -> pd.DataFrame:
         """
-        Create the target table in PostgreSQL if it doesn't already exist.
+        Polars implementation of `_transform_and_dedupe_data`, used with TRANSFORM_ENGINE=polars.
+        The transform is a single lazy plan over the scans, collected once on Polars' thread
+        pool, and returns the same columns as the pandas path.
         """
-        create_table_query = f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                fixture_id SERIAL PRIMARY KEY,
-                seasonal_fixture_id INTEGER,
-                code INTEGER,
-                gameweek INTEGER,
-                season TEXT,
-                finished BOOLEAN,
-                finished_provisional BOOLEAN,
-                kickoff_time TIMESTAMP,
-                minutes INTEGER,
-                provisional_start_time BOOLEAN,
-                started BOOLEAN,
-                team_a INTEGER,
-                team_a_name TEXT,
-                team_a_score FLOAT,
-                team_h INTEGER,
-                team_h_name TEXT,
-                team_h_score FLOAT,
-                team_h_difficulty INTEGER,
-                team_a_difficulty INTEGER,
-                pulse_id INTEGER
-            );
+        print("Transforming and deduplicating data...")
+        try:
+            columns = lf.collect_schema().names()
+            if 'pulse_id' in columns and 'code' in columns:
+                dedup_key = ['pulse_id', 'code']
+            elif 'code' in columns:
+                dedup_key = ['code']
+            else:
+                raise ValueError("Neither 'pulse_id' and 'code' nor 'code' alone found in the dataframe")
+
+            lf = (
+                lf
+                .unique(subset=dedup_key, keep='last', maintain_order=True)
+                .drop('stats', strict=False)
+                .with_columns(derive_season(pl.col('kickoff_time'), self.config.season_cutover_month))
+                .rename(FIXTURE_RENAMES, strict=False)
+            )
+            return lf.collect().to_pandas()
+        except Exception as e:
+            raise Exception(f"Error transforming data: {e}")
+
+    def _assign_team_names(self, df: pd.DataFrame, teams_df: pd.DataFrame) -> pd.DataFrame:
         """
-        query_postgres(cursor, create_table_query)
-        print(f"Table '{table_name}' created or verified.")
-    
-    def _validate_data(self, df: pd.DataFrame):
+        Add the home and away team names of the transformed fixtures, renumbering the rows like
+        the merges this replaced did. Fails for a season without teams.
         """
-        Validate the data using Great Expectations.
+        _check_team_seasons(df['season'], teams_df)
+        return TeamIndex(teams_df).assign_names(df.reset_index(drop=True), TEAM_NAME_COLUMNS)
+
+    def _validate_data(self, df: pd.DataFrame, teams_df: pd.DataFrame) -> pd.DataFrame:
         """
-        dataset = Dataset(df)
-        dataset.expect_column_values_to_be_unique(column='fixture_id')
-        dataset.expect_column_values_to_be_unique(column='gameweek')
-        dataset.expect_column_values_to_be_unique(column='season')
-        dataset.expect_column_values_to_be_unique(column='fixture')
-        # TODO - in progress
-    
-    def ingest_data(self):
+        Check the transformed data against `FIXTURE_RULES`, with the team ids checked against
+        the teams data (see `StagingIngestion._validate_data`).
         """
-        Main method to fetch, transform, deduplicate, and ingest data into PostgreSQL.
+        return super()._validate_data(df, references={'teams': teams_df})
+
+    def build_pipeline(self) -> Pipeline:
         """
-        conn = None
-        cursor = None
-        try:
-            # Fetch and transform data
-            df, teams_df = self._initiate_data_ingestion()  # Fetch all data
-            transformed_df = self._transform_and_dedupe_data(df, teams_df)  # Transform and deduplicate data
-            
-            # Connect to PostgreSQL using your utility function
-            conn = connect_to_postgres(
-                self.config.postgres_database, 
-                self.config.postgres_host, 
-                self.config.postgres_user, 
-                self.config.postgres_password, 
-                self.config.postgres_port
-            )
-            cursor = conn.cursor()  # Create a cursor from the connection object
-            
-            # Create table if it doesn't exist
-            self._create_table_if_not_exists(cursor, self.config.postgres_table_name)
-            
-            # Truncate the table to perform a full refresh
-            truncate_query = f"TRUNCATE TABLE {self.config.postgres_table_name};"
-            cursor.execute(truncate_query)
-            conn.commit()  # Commit the transaction after truncation
-            print(f"Table '{self.config.postgres_table_name}' truncated for a full refresh.")
-            
-            # Insert the transformed data into the table after truncation
-            engine = create_engine(f'postgresql://{self.config.postgres_user}:{self.config.postgres_password}@{self.config.postgres_host}:{self.config.postgres_port}/{self.config.postgres_database}')
-            transformed_df.to_sql(self.config.postgres_table_name, engine, if_exists='append', index=False)
-            print(f"Data successfully ingested into '{self.config.postgres_table_name}' table with a full refresh.")
-            
-        except Exception as e:
-            raise Exception(f"Error during data ingestion: {e}")
-        
-        finally:
-            # Ensure the cursor and connection are closed properly
-            if cursor is not None:
-                cursor.close()
-            if conn is not None:
-                conn.close()
+        Declare the ingestion stages: plan -> fetch -> transform -> fetch teams -> assign team
+        names -> validate -> load (see `StagingIngestion._transform_stages`). The teams are
+        fetched after the transform, for the seasons it found.
+        """
+        stages = [
+            Stage('plan', self._plan, cache=False, fingerprint_output=True),
+            *self._transform_stages(),
+            # also the validation's reference data
+            Stage('fetch_teams', lambda planned, df: self._fetch_teams(list(planned.get('teams', {})), df['season']),
+                  inputs=('plan', 'transform'), cache=False),
+            Stage('assign_names', self._assign_team_names, inputs=('transform', 'fetch_teams'), cache=False),
+            Stage('validate', self._validate_data, inputs=('assign_names', 'fetch_teams'), cache=False),
+            Stage('load', lambda df: self._load_to_postgres([df]), inputs=('validate',), cache=False),
+        ]
+        return Pipeline(self.config.postgres_table_name, stages, self.config.pipeline_cache_dir)
+
+
+def _check_team_seasons(seasons: pd.Series, teams_df: pd.DataFrame):
+    # without teams for a season every fixture of it would fail validation for a missing name
+    missing = sorted(set(seasons.dropna().astype(str)) - set(teams_df['season'].astype(str)))
+    if missing:
+        raise ValueError(
+            f"No teams for season(s) {', '.join(missing)}: add src/data/teams/teams_<season>.csv "
+            f"or the season's teams to the MinIO teams bucket"
+        )
+
 
 if __name__ == "__main__":
     obj = DataIngestion()
@@ -1,61 +1,140 @@
 import os
 import sys
+import numpy as np
 import pandas as pd
-from dotenv import load_dotenv
+import polars as pl
 from dataclasses import dataclass
-from sqlalchemy import create_engine
-from great_expectations.dataset import Dataset
 
 # Add the project's root directory to the PYTHONPATH
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
 sys.path.append(project_root)
-from src.utils import connect_to_minio, fetch_all_from_minio, connect_to_postgres, query_postgres
+from src.utils import coerce_columns, derive_season, get_minio_client, read_object_from_minio, compact_dtypes, get_default_cache
+from src.components.ingestion import IngestionConfig, StagingIngestion
+from src.components.pipeline import Pipeline, Stage
+from src.components.validation import GAMEWEEK_RULES
+from src.components.aggregates import refresh_player_season_aggregates
+from src.components.schemas import (
+    GAMEWEEK_COLUMN_TYPES, STG_GAMEWEEKS_COLUMNS, STG_GAMEWEEKS_NATURAL_KEY, STG_GAMEWEEKS_PRIMARY_KEY,
+    STG_GAMEWEEKS_INDEXES, GAMEWEEK_RENAMES, SQL_COLUMN_TYPES,
+)
 
-# TODO - refactor to use Polars
+# Raw columns of the merged gameweek files that the transform uses. Everything else (e.g. the
+# manager columns of newer seasons) is skipped while parsing instead of being dropped later.
+RAW_GAMEWEEK_COLUMNS = {
+    'name', 'position', 'team', 'xP', 'assists', 'bonus', 'bps', 'clean_sheets', 'creativity',
+    'element', 'expected_assists', 'expected_goal_involvements', 'expected_goals',
+    'expected_goals_conceded', 'fixture', 'goals_conceded', 'goals_scored', 'ict_index',
+    'influence', 'kickoff_time', 'minutes', 'own_goals', 'penalties_missed', 'penalties_saved',
+    'red_cards', 'round', 'saves', 'selected', 'starts', 'team_a_score', 'team_h_score', 'threat',
+    'total_points', 'transfers_balance', 'transfers_in', 'transfers_out', 'value', 'was_home',
+    'yellow_cards', 'GW',
+}
+
+# Text columns of the staged frame, dictionary-encoded by the dtype compaction
+GAMEWEEK_CATEGORICAL_COLUMNS = [column for column, sql_type in STG_GAMEWEEKS_COLUMNS.items() if sql_type == 'TEXT']
+
+# Dedup key of the transformed rows (the renamed 'name', 'GW', 'kickoff_time'), used across
+# chunks in streaming mode
+STREAMING_DEDUP_KEY = ('player_name', 'gameweek', 'kickoff_time')
+
+# Type of every raw column that reaches the staging table. The Polars scan types each file on
+# its own, so unlike pandas' schema inference every column needs an explicit type.
+RAW_GAMEWEEK_COLUMN_TYPES = {
+    column: SQL_COLUMN_TYPES[STG_GAMEWEEKS_COLUMNS[GAMEWEEK_RENAMES.get(column, column)]]
+    for column in RAW_GAMEWEEK_COLUMNS
+    if GAMEWEEK_RENAMES.get(column, column) in STG_GAMEWEEKS_COLUMNS
+}
+
+FIXTURE_KEYS = ['kickoff_time', 'seasonal_fixture_id']
+
+
+def resolve_opponent_teams(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add an 'opponent_team' column: the other team in the row's fixture, identified by
+    ('kickoff_time', 'seasonal_fixture_id').
+
+    The teams of each fixture are looked up once per fixture instead of per row. A fixture
+    that doesn't have exactly two teams (incomplete data) gets None. Like the groupby it
+    replaces, rows with a missing fixture key are dropped and rows come out ordered by
+    fixture key, keeping their original order within a fixture.
+    """
+    df = df.dropna(subset=FIXTURE_KEYS).sort_values(FIXTURE_KEYS, kind='stable')
+
+    # distinct teams per fixture, in order of first appearance
+    fixture_teams = df[FIXTURE_KEYS + ['team']].drop_duplicates()
+    grouped = fixture_teams.groupby(FIXTURE_KEYS, sort=False)
+    fixture_teams = fixture_teams.assign(
+        position=grouped.cumcount().to_numpy(),
+        team_count=grouped['team'].transform('size').to_numpy(),
+    )
+    complete = fixture_teams[fixture_teams['team_count'] == 2].set_index(FIXTURE_KEYS)
+    first_team = complete.loc[complete['position'] == 0, 'team']
+    second_team = complete.loc[complete['position'] == 1, 'team']
+
+    # broadcast the team pair back onto the rows
+    row_fixtures = pd.MultiIndex.from_frame(df[FIXTURE_KEYS])
+    has_pair = first_team.index.get_indexer(row_fixtures) >= 0
+    row_first_team = first_team.reindex(row_fixtures).to_numpy(dtype=object)
+    row_second_team = second_team.reindex(row_fixtures).to_numpy(dtype=object)
+
+    teams = df['team'].to_numpy(dtype=object)
+    opponent_team = np.where(teams == row_first_team, row_second_team, row_first_team)
+    df['opponent_team'] = pd.Series(np.where(has_pair, opponent_team, None), index=df.index, dtype=object)
+    return df
 
-# Load environment variables
-load_dotenv()
 
 @dataclass
-class DataIngestionConfig:
-    postgres_database: str = os.getenv('PG_DATABASE')
-    postgres_host: str = os.getenv('PG_HOST')
-    postgres_user: str = os.getenv('PG_USER')
-    postgres_password: str = os.getenv('PG_PASSWORD')
-    postgres_port: int = os.getenv('PG_PORT')
+class DataIngestionConfig(IngestionConfig):
     postgres_table_name: str = os.getenv('PG_TABLE_NAME_GW')
-    minio_endpoint: str = os.getenv('MINIO_ENDPOINT')
-    access_key: str = os.getenv('MINIO_ACCESS_KEY')
-    secret_key: str = os.getenv('MINIO_SECRET_KEY')
-    minio_bucket_name: str = os.getenv('MINIO_BUCKET_NAME')
-
-class DataIngestion:
-    def __init__(self):
-        self.config = DataIngestionConfig()
-    
-    def _initiate_data_ingestion(self):
-        print("Entered the data ingestion component")
-        assert self.config.minio_endpoint == "minio-yokckg4o44wg40wogk0okgks.65.108.88.160.sslip.io", "Did not find the Minio endpoint"
-        assert self.config.postgres_table_name == "stg_gameweeks", f"Not correct table naming (should be 'stg_gameweeks', received {self.config.postgres_table_name})"
-        
-        try:
-            # Fetch all data from MinIO
-            dfs = fetch_all_from_minio(
-                endpoint=self.config.minio_endpoint, 
-                access_key=self.config.access_key, 
-                secret_key=self.config.secret_key,
-                bucket_name="gameweeks",
+    streaming: bool = os.getenv('INGESTION_STREAMING', 'false').lower() == 'true'  # one object at a time, pandas transform
+    compact_dtypes: bool = os.getenv('COMPACT_DTYPES', 'true').lower() == 'true'
+    aggregate_table_name: str = os.getenv('PG_TABLE_NAME_AGG', 'agg_player_season')  # empty disables the refresh
+    aggregate_source: str = os.getenv('PG_AGG_SOURCE', 'dbt_ohempel.fact_player_performance')  # the dbt model the dashboard read before
+
+class DataIngestion(StagingIngestion):
+    bucket_name = "gameweeks"
+    table_name = "stg_gameweeks"
+    columns = STG_GAMEWEEKS_COLUMNS
+    primary_key = STG_GAMEWEEKS_PRIMARY_KEY
+    natural_key = STG_GAMEWEEKS_NATURAL_KEY
+    indexes = STG_GAMEWEEKS_INDEXES
+    raw_columns = RAW_GAMEWEEK_COLUMNS
+    raw_column_types = RAW_GAMEWEEK_COLUMN_TYPES
+    rules = GAMEWEEK_RULES
+    config_class = DataIngestionConfig
+
+    def _stream_transformed_chunks(self, object_names: list):
+        """
+        Streaming mode: fetch, transform and dedupe one object at a time and yield each
+        transformed chunk, so only one object is held in memory.
+
+        The batch path keeps the last of duplicate rows across all objects. Objects are therefore
+        processed newest first and a row is dropped if a later object already produced its key;
+        only the 64-bit hashes of the seen keys are kept between chunks. Each object is assumed
+        to hold whole fixtures (the merged gameweek files hold one season each), since opponent
+        teams are resolved per chunk.
+        """
+        client = get_minio_client(self.config.minio_endpoint, self.config.access_key, self.config.secret_key)
+        if client is None:
+            raise Exception("Failed to connect to MinIO")
+
+        objects = self._current_manifest.get(self.bucket_name, {})
+        cache = get_default_cache()
+        seen_keys = np.empty(0, dtype=np.uint64)
+        for object_name in reversed(object_names):
+            df = read_object_from_minio(
+                client, self.bucket_name, object_name, etag=objects.get(object_name, {}).get('etag'), cache=cache,
+                usecols=RAW_GAMEWEEK_COLUMNS.__contains__,
             )
+            df = self._transform_and_dedupe_data(df)
+
+            keys = pd.util.hash_pandas_object(df[list(STREAMING_DEDUP_KEY)], index=False).to_numpy()
+            df = df[~np.isin(keys, seen_keys)]
+            seen_keys = np.union1d(seen_keys, keys)
+
+            print(f"Streamed '{object_name}': {len(df)} rows after deduplication.")
+            yield self._compact(df)
 
-            if dfs is None or len(dfs) == 0:
-                raise Exception(f"No data fetched from bucket '{self.config.minio_bucket_name}'. Check if the bucket exists and contains objects.")
-            
-            combined_df = pd.concat(dfs.values(), ignore_index=True)
-            print(f"Combined data: {combined_df.head(5)}")
-            return combined_df
-        except Exception as e:
-            raise Exception(f"Error during data ingestion: {e}")
-    
     def _transform_and_dedupe_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Transform the data as needed and remove duplicates.
@@ -63,31 +142,8 @@ class DataIngestion:
 
         print("Transforming and deduplicating data...")
         try:
-            # Define the columns and their corresponding transformations
-            columns_to_transform = {
-                'xP': 'numeric',
-                'creativity': 'numeric',
-                'expected_assists': 'numeric',
-                'expected_goal_involvements': 'numeric',
-                'expected_goals': 'numeric',
-                'expected_goals_conceded': 'numeric',
-                'ict_index': 'numeric',
-                'influence': 'numeric',
-                'threat': 'numeric',
-                'value': 'numeric',
-                'kickoff_time': 'datetime',
-                'was_home': 'boolean',
-            }
-
-            # Apply transformations only if the column exists in the dataframe
-            for column, dtype in columns_to_transform.items():
-                if column in df.columns:
-                    if dtype == 'numeric':
-                        df[column] = pd.to_numeric(df[column], errors='coerce')
-                    elif dtype == 'boolean':
-                        df[column] = df[column].astype(bool)
-                    elif dtype == 'datetime':
-                        df[column] = pd.to_datetime(df[column], errors='coerce')
+            # Coerce column types (a no-op for columns already typed, e.g. read from Parquet)
+            df = coerce_columns(df, GAMEWEEK_COLUMN_TYPES)
 
             # Remove duplicates based on 'name', 'GW', and 'kickoff_time'
             if 'name' in df.columns and 'GW' in df.columns and 'kickoff_time' in df.columns:
@@ -95,41 +151,17 @@ class DataIngestion:
             else:
                 print("Warning: 'name', 'GW', or 'kickoff_time' column missing. Deduplication skipped.")
 
-            # add season column
-            def _determine_season(date):
-                year = date.year
-                month = date.month
-                if month >= 7:  # July or later # THIS MIGHT CAUSE DUPLICATES IN SEASONAL ID AND SEASON - CHECK
-                    return f"{year}-{str(year + 1)[-2:]}"
-                else:  # Before July
-                    return f"{year-1}-{str(year)[-2:]}"
-            
-            df.loc[:, 'season'] = df['kickoff_time'].apply(_determine_season)
+            # add season column; rows without a kickoff time get no season
+            df['season'] = derive_season(df['kickoff_time'], self.config.season_cutover_month)
 
             # rename columns
-            df.rename(columns={
-                'GW': 'gameweek',
-                'name': 'player_name',
-                'minutes': 'minutes_played',
-                'value': 'player_cost',
-                'starts': 'player_started',
-                'fixture': 'seasonal_fixture_id'
-            }, inplace=True)
+            df.rename(columns=GAMEWEEK_RENAMES, inplace=True)
 
             # drop unnecessary columns
             df.drop(['round'], axis=1, inplace=True)
 
-            # Identify the opponent team by using the groupby operation on 'kickoff_time' and 'fixture'
-            def identify_opponent_team(group):
-                # There should be exactly two teams in each group
-                if len(group['team'].unique()) == 2:
-                    # The opponent team is the one that is not the current team
-                    group['opponent_team'] = group['team'].apply(lambda x: group['team'].unique()[1] if x == group['team'].unique()[0] else group['team'].unique()[0])
-                else:
-                    group['opponent_team'] = None  # Handle cases where data might be incomplete
-                return group
-
-            df = df.groupby(['kickoff_time', 'seasonal_fixture_id'], group_keys=False).apply(identify_opponent_team)
+            # Identify the opponent team of every row from the teams playing in its fixture
+            df = resolve_opponent_teams(df)
             
             # Convert player_started to boolean
             if 'player_started' in df.columns:
@@ -156,115 +188,101 @@ class DataIngestion:
         except Exception as e:
             raise Exception(f"Error transforming data: {e}")
     
-    def _create_table_if_not_exists(self, cursor, table_name: str):
+    def _transform_and_dedupe_lazy(self, lf: pl.LazyFrame) -> pd.DataFrame:
         """
-        Create the target table in PostgreSQL if it doesn't already exist.
+        Polars implementation of `_transform_and_dedupe_data`, used with TRANSFORM_ENGINE=polars.
+        The transform is a single lazy plan over the scans, so projections and the kickoff
+        filter reach the readers, and it is collected once on Polars' thread pool. Returns the
+        same columns as the pandas path.
         """
-        create_table_query = f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                player_performance_id SERIAL PRIMARY KEY,
-                player_name TEXT,
-                player_cost NUMERIC,
-                total_points INTEGER,
-                position TEXT,
-                season TEXT,
-                gameweek INTEGER,
-                seasonal_fixture_id INTEGER,
-                team TEXT,
-                opponent_team TEXT,
-                team_a_score INTEGER,
-                team_h_score INTEGER,
-                was_home BOOLEAN,
-                goals_scored INTEGER,
-                assists INTEGER,
-                bonus INTEGER,
-                bps INTEGER,
-                clean_sheets INTEGER,
-                creativity NUMERIC,
-                element INTEGER,
-                "xP" NUMERIC,
-                expected_assists NUMERIC,
-                expected_goal_involvements NUMERIC,
-                expected_goals NUMERIC,
-                expected_goals_conceded NUMERIC,
-                goals_conceded INTEGER,
-                ict_index NUMERIC,
-                influence NUMERIC,
-                kickoff_time TIMESTAMP,
-                minutes_played INTEGER,
-                own_goals INTEGER,
-                penalties_missed INTEGER,
-                penalties_saved INTEGER,
-                red_cards INTEGER,
-                saves INTEGER,
-                player_started BOOLEAN,
-                threat NUMERIC,
-                transfers_balance INTEGER,
-                transfers_in INTEGER,
-                transfers_out INTEGER,
-                selected INTEGER,
-                yellow_cards INTEGER
-            );
+        print("Transforming and deduplicating data...")
+        try:
+            lf = (
+                lf
+                # rows without a kickoff time never get an opponent and are dropped below; they only
+                # dedupe among themselves, so filtering them first lets the predicate reach the scan
+                .filter(pl.col('kickoff_time').is_not_null())
+                .unique(subset=['name', 'GW', 'kickoff_time'], keep='last', maintain_order=True)
+                .with_columns(derive_season(pl.col('kickoff_time'), self.config.season_cutover_month))
+                .rename(GAMEWEEK_RENAMES, strict=False)
+                .drop('round', strict=False)
+                .filter(pl.all_horizontal(pl.col(FIXTURE_KEYS).is_not_null()))
+                .sort(FIXTURE_KEYS, maintain_order=True)
+            )
+
+            # the opponent is the other one of exactly two distinct teams in the fixture
+            fixture_teams = pl.col('team').unique(maintain_order=True)
+            first_team = fixture_teams.first().over(FIXTURE_KEYS)
+            second_team = fixture_teams.last().over(FIXTURE_KEYS)
+            lf = lf.with_columns(
+                pl.when(pl.col('team').n_unique().over(FIXTURE_KEYS) == 2)
+                .then(pl.when(pl.col('team') == first_team).then(second_team).otherwise(first_team))
+                .alias('opponent_team')
+            )
+
+            return lf.collect().to_pandas()
+        except Exception as e:
+            raise Exception(f"Error transforming data: {e}")
+
+    def _compact(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        query_postgres(cursor, create_table_query)
-        print(f"Table '{table_name}' created or verified.")
-    
-    def _validate_data(self, df: pd.DataFrame):
+        Compact the dtypes of the transformed frame (see `compact_dtypes`) before it is loaded
+        or handed to model code; disabled with COMPACT_DTYPES=false.
         """
-        Validate the data using Great Expectations.
+        if not self.config.compact_dtypes:
+            return df
+        return compact_dtypes(df, categorical_columns=GAMEWEEK_CATEGORICAL_COLUMNS)
+
+    def _after_load(self, cursor, loaded_seasons: list):
+        if self.config.aggregate_table_name:
+            self._refresh_aggregates(cursor, loaded_seasons)
+
+    def _refresh_aggregates(self, cursor, loaded_seasons: list):
         """
-        dataset = Dataset(df)
-        dataset.expect_column_values_to_be_unique(column='player_performance_id')
-        dataset.expect_column_values_to_be_unique(column='gameweek')
-        dataset.expect_column_values_to_be_unique(column='season')
-        dataset.expect_column_values_to_be_unique(column='fixture')
-        # TODO - in progress
-    
-    def ingest_data(self):
+        Rebuild the player-season aggregates from `aggregate_source`, the dbt fact model, so the
+        dashboard keeps the dbt cleaning: every season after a full refresh (seasons may have
+        disappeared), only the loaded ones after an incremental run or an upsert.
+
+        dbt builds the fact model as a view over this table by default, so it already shows the
+        rows just loaded.
+        The refresh runs after the load commits (in swap mode, after the swap), in a transaction
+        of its own: for that moment the dashboard still reads the previous aggregates, which
+        stay consistent as they are replaced atomically. When the fact model is materialized as
+        a table instead, run `python src/components/aggregates.py` after `dbt run`. Until the
+        fact model exists (e.g. a fresh environment before the first `dbt run`) the refresh is
+        skipped with a warning.
         """
-        Main method to fetch, transform, deduplicate, and ingest data into PostgreSQL.
+        cursor.execute("SELECT to_regclass(%s);", (self.config.aggregate_source,))
+        if cursor.fetchone()[0] is None:
+            print(f"Warning: '{self.config.aggregate_source}' does not exist (yet), skipping the refresh of '{self.config.aggregate_table_name}'.")
+            return
+        full_refresh = self.config.load_mode in ('full', 'swap') and not self._incremental_run
+        refresh_player_season_aggregates(
+            cursor,
+            self.config.aggregate_source,
+            self.config.aggregate_table_name,
+            None if full_refresh else loaded_seasons,
+        )
+
+    def _transform_params(self) -> dict:
+        return {**super()._transform_params(), 'compact_dtypes': self.config.compact_dtypes}
+
+    def build_pipeline(self) -> Pipeline:
         """
-        conn = None
-        cursor = None
-        try:
-            # Fetch and transform data
-            df = self._initiate_data_ingestion()  # Fetch all data
-            transformed_df = self._transform_and_dedupe_data(df)  # Transform and deduplicate data
-            
-            # Connect to PostgreSQL using your utility function
-            conn = connect_to_postgres(
-                self.config.postgres_database, 
-                self.config.postgres_host, 
-                self.config.postgres_user, 
-                self.config.postgres_password, 
-                self.config.postgres_port
-            )
-            cursor = conn.cursor()  # Create a cursor from the connection object
-            
-            # Create table if it doesn't exist
-            self._create_table_if_not_exists(cursor, self.config.postgres_table_name)
-            
-            # Truncate the table to perform a full refresh
-            truncate_query = f"TRUNCATE TABLE {self.config.postgres_table_name};"
-            cursor.execute(truncate_query)
-            conn.commit()  # Commit the transaction after truncation
-            print(f"Table '{self.config.postgres_table_name}' truncated for a full refresh.")
-            
-            # Insert the transformed data into the table after truncation
-            engine = create_engine(f'postgresql://{self.config.postgres_user}:{self.config.postgres_password}@{self.config.postgres_host}:{self.config.postgres_port}/{self.config.postgres_database}')
-            transformed_df.to_sql(self.config.postgres_table_name, engine, if_exists='append', index=False)
-            print(f"Data successfully ingested into '{self.config.postgres_table_name}' table with a full refresh.")
-            
-        except Exception as e:
-            raise Exception(f"Error during data ingestion: {e}")
-        
-        finally:
-            # Ensure the cursor and connection are closed properly
-            if cursor is not None:
-                cursor.close()
-            if conn is not None:
-                conn.close()
+        Declare the ingestion stages (see `StagingIngestion.build_pipeline`); streaming mode
+        fetches, transforms, validates and loads object by object inside the load stage.
+        """
+        if not self.config.streaming:
+            return super().build_pipeline()
+        stages = [
+            Stage('plan', self._plan, cache=False, fingerprint_output=True),
+            Stage('load', lambda planned: self._load_to_postgres(
+                self._validate_data(chunk) for chunk in self._stream_transformed_chunks(list(planned[self.bucket_name]))),
+                  inputs=('plan',), cache=False),
+        ]
+        return Pipeline(self.config.postgres_table_name, stages, self.config.pipeline_cache_dir)
+
 
 if __name__ == "__main__":
     obj = DataIngestion()
-    obj.ingest_data()
\ No newline at end of file
+    obj.ingest_data()
@@ -0,0 +1,437 @@
+import os
+import sys
+import pandas as pd
+import polars as pl
+from dotenv import load_dotenv
+from dataclasses import dataclass
+
+# Add the project's root directory to the PYTHONPATH
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+sys.path.append(project_root)
+from src.utils import (
+    connect_to_minio, fetch_all_from_minio, postgres_connection, query_postgres,
+    list_minio_objects, load_manifest, save_manifest, diff_manifest, coerce_columns,
+    create_partitioned_table, ensure_season_partitions, copy_dataframe_to_postgres,
+    upsert_dataframe_to_postgres, quote_identifier, swap_in_shadow_table, derive_season,
+    SEASON_CUTOVER_MONTH, scan_all_from_minio, map_partitions, fill_missing_season,
+    record_ingestion_run, create_natural_key_index,
+)
+from src.components.pipeline import Pipeline, Stage, StopPipeline
+from src.components.validation import validate
+from src.components.schemas import STG_PARTITION_COLUMN
+
+# Load environment variables
+load_dotenv()
+
+@dataclass
+class IngestionConfig:
+    """
+    Settings shared by every staging dataset. Each dataset module subclasses it as its
+    `DataIngestionConfig`, with the default of `postgres_table_name` and its own settings.
+    """
+    postgres_database: str = os.getenv('PG_DATABASE')
+    postgres_host: str = os.getenv('PG_HOST')
+    postgres_user: str = os.getenv('PG_USER')
+    postgres_password: str = os.getenv('PG_PASSWORD')
+    postgres_port: int = os.getenv('PG_PORT')
+    postgres_table_name: str = None
+    minio_endpoint: str = os.getenv('MINIO_ENDPOINT')
+    access_key: str = os.getenv('MINIO_ACCESS_KEY')
+    secret_key: str = os.getenv('MINIO_SECRET_KEY')
+    minio_bucket_name: str = os.getenv('MINIO_BUCKET_NAME')
+    minio_max_workers: int = int(os.getenv('MINIO_MAX_WORKERS', 8))
+    incremental: bool = os.getenv('INGESTION_INCREMENTAL', 'false').lower() == 'true'
+    manifest_dir: str = os.getenv('INGESTION_MANIFEST_DIR', os.path.join(project_root, 'artifacts', 'manifests'))
+    load_mode: str = os.getenv('PG_LOAD_MODE', 'full')  # 'full' (truncate + reload), 'upsert' or 'swap'
+    season_cutover_month: int = int(os.getenv('SEASON_CUTOVER_MONTH', SEASON_CUTOVER_MONTH))
+    transform_engine: str = os.getenv('TRANSFORM_ENGINE', 'pandas')  # 'pandas' or 'polars'
+    transform_workers: int = int(os.getenv('TRANSFORM_WORKERS', 1))  # season partitions in parallel, 0 = all cores
+    pipeline_cache_dir: str = os.getenv('PIPELINE_CACHE_DIR', os.path.join(project_root, 'artifacts', 'pipeline'))
+
+
+class StagingIngestion:
+    """
+    Ingests one MinIO bucket into a season-partitioned staging table: plan -> fetch ->
+    transform -> validate -> load, run as a cached `Pipeline`.
+
+    A dataset subclasses it and declares its bucket, table, columns, keys and validation
+    rules as class attributes, and implements `_transform_and_dedupe_data` (pandas) and
+    `_transform_and_dedupe_lazy` (Polars). Planning, fetching, the load modes, the shadow
+    table swap, the indexes and the run bookkeeping are shared.
+    """
+    bucket_name: str = None
+    table_name: str = None  # the expected `postgres_table_name`
+    columns: dict = None  # {column: PostgreSQL type} of the staging table
+    primary_key: str = None
+    natural_key: tuple = None
+    indexes: dict = {}
+    partition_column: str = STG_PARTITION_COLUMN
+    raw_columns: set = None  # raw columns the transform uses, the rest is skipped while parsing
+    raw_column_types: dict = None  # type of every raw column, for the Polars scan
+    rules: list = []
+    code: tuple = ('src.utils', 'src.components.schemas')  # helper modules of the cached stages, see `Stage.code`
+    config_class: type = IngestionConfig
+
+    def __init__(self, config: IngestionConfig = None):
+        self.config = config or self.config_class()
+        self.manifest_path = os.path.join(self.config.manifest_dir, f"{self.config.postgres_table_name}.json")
+        self._current_manifest = {}
+        self._incremental_run = False
+
+    def _reference_buckets(self) -> tuple:
+        """
+        Buckets fetched in full next to the main one on every run (e.g. lookup data). A change
+        to them falls back to a full refresh.
+        """
+        return ()
+
+    def _plan_fetch(self) -> dict:
+        """
+        List the dataset's buckets and decide which objects need fetching, as {bucket: object
+        names}. In incremental mode only objects of the main bucket that are new or changed
+        since the last successful run are returned; a missing manifest, a removed object or a
+        changed reference bucket falls back to a full refresh.
+        """
+        client = connect_to_minio(self.config.minio_endpoint, self.config.access_key, self.config.secret_key)
+        if client is None:
+            raise Exception("Failed to connect to MinIO")
+
+        buckets = (self.bucket_name, *self._reference_buckets())
+        self._current_manifest = {bucket: list_minio_objects(client, bucket) for bucket in buckets}
+        self._incremental_run = False
+        full_plan = {bucket: list(objects) for bucket, objects in self._current_manifest.items()}
+
+        if not self.config.incremental:
+            return full_plan
+
+        previous_manifest = load_manifest(self.manifest_path)
+        changed, removed = diff_manifest(previous_manifest.get(self.bucket_name, {}), self._current_manifest[self.bucket_name])
+        references_changed = any(
+            changed_objects or removed_objects
+            for changed_objects, removed_objects in (
+                diff_manifest(previous_manifest.get(bucket, {}), self._current_manifest[bucket]) for bucket in buckets[1:]
+            )
+        )
+        if not previous_manifest.get(self.bucket_name) or removed or references_changed:
+            print("Incremental ingestion not possible (no manifest found, or objects removed or reference data changed), running a full refresh.")
+            return full_plan
+
+        self._incremental_run = True
+        print(f"Incremental ingestion: {len(changed)} of {len(self._current_manifest[self.bucket_name])} objects are new or changed.")
+        return {**full_plan, self.bucket_name: changed}
+
+    def _plan(self) -> dict:
+        """
+        Pipeline source stage: plan the fetch and return {bucket: {object name: etag}} of the
+        objects to ingest. Its output fingerprints the run, so a changed object invalidates the
+        cached fetch and transform outputs. Stops the pipeline when an incremental run has
+        nothing to do.
+        """
+        print("Entered the data ingestion component")
+        assert self.config.minio_endpoint == "minio-yokckg4o44wg40wogk0okgks.65.108.88.160.sslip.io", "Did not find the Minio endpoint"
+        assert self.config.postgres_table_name == self.table_name, f"Not correct table naming (should be '{self.table_name}', received {self.config.postgres_table_name})"
+
+        planned = self._plan_fetch()
+        if self._incremental_run and not planned[self.bucket_name]:
+            raise StopPipeline(f"No new or changed objects since the last run, '{self.config.postgres_table_name}' is up to date.")
+        if not planned[self.bucket_name]:
+            raise Exception(f"No objects found in bucket '{self.bucket_name}'.")
+        return {
+            bucket: {object_name: self._current_manifest[bucket][object_name]['etag'] for object_name in object_names}
+            for bucket, object_names in planned.items()
+        }
+
+    def _initiate_data_ingestion(self, object_names: list) -> pd.DataFrame:
+        try:
+            # Fetch the planned objects from MinIO
+            fetched = fetch_all_from_minio(
+                endpoint=self.config.minio_endpoint,
+                access_key=self.config.access_key,
+                secret_key=self.config.secret_key,
+                bucket_name=self.bucket_name,
+                max_workers=self.config.minio_max_workers,
+                object_names=object_names,
+                usecols=self.raw_columns.__contains__,
+                return_errors=True,
+            )
+
+            if fetched is None or len(fetched[0]) == 0:
+                raise Exception(f"No data fetched from bucket '{self.bucket_name}'. Check if the bucket exists and contains objects.")
+            dfs, errors = fetched
+            if errors:
+                # a partial fetch would replace the missing objects' seasons with nothing
+                raise Exception(f"Failed to fetch {len(errors)} of {len(object_names)} objects from bucket '{self.bucket_name}': {', '.join(sorted(errors))}")
+
+            combined_df = pd.concat(dfs.values(), ignore_index=True)
+            print(f"Combined {len(dfs)} objects from bucket '{self.bucket_name}': {combined_df.shape}")
+            return combined_df
+        except Exception as e:
+            raise Exception(f"Error during data ingestion: {e}")
+
+    def _scan_data(self, object_names: list) -> pl.LazyFrame:
+        """
+        Polars counterpart of `_initiate_data_ingestion`: one lazy frame over the planned objects.
+        """
+        try:
+            lf = scan_all_from_minio(
+                endpoint=self.config.minio_endpoint,
+                access_key=self.config.access_key,
+                secret_key=self.config.secret_key,
+                bucket_name=self.bucket_name,
+                max_workers=self.config.minio_max_workers,
+                object_names=object_names,
+                columns=self.raw_columns.__contains__,
+                column_types=self.raw_column_types,
+            )
+            if lf is None:
+                raise Exception(f"No data fetched from bucket '{self.bucket_name}'. Check if the bucket exists and contains objects.")
+            return lf
+        except Exception as e:
+            raise Exception(f"Error during data ingestion: {e}")
+
+    def _transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run `_transform_and_dedupe_data`, split by season over a process pool unless
+        TRANSFORM_WORKERS is 1 (0 uses every core, e.g. for backfills). Dedup keys and fixtures
+        never span seasons, so the partitions transform independently; they are concatenated
+        in season order.
+        """
+        if self.config.transform_workers == 1:
+            return self._transform_and_dedupe_data(df)
+        df = coerce_columns(df, {'kickoff_time': 'datetime'})
+        seasons = derive_season(df['kickoff_time'], self.config.season_cutover_month)
+        return map_partitions(df, seasons, _transform_partition, type(self), self.config, max_workers=self.config.transform_workers)
+
+    def _transform_and_dedupe_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def _transform_and_dedupe_lazy(self, lf: pl.LazyFrame) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def _compact(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Last step of the transform stage, e.g. a dtype compaction; returns `df` unchanged here.
+        """
+        return df
+
+    def _create_table_if_not_exists(self, cursor, table_name: str):
+        """
+        Create the target table in PostgreSQL, partitioned by season, if it doesn't already exist.
+        An existing unpartitioned table is migrated to the partitioned layout.
+        """
+        create_partitioned_table(cursor, table_name, self.columns, self.primary_key, self.partition_column)
+        print(f"Table '{table_name}' created or verified.")
+
+    def _create_indexes(self, cursor, table_name: str):
+        """
+        Create the secondary indexes used by the dashboard's filters and, in upsert mode, the
+        unique index on the natural key that upserts conflict on (the other modes replace whole
+        seasons and don't need it). Indexes on the partitioned table cascade to every season
+        partition.
+        """
+        if self.config.load_mode == 'upsert':
+            create_natural_key_index(cursor, table_name, self.natural_key, self.primary_key)
+        for index_name, columns in self.indexes.items():
+            column_list = ", ".join(quote_identifier(column) for column in columns)
+            query_postgres(cursor, f"CREATE INDEX IF NOT EXISTS {table_name}_{index_name}_idx ON {table_name} ({column_list});")
+
+    def _validate_data(self, df: pd.DataFrame, references: dict = None) -> pd.DataFrame:
+        """
+        Check the transformed data against the dataset's `rules` and fail before anything is
+        loaded if a rule is broken. Returns the frame unchanged so the load stage depends on it.
+        """
+        report = validate(df, self.config.postgres_table_name, self.rules, references=references)
+        print(report.summary())
+        report.raise_for_failures()
+        return df
+
+    def _load(self, conn, cursor, chunks):
+        """
+        Load the transformed data according to `load_mode`, in a single transaction, and return
+        the number of rows written. `chunks` is an iterable of transformed DataFrames (one in
+        batch mode, one per object when streaming); they are loaded one after another, so only
+        one is held in memory at a time.
+        """
+        table_name = self.config.postgres_table_name
+        if self.config.load_mode == 'swap':
+            return self._load_via_shadow_table(conn, cursor, chunks)
+
+        if self.config.load_mode == 'upsert':
+            # Merge on the natural key; only new and changed rows are written
+            counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+            for transformed_df in chunks:
+                ensure_season_partitions(cursor, table_name, sorted(transformed_df['season'].dropna().unique().tolist()))
+                for key, count in upsert_dataframe_to_postgres(conn, transformed_df, table_name, self.columns, self.natural_key).items():
+                    counts[key] += count
+            conn.commit()
+            print(f"Data successfully upserted into '{table_name}': {counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged.")
+            return counts['inserted'] + counts['updated']
+
+        if not self._incremental_run:
+            # Truncate the table to perform a full refresh
+            truncate_query = f"TRUNCATE TABLE {table_name};"
+            cursor.execute(truncate_query)
+            print(f"Table '{table_name}' truncated for a full refresh.")
+
+        replaced_seasons = set()
+        row_count = 0
+        for transformed_df in chunks:
+            seasons = sorted(transformed_df['season'].dropna().unique().tolist())
+            ensure_season_partitions(cursor, table_name, seasons)
+            if self._incremental_run:
+                # Each object holds whole seasons, so replacing the seasons present in the
+                # changed objects merges them into the existing staged data. A season is only
+                # cleared once, before the first chunk that holds it.
+                new_seasons = [season for season in seasons if season not in replaced_seasons]
+                if new_seasons:
+                    cursor.execute(f"DELETE FROM {table_name} WHERE season = ANY(%s);", (new_seasons,))
+                    replaced_seasons.update(new_seasons)
+                    print(f"Replacing seasons {', '.join(new_seasons)} in '{table_name}'.")
+
+            # Bulk-load the transformed data with COPY in the same transaction as the truncate/delete,
+            # so a failed load rolls back instead of leaving the table empty
+            row_count += copy_dataframe_to_postgres(conn, transformed_df, table_name, self.columns)
+        conn.commit()
+        print(f"Data successfully ingested into '{table_name}' table ({row_count} rows, {'incremental' if self._incremental_run else 'full refresh'}).")
+        return row_count
+
+    def _load_via_shadow_table(self, conn, cursor, chunks):
+        """
+        Full refresh without downtime: load a shadow table, index it, then swap it in with a
+        rename so readers never see an empty or partial table. The replaced table is kept as
+        '<table>__old' for rollback.
+        """
+        table_name = self.config.postgres_table_name
+        shadow_table = f"{table_name}__shadow"
+        column_list = ", ".join(quote_identifier(column) for column in self.columns)
+
+        cursor.execute(f"DROP TABLE IF EXISTS {shadow_table};")
+        self._create_table_if_not_exists(cursor, shadow_table)
+        loaded_seasons = set()
+        row_count = 0
+        for transformed_df in chunks:
+            seasons = sorted(transformed_df['season'].dropna().unique().tolist())
+            ensure_season_partitions(cursor, shadow_table, seasons)
+            loaded_seasons.update(seasons)
+            row_count += copy_dataframe_to_postgres(conn, transformed_df, shadow_table, self.columns)
+        if self._incremental_run:
+            # carry over the seasons that did not change from the live table
+            cursor.execute(f"SELECT DISTINCT season FROM {table_name};")
+            ensure_season_partitions(cursor, shadow_table, [season for (season,) in cursor.fetchall()])
+            cursor.execute(
+                f"INSERT INTO {shadow_table} ({column_list}) SELECT {column_list} FROM {table_name} WHERE season <> ALL(%s);",
+                (sorted(loaded_seasons),),
+            )
+        conn.commit()
+
+        # build the indexes after the load, it is much cheaper than maintaining them row by row
+        self._create_indexes(cursor, shadow_table)
+        cursor.execute(f"ANALYZE {shadow_table};")
+        conn.commit()
+
+        swap_in_shadow_table(conn, table_name, shadow_table)
+        print(f"Data successfully ingested into '{table_name}' table ({row_count} rows, shadow table swap).")
+        return row_count
+
+    def _after_load(self, cursor, loaded_seasons: list):
+        """
+        Refresh what is derived from the staging table (e.g. dashboard aggregates) once the
+        load has committed, in the transaction that records the run. Nothing to do here.
+        """
+
+    def _load_to_postgres(self, chunks) -> int:
+        """
+        Pipeline load stage: create the table and indexes if needed, load the chunks, run
+        `_after_load` for the seasons that were loaded and record the run, which bumps the
+        dashboard's data version. A failed `_after_load` still records the run before its
+        error is raised, since the loaded data is already committed.
+        """
+        # Check out a pooled connection; it is health-checked and returned to the pool afterwards
+        with postgres_connection(
+            self.config.postgres_database,
+            self.config.postgres_host,
+            self.config.postgres_user,
+            self.config.postgres_password,
+            self.config.postgres_port
+        ) as conn, conn.cursor() as cursor:
+            # Create table and indexes if they don't exist
+            self._create_table_if_not_exists(cursor, self.config.postgres_table_name)
+            self._create_indexes(cursor, self.config.postgres_table_name)
+
+            loaded_seasons = set()
+            def track_seasons(chunks):
+                for transformed_df in chunks:
+                    # rows without a kickoff time are stored under UNSCHEDULED_SEASON, since the
+                    # partition key can't be NULL
+                    transformed_df = fill_missing_season(transformed_df, self.partition_column)
+                    loaded_seasons.update(transformed_df[self.partition_column].unique().tolist())
+                    yield transformed_df
+
+            row_count = self._load(conn, cursor, track_seasons(chunks))
+            try:
+                self._after_load(cursor, sorted(loaded_seasons))
+            except Exception:
+                # the load is committed already: record it so the dashboard still picks it up
+                conn.rollback()
+                record_ingestion_run(cursor, self.config.postgres_table_name, row_count)
+                conn.commit()
+                raise
+            record_ingestion_run(cursor, self.config.postgres_table_name, row_count)
+            conn.commit()
+            return row_count
+
+    def _transform_params(self) -> dict:
+        # the settings that change the transform's output, part of its cache fingerprint
+        return {
+            'engine': self.config.transform_engine,
+            'season_cutover_month': self.config.season_cutover_month,
+        }
+
+    def _transform_stages(self) -> list:
+        """
+        The fetch and transform stages of the configured engine, ending in a stage named
+        'transform'. The Polars engine scans inside its transform stage. Both outputs are
+        cached, so a rerun with unchanged objects and settings goes straight to the load.
+        """
+        params = self._transform_params()
+        if self.config.transform_engine == 'polars':
+            return [
+                Stage('transform', lambda planned: self._compact(self._transform_and_dedupe_lazy(self._scan_data(list(planned[self.bucket_name])))),
+                      inputs=('plan',), params=params, code=self.code),
+            ]
+        return [
+            Stage('fetch', lambda planned: self._initiate_data_ingestion(list(planned[self.bucket_name])), inputs=('plan',), code=self.code),
+            Stage('transform', lambda df: self._compact(self._transform(df)), inputs=('fetch',), params=params, code=self.code),
+        ]
+
+    def build_pipeline(self) -> Pipeline:
+        """
+        Declare the ingestion stages: plan -> fetch -> transform -> validate -> load (see
+        `_transform_stages`).
+        """
+        stages = [
+            Stage('plan', self._plan, cache=False, fingerprint_output=True),
+            *self._transform_stages(),
+            Stage('validate', self._validate_data, inputs=('transform',), cache=False),
+            Stage('load', lambda df: self._load_to_postgres([df]), inputs=('validate',), cache=False),
+        ]
+        return Pipeline(self.config.postgres_table_name, stages, self.config.pipeline_cache_dir)
+
+    def ingest_data(self):
+        """
+        Main method to fetch, transform, deduplicate, and ingest data into PostgreSQL.
+        """
+        try:
+            outputs = self.build_pipeline().run()
+
+            # Only record the manifest once the load succeeded, so a failed run is retried in full
+            if 'load' in outputs:
+                save_manifest(self.manifest_path, self._current_manifest)
+
+        except Exception as e:
+            raise Exception(f"Error during data ingestion: {e}")
+
+
+def _transform_partition(partition: pd.DataFrame, ingestion_class: type, config: IngestionConfig) -> pd.DataFrame:
+    # Process-pool entry point: transform one season partition with the parent's dataset and config
+    return ingestion_class(config)._transform_and_dedupe_data(partition)
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import pickle
+import inspect
+import hashlib
+import importlib
+import resource
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Add the project's root directory to the PYTHONPATH
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+sys.path.append(project_root)
+
+
+class StopPipeline(Exception):
+    """
+    Raised by a stage to end a run early without an error, e.g. when an incremental run finds
+    nothing new. The remaining stages are skipped.
+    """
+
+
+@dataclass
+class Stage:
+    """
+    One step of a pipeline. `func` is called with the outputs of the `inputs` stages, in order.
+
+    A stage's fingerprint covers its name, `version`, `params` (the settings that change its
+    output), its code and the fingerprints of its inputs. The code is the source file `func`
+    is defined in plus the modules named in `code` (e.g. the helpers a transform calls), so
+    deploying a fix to any of them invalidates the cached outputs; `version` can still be
+    bumped for changes outside them. With `fingerprint_output` the output itself is
+    hashed into it too, which is how a source stage such as a MinIO listing invalidates
+    everything downstream when an object changes. Stages with `cache=True` store their output
+    on disk under that fingerprint and are skipped while it is unchanged; side-effecting stages
+    such as the load keep `cache=False`.
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: tuple = ()
+    params: dict = field(default_factory=dict)
+    version: str = '1'
+    code: tuple = ()
+    cache: bool = True
+    fingerprint_output: bool = False
+
+
+def _hash_code(stage: Stage) -> str:
+    paths = [importlib.import_module(module).__file__ for module in stage.code]
+    try:
+        paths.append(inspect.getsourcefile(stage.func))
+    except TypeError:
+        pass  # a builtin, e.g. a bound method of a list, has no source
+    digest = hashlib.sha256()
+    for path in sorted(set(filter(None, paths))):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+@dataclass
+class StageMetrics:
+    stage: str
+    seconds: float
+    rows: int = None
+    output_mib: float = None
+    peak_rss_mib: float = None
+    cached: bool = False
+
+
+def _peak_rss_mib() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def _hash_output(output) -> str:
+    if isinstance(output, pd.DataFrame):
+        digest = hashlib.sha256(pd.util.hash_pandas_object(output, index=False).to_numpy().tobytes())
+        digest.update(json.dumps(list(map(str, output.columns))).encode())
+        return digest.hexdigest()
+    return hashlib.sha256(json.dumps(output, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _describe_output(output) -> tuple:
+    if isinstance(output, pd.DataFrame):
+        return len(output), output.memory_usage(deep=True).sum() / 2**20
+    if isinstance(output, int) and not isinstance(output, bool):
+        return output, None  # e.g. the number of rows a load stage wrote
+    return None, None
+
+
+class Pipeline:
+    """
+    Runs a dataset's stages in order, caching stage outputs on disk keyed by fingerprints (see
+    `Stage`), so a rerun skips every stage whose inputs didn't change and a failed run resumes
+    after its last completed stage. Each run records per-stage wall time, rows, output memory and
+    peak process memory, prints them and appends them to `<cache_dir>/<name>/runs.jsonl`.
+
+    DataFrames are cached as Parquet, other outputs are pickled. Only the latest entry of each
+    stage is kept. An empty `cache_dir` disables the cache (metrics are then only printed).
+    """
+    def __init__(self, name: str, stages: list, cache_dir: str = None):
+        self.name = name
+        self.stages = stages
+        self.cache_dir = os.path.join(cache_dir, name) if cache_dir else None
+        self.metrics = []
+
+    def _fingerprint(self, stage: Stage, input_fingerprints: list, output=None) -> str:
+        payload = {
+            'stage': stage.name,
+            'version': stage.version,
+            'params': stage.params,
+            'code': _hash_code(stage),
+            'inputs': input_fingerprints,
+        }
+        if stage.fingerprint_output:
+            payload['output'] = _hash_output(output)
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    def _cache_path(self, stage: Stage, fingerprint: str, extension: str) -> str:
+        return os.path.join(self.cache_dir, f"{stage.name}-{fingerprint}.{extension}")
+
+    def _find_cached(self, stage: Stage, fingerprint: str):
+        if self.cache_dir is None or not stage.cache:
+            return None
+        for extension in ('parquet', 'pkl'):
+            path = self._cache_path(stage, fingerprint, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    @staticmethod
+    def _read_cached(path: str):
+        if path.endswith('.parquet'):
+            return pd.read_parquet(path)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def _write_cached(self, stage: Stage, fingerprint: str, output):
+        if self.cache_dir is None or not stage.cache or output is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for entry in os.listdir(self.cache_dir):
+            if entry.startswith(f"{stage.name}-"):
+                os.remove(os.path.join(self.cache_dir, entry))
+
+        extension = 'parquet' if isinstance(output, pd.DataFrame) else 'pkl'
+        path = self._cache_path(stage, fingerprint, extension)
+        tmp_path = f"{path}.tmp"
+        try:
+            if isinstance(output, pd.DataFrame):
+                output.to_parquet(tmp_path, index=True)
+            else:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(output, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            # a frame Parquet can't represent only costs the cache, not the run
+            print(f"Could not cache stage '{stage.name}': {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def run(self, force: bool = False) -> dict:
+        """
+        Run the pipeline and return {stage name: output} for the stages that ran or whose cached
+        output was needed downstream; cached outputs are only read back when a later stage has
+        to run. `force=True` ignores the cache.
+        """
+        outputs = {}
+        cached_paths = {}
+        fingerprints = {}
+        self.metrics = []
+
+        def materialize(name):
+            if name not in outputs:
+                outputs[name] = self._read_cached(cached_paths[name])
+            return outputs[name]
+
+        try:
+            for stage in self.stages:
+                input_fingerprints = [fingerprints[name] for name in stage.inputs]
+                started = time.perf_counter()
+                if not stage.fingerprint_output:
+                    fingerprints[stage.name] = self._fingerprint(stage, input_fingerprints)
+                    cached_path = None if force else self._find_cached(stage, fingerprints[stage.name])
+                    if cached_path is not None:
+                        cached_paths[stage.name] = cached_path
+                        rows = pq.read_metadata(cached_path).num_rows if cached_path.endswith('.parquet') else None
+                        self.metrics.append(StageMetrics(stage.name, round(time.perf_counter() - started, 3), rows=rows, cached=True))
+                        continue
+
+                output = stage.func(*[materialize(name) for name in stage.inputs])
+                if stage.fingerprint_output:
+                    fingerprints[stage.name] = self._fingerprint(stage, input_fingerprints, output)
+                self._write_cached(stage, fingerprints[stage.name], output)
+                outputs[stage.name] = output
+
+                rows, output_mib = _describe_output(output)
+                self.metrics.append(StageMetrics(
+                    stage=stage.name,
+                    seconds=round(time.perf_counter() - started, 3),
+                    rows=rows,
+                    output_mib=round(output_mib, 1) if output_mib is not None else None,
+                    peak_rss_mib=round(_peak_rss_mib(), 1),
+                ))
+        except StopPipeline as e:
+            print(f"Pipeline '{self.name}' stopped early: {e}")
+        finally:
+            self._report()
+        return outputs
+
+    def _report(self):
+        for metrics in self.metrics:
+            print(
+                f"[{self.name}] {metrics.stage:<16} {metrics.seconds:>8.3f}s  rows={metrics.rows}  "
+                f"output={metrics.output_mib} MiB  peak_rss={metrics.peak_rss_mib} MiB{'  (cached)' if metrics.cached else ''}"
+            )
+        if self.cache_dir is None or not self.metrics:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        record = {
+            'pipeline': self.name,
+            'finished_at': datetime.now(timezone.utc).isoformat(),
+            'stages': [asdict(metrics) for metrics in self.metrics],
+        }
+        with open(os.path.join(self.cache_dir, 'runs.jsonl'), 'a') as f:
+            f.write(json.dumps(record) + '\n')
@@ -0,0 +1,205 @@
+# Column typing shared by the ingestion components and the Parquet upload path.
+# Types use the vocabulary of src.utils.coerce_columns: 'numeric', 'int', 'float',
+# 'datetime' and 'boolean'.
+
+GAMEWEEK_COLUMN_TYPES = {
+    'xP': 'numeric',
+    'creativity': 'numeric',
+    'expected_assists': 'numeric',
+    'expected_goal_involvements': 'numeric',
+    'expected_goals': 'numeric',
+    'expected_goals_conceded': 'numeric',
+    'ict_index': 'numeric',
+    'influence': 'numeric',
+    'threat': 'numeric',
+    'value': 'numeric',
+    'kickoff_time': 'datetime',
+    'was_home': 'boolean',
+}
+
+FIXTURE_COLUMN_TYPES = {
+    'event': 'int',
+    'id': 'int',
+    'kickoff_time': 'datetime',
+    'minutes': 'int',
+    'team_a': 'int',
+    'team_a_score': 'float',
+    'team_h': 'int',
+    'team_h_score': 'float',
+    'team_h_difficulty': 'int',
+    'team_a_difficulty': 'int',
+    'pulse_id': 'int',
+    'finished': 'boolean',
+    'finished_provisional': 'boolean',
+    'started': 'boolean',
+}
+
+# Raw column -> staging column renames applied by the transforms
+GAMEWEEK_RENAMES = {
+    'GW': 'gameweek',
+    'name': 'player_name',
+    'minutes': 'minutes_played',
+    'value': 'player_cost',
+    'starts': 'player_started',
+    'fixture': 'seasonal_fixture_id',
+}
+FIXTURE_RENAMES = {
+    'event': 'gameweek',
+    'id': 'seasonal_fixture_id',
+}
+
+# Column type (coerce_columns / cast_polars_columns vocabulary) of each staging SQL type
+SQL_COLUMN_TYPES = {
+    'INTEGER': 'int',
+    'NUMERIC': 'float',
+    'FLOAT': 'float',
+    'BOOLEAN': 'boolean',
+    'TIMESTAMP': 'datetime',
+    'TEXT': 'str',
+}
+
+# Staging table definitions (column -> PostgreSQL type), in table order. They drive both the
+# CREATE TABLE statements and the explicit column list of the COPY bulk load.
+
+STG_GAMEWEEKS_PRIMARY_KEY = 'player_performance_id'
+STG_GAMEWEEKS_COLUMNS = {
+    'player_name': 'TEXT',
+    'player_cost': 'NUMERIC',
+    'total_points': 'INTEGER',
+    'position': 'TEXT',
+    'season': 'TEXT',
+    'gameweek': 'INTEGER',
+    'seasonal_fixture_id': 'INTEGER',
+    'team': 'TEXT',
+    'opponent_team': 'TEXT',
+    'team_a_score': 'INTEGER',
+    'team_h_score': 'INTEGER',
+    'was_home': 'BOOLEAN',
+    'goals_scored': 'INTEGER',
+    'assists': 'INTEGER',
+    'bonus': 'INTEGER',
+    'bps': 'INTEGER',
+    'clean_sheets': 'INTEGER',
+    'creativity': 'NUMERIC',
+    'element': 'INTEGER',
+    'xP': 'NUMERIC',
+    'expected_assists': 'NUMERIC',
+    'expected_goal_involvements': 'NUMERIC',
+    'expected_goals': 'NUMERIC',
+    'expected_goals_conceded': 'NUMERIC',
+    'goals_conceded': 'INTEGER',
+    'ict_index': 'NUMERIC',
+    'influence': 'NUMERIC',
+    'kickoff_time': 'TIMESTAMP',
+    'minutes_played': 'INTEGER',
+    'own_goals': 'INTEGER',
+    'penalties_missed': 'INTEGER',
+    'penalties_saved': 'INTEGER',
+    'red_cards': 'INTEGER',
+    'saves': 'INTEGER',
+    'player_started': 'BOOLEAN',
+    'threat': 'NUMERIC',
+    'transfers_balance': 'INTEGER',
+    'transfers_in': 'INTEGER',
+    'transfers_out': 'INTEGER',
+    'selected': 'INTEGER',
+    'yellow_cards': 'INTEGER',
+}
+
+STG_FIXTURES_PRIMARY_KEY = 'fixture_id'
+STG_FIXTURES_COLUMNS = {
+    'seasonal_fixture_id': 'INTEGER',
+    'code': 'INTEGER',
+    'gameweek': 'INTEGER',
+    'season': 'TEXT',
+    'finished': 'BOOLEAN',
+    'finished_provisional': 'BOOLEAN',
+    'kickoff_time': 'TIMESTAMP',
+    'minutes': 'INTEGER',
+    'provisional_start_time': 'BOOLEAN',
+    'started': 'BOOLEAN',
+    'team_a': 'INTEGER',
+    'team_a_name': 'TEXT',
+    'team_a_score': 'FLOAT',
+    'team_h': 'INTEGER',
+    'team_h_name': 'TEXT',
+    'team_h_score': 'FLOAT',
+    'team_h_difficulty': 'INTEGER',
+    'team_a_difficulty': 'INTEGER',
+    'pulse_id': 'INTEGER',
+}
+
+# Natural keys of the staging tables, matching the dedup keys of the transforms. Upserts
+# conflict on them and, in upsert mode, they are backed by a unique index. The tables are partitioned by
+# season, which Postgres requires in every unique index; season is derived from kickoff_time
+# (and fixed per fixture), so it doesn't change what the keys identify.
+STG_PARTITION_COLUMN = 'season'
+STG_GAMEWEEKS_NATURAL_KEY = ('player_name', 'gameweek', 'kickoff_time', 'season')
+STG_FIXTURES_NATURAL_KEY = ('pulse_id', 'code', 'season')
+
+# Secondary indexes (name suffix -> columns) for the dashboard and dbt filters
+STG_GAMEWEEKS_INDEXES = {
+    'season_gameweek': ('season', 'gameweek'),
+    'player_name': ('player_name',),
+    'team': ('team',),
+}
+STG_FIXTURES_INDEXES = {
+    'season_gameweek': ('season', 'gameweek'),
+    'team_h': ('team_h',),
+    'team_a': ('team_a',),
+}
+
+# Dashboard aggregate of the dbt fact_player_performance model (the gameweek rows after the dbt
+# cleaning) at season x team x position x player grain, refreshed by the gameweek ingestion.
+# Means are stored with their sums and counts, so they stay correct when the dashboard rolls
+# rows up across teams or positions.
+AGG_PLAYER_SEASON_PRIMARY_KEY = 'agg_player_season_id'
+AGG_PLAYER_SEASON_GRAIN = ('season', 'team', 'position', 'player_name')
+AGG_PLAYER_SEASON_COLUMNS = {
+    'season': 'TEXT',
+    'team': 'TEXT',
+    'position': 'TEXT',
+    'player_name': 'TEXT',
+    'appearances': 'INTEGER',
+    'total_points': 'INTEGER',
+    'goals_scored': 'INTEGER',
+    'assists': 'INTEGER',
+    'minutes_played': 'INTEGER',
+    'player_cost_sum': 'NUMERIC',
+    'player_cost_count': 'INTEGER',
+    'avg_cost': 'NUMERIC',
+    'ict_index_sum': 'NUMERIC',
+    'ict_index_count': 'INTEGER',
+    'avg_ict_index': 'NUMERIC',
+    'latest_gameweek': 'INTEGER',
+    'latest_kickoff_time': 'TIMESTAMP',
+}
+# Aggregate column -> SQL expression over the fact rows of one grain group
+AGG_PLAYER_SEASON_MEASURES = {
+    'appearances': 'COUNT(*)',
+    'total_points': 'SUM("total_points")',
+    'goals_scored': 'SUM("goals_scored")',
+    'assists': 'SUM("assists")',
+    'minutes_played': 'SUM("minutes_played")',
+    'player_cost_sum': 'SUM("player_cost")',
+    'player_cost_count': 'COUNT("player_cost")',
+    'avg_cost': 'AVG("player_cost")',
+    'ict_index_sum': 'SUM("ict_index")',
+    'ict_index_count': 'COUNT("ict_index")',
+    'avg_ict_index': 'AVG("ict_index")',
+    'latest_gameweek': 'MAX("gameweek")',
+    'latest_kickoff_time': 'MAX("kickoff_time")',
+}
+AGG_PLAYER_SEASON_INDEXES = {
+    'grain': AGG_PLAYER_SEASON_GRAIN,
+}
+
+# One row per successful load, committed with (or right after) the data it loaded. The
+# dashboard polls the latest run_id as its data version.
+INGESTION_RUNS_TABLE = 'ingestion_runs'
+INGESTION_RUNS_PRIMARY_KEY = 'run_id'
+INGESTION_RUNS_COLUMNS = {
+    'table_name': 'TEXT',
+    'row_count': 'INTEGER',
+    'finished_at': 'TIMESTAMPTZ',
+}
@@ -0,0 +1,106 @@
+import os
+import re
+import sys
+import glob
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Add the project's root directory to the PYTHONPATH
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+sys.path.append(project_root)
+
+# Team dimension files shipped with the repo, one per season: teams_2019_20.csv etc.
+TEAMS_DIR = os.path.join(project_root, 'src', 'data', 'teams')
+TEAMS_FILE_PATTERN = re.compile(r'teams_(\d{4})_(\d{2})\.csv$')
+
+
+def season_from_filename(path: str) -> str:
+    """
+    Season label of a teams file, e.g. '2019-20' for teams_2019_20.csv. The files have no
+    season column, so this is the only place the season is recorded.
+    """
+    match = TEAMS_FILE_PATTERN.search(os.path.basename(path))
+    if match is None:
+        raise ValueError(f"Cannot derive a season from teams file name '{path}'")
+    return f"{match.group(1)}-{match.group(2)}"
+
+
+class TeamIndex:
+    """
+    Team names keyed by (season, id). Team ids are reassigned every season (promoted and
+    relegated teams shift the alphabetical ids), so the season is part of the key.
+
+    `assign_names` resolves any number of team id columns with a single index probe, which
+    replaces one merge per column.
+    """
+    def __init__(self, teams_df: pd.DataFrame):
+        teams_df = (
+            teams_df[['season', 'id', 'name']]
+            .dropna(subset=['season', 'id'])
+            .astype({'season': str, 'id': 'int64'})
+            .drop_duplicates(subset=['season', 'id'], keep='last')
+            .reset_index(drop=True)
+        )
+        self.teams_df = teams_df
+        self._index = pd.MultiIndex.from_frame(teams_df[['season', 'id']])
+        self._names = teams_df['name'].to_numpy(dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.teams_df)
+
+    @classmethod
+    def from_directory(cls, directory: str = TEAMS_DIR) -> "TeamIndex":
+        paths = sorted(glob.glob(os.path.join(directory, 'teams_*.csv')))
+        if not paths:
+            raise FileNotFoundError(f"No teams files found in '{directory}'")
+        return cls(pd.concat(
+            [pd.read_csv(path, usecols=['id', 'name']).assign(season=season_from_filename(path)) for path in paths],
+            ignore_index=True,
+        ))
+
+    def updated(self, teams_df: pd.DataFrame) -> "TeamIndex":
+        """
+        A new index with the (season, id) entries of `teams_df` added, overriding existing ones.
+        """
+        return TeamIndex(pd.concat([self.teams_df, teams_df[['season', 'id', 'name']]], ignore_index=True))
+
+    def lookup(self, seasons, ids) -> np.ndarray:
+        """
+        Team name of each (season, id) pair, None where either is missing or unknown.
+        """
+        seasons = pd.Series(seasons, copy=False).reset_index(drop=True)
+        ids = pd.to_numeric(pd.Series(ids, copy=False).reset_index(drop=True), errors='coerce')
+        valid = (seasons.notna() & ids.notna()).to_numpy()
+
+        if len(self._names) == 0:
+            return np.full(len(ids), None, dtype=object)
+        positions = np.full(len(ids), -1, dtype=np.intp)
+        if valid.any():
+            keys = pd.MultiIndex.from_arrays([seasons[valid].astype(str), ids[valid].astype('int64')])
+            positions[valid] = self._index.get_indexer(keys)
+        return np.where(positions >= 0, self._names[positions], None)
+
+    def assign_names(self, df: pd.DataFrame, columns: dict, season_column: str = 'season') -> pd.DataFrame:
+        """
+        Add a name column for each {id column: name column} in `columns`, looking all of them
+        up in one pass.
+        """
+        id_columns = list(columns)
+        names = self.lookup(
+            np.tile(df[season_column].to_numpy(dtype=object), len(id_columns)),
+            pd.concat([df[column] for column in id_columns], ignore_index=True),
+        )
+        return df.assign(**{
+            name_column: pd.Series(column_names, index=df.index, dtype=self.teams_df['name'].dtype)
+            for name_column, column_names in zip(columns.values(), np.split(names, len(id_columns)))
+        })
+
+
+@lru_cache(maxsize=None)
+def load_team_index(directory: str = TEAMS_DIR) -> TeamIndex:
+    """
+    The team index of the bundled teams files, loaded once per process.
+    """
+    return TeamIndex.from_directory(directory)
@@ -0,0 +1,179 @@
+import os
+import sys
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+# Add the project's root directory to the PYTHONPATH
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+sys.path.append(project_root)
+from src.components.schemas import STG_GAMEWEEKS_NATURAL_KEY, STG_FIXTURES_NATURAL_KEY
+
+
+class DataValidationError(Exception):
+    """
+    Raised when a transformed frame breaks a validation rule. Carries the full report.
+    """
+    def __init__(self, report: "ValidationReport"):
+        self.report = report
+        super().__init__(report.summary())
+
+
+@dataclass
+class Unique:
+    """The `columns` combination identifies each row (nulls count as a value)."""
+    columns: tuple
+
+    def describe(self) -> str:
+        return f"unique({', '.join(self.columns)})"
+
+    def violations(self, df: pd.DataFrame, references: dict) -> np.ndarray:
+        return df.duplicated(subset=list(self.columns), keep=False).to_numpy()
+
+
+@dataclass
+class NotNull:
+    """None of `columns` is null."""
+    columns: tuple
+
+    def describe(self) -> str:
+        return f"not_null({', '.join(self.columns)})"
+
+    def violations(self, df: pd.DataFrame, references: dict) -> np.ndarray:
+        return df[list(self.columns)].isna().any(axis=1).to_numpy()
+
+
+@dataclass
+class InRange:
+    """Every non-null value of `column` lies in [min_value, max_value]; either bound may be None."""
+    column: str
+    min_value: float = None
+    max_value: float = None
+
+    def describe(self) -> str:
+        return f"in_range({self.column}, {self.min_value}, {self.max_value})"
+
+    def violations(self, df: pd.DataFrame, references: dict) -> np.ndarray:
+        values = pd.to_numeric(df[self.column], errors='coerce')
+        # a non-numeric value is a violation too, only real nulls are skipped
+        invalid = values.isna() & df[self.column].notna()
+        if self.min_value is not None:
+            invalid |= values < self.min_value
+        if self.max_value is not None:
+            invalid |= values > self.max_value
+        return invalid.fillna(False).to_numpy(dtype=bool)
+
+
+@dataclass
+class References:
+    """
+    Every non-null `column` value exists in `reference_column` of the `reference` frame, matched
+    within the same `by` values (e.g. team ids per season). Without `reference` the frame is
+    checked against itself, e.g. opponent teams against the teams that played that season.
+    """
+    column: str
+    reference_column: str
+    reference: str = None
+    by: tuple = ()
+
+    def describe(self) -> str:
+        target = f"{self.reference}.{self.reference_column}" if self.reference else self.reference_column
+        return f"references({self.column} -> {target}{' by ' + ', '.join(self.by) if self.by else ''})"
+
+    def violations(self, df: pd.DataFrame, references: dict) -> np.ndarray:
+        if self.reference is not None and self.reference not in references:
+            raise KeyError(f"Rule {self.describe()} needs the '{self.reference}' reference frame")
+        reference = df if self.reference is None else references[self.reference]
+        keys = list(self.by)
+        known = pd.MultiIndex.from_frame(
+            _key_frame(reference[keys + [self.reference_column]].dropna()).drop_duplicates())
+        # rows without the value, or without the keys to match it within, are not checked
+        present = df[keys + [self.column]].notna().all(axis=1).to_numpy()
+        rows = pd.MultiIndex.from_frame(_key_frame(df[keys + [self.column]]))
+        return present & (known.get_indexer(rows) < 0) if len(known) else present
+
+
+def _key_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # compare keys as text, with numbers in one form so an Int64 id matches a float64 one
+    return pd.DataFrame({
+        column: (df[column].astype('float64') if pd.api.types.is_numeric_dtype(df[column]) else df[column]).astype(str)
+        for column in df.columns
+    }, index=df.index)
+
+
+@dataclass
+class RuleResult:
+    rule: str
+    failed_rows: int
+    sample: list = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return self.failed_rows == 0
+
+
+@dataclass
+class ValidationReport:
+    dataset: str
+    rows: int
+    results: list
+
+    @property
+    def passed(self) -> bool:
+        return all(result.passed for result in self.results)
+
+    @property
+    def failures(self) -> list:
+        return [result for result in self.results if not result.passed]
+
+    def summary(self) -> str:
+        if self.passed:
+            return f"'{self.dataset}' passed {len(self.results)} validation rules ({self.rows} rows)."
+        lines = [f"'{self.dataset}' failed {len(self.failures)} of {len(self.results)} validation rules ({self.rows} rows):"]
+        lines += [f"  {result.rule}: {result.failed_rows} rows, e.g. {result.sample}" for result in self.failures]
+        return "\n".join(lines)
+
+    def raise_for_failures(self):
+        if not self.passed:
+            raise DataValidationError(self)
+
+
+def validate(df: pd.DataFrame, dataset: str, rules: list, references: dict = None, sample_size: int = 3) -> ValidationReport:
+    """
+    Evaluate every rule against `df` and return a report. Each rule is a vectorized check
+    returning one boolean per row; a few failing rows are kept per rule for the report.
+    """
+    references = references or {}
+    results = []
+    for rule in rules:
+        violations = rule.violations(df, references)
+        failed_rows = int(violations.sum())
+        sample = df.loc[violations].head(sample_size).to_dict('records') if failed_rows else []
+        results.append(RuleResult(rule.describe(), failed_rows, sample))
+    return ValidationReport(dataset, len(df), results)
+
+
+# Rules checked on the transformed frames before they are loaded
+GAMEWEEK_RULES = [
+    Unique(STG_GAMEWEEKS_NATURAL_KEY),
+    NotNull(('player_name', 'team', 'kickoff_time', 'season', 'gameweek', 'seasonal_fixture_id')),
+    InRange('gameweek', 1, 47),  # 2019-20 ran to gameweek 47 after the restart
+    InRange('minutes_played', 0, 120),
+    InRange('player_cost', 0),
+    InRange('goals_scored', 0),
+    InRange('assists', 0),
+    References('opponent_team', reference_column='team', by=('season',)),
+]
+FIXTURE_RULES = [
+    Unique(STG_FIXTURES_NATURAL_KEY),
+    Unique(('code',)),
+    NotNull(('code', 'pulse_id', 'seasonal_fixture_id', 'team_h', 'team_a')),
+    InRange('gameweek', 1, 47),
+    InRange('team_h_difficulty', 1, 5),
+    InRange('team_a_difficulty', 1, 5),
+    InRange('team_h_score', 0),
+    InRange('team_a_score', 0),
+    References('team_h', reference='teams', reference_column='id', by=('season',)),
+    References('team_a', reference='teams', reference_column='id', by=('season',)),
+]
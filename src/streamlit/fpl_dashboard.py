@@ -1,10 +1,8 @@
 import streamlit as st
 import polars as pl
-import pandas as pd
 import os
 import sys
 import plotly.express as px
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import plotly.graph_objects as go
@@ -13,15 +11,18 @@ import plotly.graph_objects as go
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 sys.path.append(project_root)
 
-from src.streamlit.streamlit_utils import load_data, connect_to_postgres
+from src.streamlit.streamlit_utils import (
+    get_connection_pool, selection, load_seasons, load_season_options, load_summary, load_players,
+    load_player_totals, load_top_players_by_position, load_team_totals,
+)
 
 # load environment variables
 load_dotenv()
 
 st.set_page_config(layout="wide")
 
-# connect to the database
-connection = connect_to_postgres(
+# connect to the database (a connection pool shared by all sessions)
+pool = get_connection_pool(
     database=os.getenv("PG_DATABASE"),
     host=os.getenv("PG_HOST"),
     user=os.getenv("PG_USER"),
@@ -32,94 +33,20 @@ connection = connect_to_postgres(
 st.title("Fantasy Premier League Dashboard")
 
 
-if connection:
-
-    data, column_names = load_data(connection, "dbt_ohempel", "fact_player_performance")
-
-
-    # Define the schema based on your knowledge of the data types in each column
-    schema = {
-        # "player_performance_id": pl.Int64,
-        "player_name": pl.Utf8,
-        "season": pl.Utf8,
-        "gameweek": pl.Int64,
-        "team": pl.Utf8,
-        "opponent_team": pl.Utf8,
-        "position": pl.Utf8,
-        "player_cost": pl.Float64,
-        "total_points": pl.Int64,
-        # "date": pl.Datetime,
-        # "team_a_score": pl.Int64,
-        # "team_h_score": pl.Int64,
-        # "was_home": pl.Boolean,
-        "goals_scored": pl.Int64,
-        "assists": pl.Int64,
-        # "bonus": pl.Int64,
-        # "bps": pl.Int64,
-        "clean_sheets": pl.Boolean,
-        # "creativity": pl.Float64,
-        # "element": pl.Int64,
-        # "xP": pl.Float64,
-        # "expected_assists": pl.Float64,
-        # "expected_goal_involvements": pl.Float64,
-        # "expected_goals": pl.Float64,
-        # "expected_goals_conceded": pl.Float64,
-        # "goals_conceded": pl.Int64,
-        "ict_index": pl.Float64,
-        # "influence": pl.Float64,
-        "minutes_played": pl.Int64,
-        "kickoff_time": pl.Datetime,
-        # "own_goals": pl.Int64,
-        # "penalties_missed": pl.Int64,
-        # "penalties_saved": pl.Int64,
-        # "red_cards": pl.Int64,
-        # "saves": pl.Int64,
-        # "player_started": pl.Boolean,
-        # "threat": pl.Float64,
-        # "transfers_balance": pl.Int64,
-        # "transfers_in": pl.Int64,
-        # "transfers_out": pl.Int64,
-        "selected": pl.Int64,
-        # "yellow_cards": pl.Int64,
-        # "player_id": pl.Utf8,
-        # "team_id": pl.Utf8,
-        # "fixture_id": pl.Int64,
-        # "gameweek_id": pl.Utf8,
-        # "season_id": pl.Utf8,
-        # "date_id": pl.Utf8,
-        # "seasonal_fixture_id": pl.Int64
-    }
-
-    # create a polars DataFrame from the data
-    df = pl.DataFrame(
-        data,
-        schema=schema,
-        orient="row",
-        #infer_schema_length=5000
-    )
+if pool:
 
-    # convert kickoff_time column to datetime
-    df = df.with_columns(
-        pl.col("kickoff_time").cast(pl.Datetime).alias("kickoff_time")
-    )
-
-    # Function to get top players based on current filters
-    def get_top_players(df, n=5):
-        return (
-            df.group_by("player_name")
-            .agg(pl.sum("total_points").alias("total_points"))
-            .sort("total_points", descending=True)
-            .head(n)
-        )
+    # the sidebar selections are pushed down into queries on the precomputed player-season
+    # aggregates of the dbt fact model, which the gameweek ingestion refreshes
+    source = (pool, os.getenv("PG_AGG_SCHEMA", "public"), os.getenv("PG_TABLE_NAME_AGG", "agg_player_season"))
 
     # Function to update filters for a given season
     def update_filters_for_season(season):
-        season_data = df.filter(pl.col("season") == season)
-        st.session_state.selected_teams = season_data["team"].unique().sort().to_list()
-        st.session_state.selected_positions = season_data["position"].unique().sort().to_list()
+        season_teams, season_positions = load_season_options(*source, season)
+        st.session_state.selected_teams = season_teams
+        st.session_state.selected_positions = season_positions
         
         # Update top players for comparison
-        top_players = get_top_players(season_data)
+        top_players = load_player_totals(*source, season, limit=5)
         st.session_state.selected_players_for_comparison = top_players["player_name"].to_list()
 
     # Function to set filters_changed when season changes
@@ -151,7 +78,7 @@ if connection:
         st.session_state.filters_changed = True  # Set to True initially to trigger top players selection
 
     # Get all seasons and determine the latest season
-    all_seasons = df["season"].unique().sort(descending=True)
+    all_seasons = load_seasons(*source)
     latest_season = all_seasons[0]
 
     # Season selection with on_change callback
@@ -164,16 +91,16 @@ if connection:
         update_filters_for_season(selected_season)
         st.session_state.previous_season = selected_season
 
-    # Filter data for the selected season
-    df_selected_season = df.filter(pl.col("season") == selected_season)
+    # Teams and positions of the selected season
+    season_teams, season_positions = load_season_options(*source, selected_season)
 
-    if df_selected_season.is_empty():
+    if not season_teams:
         st.warning(f"No data available for the selected season: {selected_season}")
     else:
         # Team selection with on_change callback
-        all_teams = df_selected_season["team"].unique().sort()
+        all_teams = season_teams
         if "selected_teams" not in st.session_state:
-            st.session_state.selected_teams = all_teams.to_list()
+            st.session_state.selected_teams = all_teams
         selected_teams = st.sidebar.multiselect(
             "Select Teams",
             options=all_teams,
@@ -187,9 +114,9 @@ if connection:
             selected_teams = st.session_state.selected_teams
 
         # Position selection with on_change callback
-        all_positions = df_selected_season["position"].unique().sort()
+        all_positions = season_positions
         if "selected_positions" not in st.session_state:
-            st.session_state.selected_positions = all_positions.to_list()
+            st.session_state.selected_positions = all_positions
         selected_positions = st.sidebar.multiselect(
             "Select Positions",
             options=all_positions,
@@ -202,11 +129,9 @@ if connection:
         if not selected_positions:
             selected_positions = st.session_state.selected_positions
 
-        # Filter data based on user selection
-        filtered_df = df_selected_season.filter(
-            (pl.col("team").is_in(selected_teams)) & 
-            (pl.col("position").is_in(selected_positions))
-        )
+        # Filter arguments for the queries based on user selection
+        filters = (selected_season, selection(selected_teams), selection(selected_positions))
+        summary = load_summary(*source, *filters)
 
         # Display current filters
         st.sidebar.write(f"Current Season: {selected_season}")
@@ -214,11 +139,11 @@ if connection:
         st.sidebar.write(f"Selected Positions: {', '.join(selected_positions)}")
 
         # latest gameweek
-        latest_gameweek = filtered_df.select(pl.col("gameweek").max()).item()
+        latest_gameweek = summary["latest_gameweek"]
         st.write(f"Latest Gameweek: {latest_gameweek}")
 
         # latest kickoff time
-        latest_kickoff_time = filtered_df.select(pl.col("kickoff_time").max()).item()
+        latest_kickoff_time = summary["latest_kickoff_time"]
 
         if latest_kickoff_time is not None:
             st.write(f"Latest Kickoff Time: {latest_kickoff_time}")
@@ -229,14 +154,14 @@ if connection:
         else:
             st.write("No kickoff time data available for the selected season.")
 
-        if filtered_df.is_empty():
+        if summary["rows"] == 0:
             st.warning("No data available for the current selection. Please adjust your filters.")
         else:
             # player comparison
             st.header("Player Comparison")
 
             # Get available players based on filtered data
-            all_players = filtered_df["player_name"].unique().sort()
+            all_players = load_players(*source, *filters)
 
             # Ensure selected players are valid for current filters
             st.session_state.selected_players_for_comparison = [
@@ -245,7 +170,7 @@ if connection:
 
             # If filters changed and no valid players selected, select top players
             if st.session_state.filters_changed or not st.session_state.selected_players_for_comparison:
-                top_players = get_top_players(filtered_df)
+                top_players = load_player_totals(*source, *filters, limit=5)
                 st.session_state.selected_players_for_comparison = top_players["player_name"].to_list()
                 st.session_state.filters_changed = False  # Reset the flag
 
@@ -258,19 +183,14 @@ if connection:
             )
 
             if selected_players:
-                player_data = (
-                    filtered_df.filter(pl.col("player_name").is_in(selected_players))
-                    .group_by("player_name")
-                    .agg([
-                        pl.sum("total_points").alias("Total Points"),
-                        pl.sum("goals_scored").alias("Goals"),
-                        pl.sum("assists").alias("Assists"),
-                        pl.mean("player_cost").alias("Avg Cost").round(0),
-                        pl.mean("ict_index").alias("ICT Index").round(2),
-                        pl.sum("minutes_played").alias("Minutes Played"),
-                    ])
-                    .sort("Total Points", descending=True)
-                )
+                player_data = load_player_totals(*source, *filters, players=selection(selected_players)).rename({
+                    "total_points": "Total Points",
+                    "goals_scored": "Goals",
+                    "assists": "Assists",
+                    "avg_cost": "Avg Cost",
+                    "ict_index": "ICT Index",
+                    "minutes_played": "Minutes Played",
+                })
                 
                 fig = go.Figure()
                 for metric in ["Total Points", "Goals", "Assists", "Avg Cost", "ICT Index"]:
@@ -297,15 +217,12 @@ if connection:
 
 
 
+            # top 10 players of every position, ranked in the database
+            top_players_by_position = load_top_players_by_position(*source, *filters, n=10)
+
             # function to create player chart
             def create_player_chart(position: str, title: str):
-                top_players = (
-                    filtered_df.filter(pl.col("position") == position)
-                    .group_by("player_name")
-                    .agg(pl.sum("total_points"))
-                    .sort("total_points", descending=True)
-                    .head(10)
-                )
+                top_players = top_players_by_position.filter(pl.col("position") == position)
                 
                 fig = px.bar(
                     top_players,
@@ -338,11 +255,7 @@ if connection:
                     st.plotly_chart(create_player_chart(position, title), use_container_width=True)
 
             # teams chart
-            teams_points = (
-                filtered_df.group_by("team")
-                .agg(pl.sum("total_points"))
-                .sort("total_points", descending=True)
-            )
+            teams_points = load_team_totals(*source, *filters)
             fig_teams_points = px.bar(
                 teams_points,
                 x="team",
@@ -1,46 +1,313 @@
-
+import io
 import os
 import sys
-import streamlit as st
+import copy
+import threading
+from collections import OrderedDict
+from functools import update_wrapper
 import psycopg2
+import polars as pl
+import streamlit as st
 
 # add the project root directory to the Python path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 sys.path.append(project_root)
 
-from src.utils import connect_to_postgres, query_postgres
+from src.utils import get_postgres_pool, quote_identifier
+from src.components.schemas import INGESTION_RUNS_PRIMARY_KEY, INGESTION_RUNS_TABLE
+
+
+# Dtypes of the fact_player_performance columns the dashboard reads
+FACT_PLAYER_PERFORMANCE_SCHEMA = {
+    "player_name": pl.Utf8,
+    "season": pl.Utf8,
+    "gameweek": pl.Int64,
+    "team": pl.Utf8,
+    "opponent_team": pl.Utf8,
+    "position": pl.Utf8,
+    "player_cost": pl.Float64,
+    "total_points": pl.Int64,
+    "goals_scored": pl.Int64,
+    "assists": pl.Int64,
+    "clean_sheets": pl.Boolean,
+    "ict_index": pl.Float64,
+    "minutes_played": pl.Int64,
+    "kickoff_time": pl.Datetime,
+    "selected": pl.Int64,
+}
+
+# Postgres' text form of timestamp and timestamptz values (the fraction is only printed when non-zero)
+TIMESTAMP_FORMATS = ("%Y-%m-%d %H:%M:%S%.f", "%Y-%m-%d %H:%M:%S%.f%#z")
+
+# How often (in seconds) the data version is polled; between polls cached results are served as is
+DATA_VERSION_TTL = int(os.getenv("DATA_VERSION_TTL", 30))
+# The ingestion whose runs change what the dashboard reads: the gameweek load refreshes the
+# player-season aggregates, a fixtures load doesn't touch them
+DATA_VERSION_TABLE = os.getenv("PG_TABLE_NAME_GW", "stg_gameweeks")
+
+
+# Per-player aggregates of the comparison and top-player charts (column alias -> SQL expression
+# over the agg_player_season cube). Means are rolled up from the stored sums and counts, since a
+# player has a cube row per team and position; they are cast to float so they don't come back
+# as Decimal.
+PLAYER_AGGREGATES = {
+    "total_points": "SUM(total_points)",
+    "goals_scored": "SUM(goals_scored)",
+    "assists": "SUM(assists)",
+    "avg_cost": "ROUND(SUM(player_cost_sum) / NULLIF(SUM(player_cost_count), 0), 0)::float8",
+    "ict_index": "ROUND(SUM(ict_index_sum) / NULLIF(SUM(ict_index_count), 0), 2)::float8",
+    "minutes_played": "SUM(minutes_played)",
+}
+
+
+@st.cache_data(ttl=DATA_VERSION_TTL, show_spinner=False)
+def data_version(_pool, schema_name):
+    """
+    The latest run id of the `DATA_VERSION_TABLE` ingestion in `schema_name` (see
+    src/utils.py:record_ingestion_run), or None if nothing has been recorded there yet. A query
+    on the small runs table, cached for DATA_VERSION_TTL.
+    """
+    query = (
+        f"SELECT MAX({INGESTION_RUNS_PRIMARY_KEY}) AS version "
+        f"FROM {qualified_table(schema_name, INGESTION_RUNS_TABLE)} WHERE table_name = %s"
+    )
+    try:
+        return fetch_frame(_pool, query, [DATA_VERSION_TABLE])["version"][0]
+    except psycopg2.ProgrammingError:
+        # the runs table is created by the first ingestion
+        return None
+
+
+class VersionedCache:
+    """
+    Cache of a loader's results, keyed by its arguments and tagged with the data version they
+    were loaded at. Only a cold miss loads while the caller waits: when the version has moved
+    on, the cached result is still returned and a background thread reloads it and swaps it
+    in, so readers never wait for ingestion to be picked up. At most `max_entries` results are
+    kept; the least recently used go first.
+    """
+    def __init__(self, loader, max_entries: int = 256):
+        self.loader = loader
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, result)
+        self._refreshing = {}  # key -> background reload thread
+        self._lock = threading.Lock()
+        update_wrapper(self, loader)
+
+    def __call__(self, _pool, schema_name, *args, **kwargs):
+        version = data_version(_pool, schema_name)
+        key = (schema_name, args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry[0] != version and key not in self._refreshing:
+                    thread = threading.Thread(
+                        target=self._refresh, args=(key, version, _pool, schema_name, args, kwargs), daemon=True
+                    )
+                    self._refreshing[key] = thread
+                    thread.start()
+        if entry is None:
+            result = self.loader(_pool, schema_name, *args, **kwargs)
+            self._store(key, version, result)
+            entry = (version, result)
+        # callers get their own copy, so they can't modify the cached result
+        return copy.copy(entry[1])
+
+    def _refresh(self, key, version, _pool, schema_name, args, kwargs):
+        try:
+            self._store(key, version, self.loader(_pool, schema_name, *args, **kwargs))
+        except Exception as e:
+            # keep serving the stale result; the next call after a version poll retries
+            print(f"Error refreshing {self.loader.__name__}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def _store(self, key, version, result):
+        with self._lock:
+            self._entries[key] = (version, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def refreshes(self) -> list:
+        """
+        The background reloads in progress.
+        """
+        with self._lock:
+            return list(self._refreshing.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
 
+def versioned_cache(loader=None, *, max_entries: int = 256):
+    """
+    Decorator that caches a `loader(_pool, schema_name, ...)` in a `VersionedCache`, in place of
+    `@st.cache_data`.
+    """
+    if loader is None:
+        return lambda loader: VersionedCache(loader, max_entries)
+    return VersionedCache(loader, max_entries)
+
+
+def qualified_table(schema_name: str, table_name: str) -> str:
+    return f"{quote_identifier(schema_name)}.{quote_identifier(table_name)}"
 
-@st.cache_data
-def load_data(_connection, schema_name, table_name):
-    connection = _connection  # tell streamlit to not cache connection
-    cursor = connection.cursor()
-    # Select only the necessary columns based on the dashboard requirements
-    columns = """
-        player_name, season, gameweek, team, opponent_team, position, player_cost,
-        total_points, goals_scored, assists, clean_sheets, ict_index, minutes_played, kickoff_time, selected
+
+def build_filters(season=None, teams=None, positions=None, players=None) -> tuple:
+    """
+    Turn the sidebar selections into a WHERE clause and its query parameters. None leaves a
+    filter out; an empty selection matches no rows.
     """
-    query = f"SELECT {columns} FROM {schema_name}.{table_name}"
-    query_postgres(cursor, query)
-    data = cursor.fetchall()
-    column_names = [desc[0] for desc in cursor.description]
-    cursor.close()
-    connection.close()
-    return data, column_names
+    predicates, params = [], []
+    if season is not None:
+        predicates.append("season = %s")
+        params.append(season)
+    for column, values in (("team", teams), ("position", positions), ("player_name", players)):
+        if values is not None:
+            # psycopg2 sends a list as an array
+            predicates.append(f"{column} = ANY(%s)")
+            params.append(list(values))
+    where = f" WHERE {' AND '.join(predicates)}" if predicates else ""
+    return where, params
+
+
+def _parse_timestamps(column: pl.Series) -> pl.Series:
+    for timestamp_format in TIMESTAMP_FORMATS:
+        try:
+            return column.str.to_datetime(timestamp_format)
+        except pl.exceptions.InvalidOperationError:
+            continue
+    raise ValueError(f"Column '{column.name}' does not hold Postgres timestamps")
+
+
+def fetch_frame(pool, query: str, params=None, schema: dict = None) -> pl.DataFrame:
+    """
+    Run a query and read the result straight into a Polars frame. Postgres streams the rows
+    out with COPY ... TO STDOUT as CSV, which Polars parses column by column, so no Python
+    tuple or object is created per row or value as with `fetchall()`.
+
+    Columns named like a `FACT_PLAYER_PERFORMANCE_SCHEMA` column get its dtype, `schema` sets
+    others (e.g. aggregates) and the rest are inferred. Booleans (sent as t/f)
+    and timestamps are parsed from their Postgres text form.
+    """
+    schema = {**FACT_PLAYER_PERFORMANCE_SCHEMA, **(schema or {})}
+    buffer = io.BytesIO()
+    # the pool is shared by all sessions; the connection goes back to it instead of being closed
+    with pool.connection() as connection, connection.cursor() as cursor:
+        # COPY takes no bind parameters, so they are rendered into the query by the driver
+        cursor.copy_expert(f"COPY ({cursor.mogrify(query, params).decode()}) TO STDOUT WITH (FORMAT csv, HEADER)", buffer)
+    buffer.seek(0)
+
+    text_columns = {column for column, dtype in schema.items() if dtype in (pl.Boolean, pl.Datetime)}
+    df = pl.read_csv(
+        buffer,
+        schema_overrides={column: pl.Utf8 if column in text_columns else dtype for column, dtype in schema.items()},
+    )
+    return df.with_columns([
+        # t/f map explicitly, so a NULL stays NULL instead of becoming False
+        pl.col(column).replace_strict({"t": True, "f": False}, default=None, return_dtype=pl.Boolean)
+        if schema[column] == pl.Boolean else _parse_timestamps(df[column])
+        for column in text_columns if column in df.columns
+    ])
+
+
+# The loaders below read the agg_player_season cube (season x team x position x player, see
+# src/components/aggregates.py), so no query scans gameweek rows. They are cached per argument
+# combination and data version; selections are passed as sorted tuples so the same teams picked
+# in another order hit the same cache entry.
+
+def selection(values) -> tuple:
+    return None if values is None else tuple(sorted(values))
+
+
+@versioned_cache
+def load_seasons(_pool, schema_name, table_name) -> list:
+    query = f"SELECT DISTINCT season FROM {qualified_table(schema_name, table_name)} ORDER BY season DESC"
+    return fetch_frame(_pool, query)["season"].to_list()
+
+
+@versioned_cache
+def load_season_options(_pool, schema_name, table_name, season) -> tuple:
+    """
+    The teams and positions that appear in a season, for the sidebar filters.
+    """
+    where, params = build_filters(season=season)
+    query = f"SELECT DISTINCT team, position FROM {qualified_table(schema_name, table_name)}{where}"
+    options = fetch_frame(_pool, query, params)
+    return options["team"].drop_nulls().unique().sort().to_list(), options["position"].drop_nulls().unique().sort().to_list()
+
+
+@versioned_cache
+def load_summary(_pool, schema_name, table_name, season, teams, positions) -> dict:
+    """
+    Row count, latest gameweek and latest kickoff time of the selection.
+    """
+    where, params = build_filters(season, teams, positions)
+    query = (
+        f"SELECT COALESCE(SUM(appearances), 0) AS rows, MAX(latest_gameweek) AS latest_gameweek, MAX(latest_kickoff_time) AS latest_kickoff_time "
+        f"FROM {qualified_table(schema_name, table_name)}{where}"
+    )
+    return fetch_frame(_pool, query, params, schema={"latest_kickoff_time": pl.Datetime}).row(0, named=True)
+
+
+@versioned_cache
+def load_players(_pool, schema_name, table_name, season, teams, positions) -> list:
+    where, params = build_filters(season, teams, positions)
+    query = f"SELECT DISTINCT player_name FROM {qualified_table(schema_name, table_name)}{where} ORDER BY player_name"
+    return fetch_frame(_pool, query, params)["player_name"].to_list()
+
+
+@versioned_cache
+def load_player_totals(_pool, schema_name, table_name, season, teams=None, positions=None, players=None, limit=None) -> pl.DataFrame:
+    """
+    `PLAYER_AGGREGATES` per player of the selection, best total points first.
+    """
+    where, params = build_filters(season, teams, positions, players)
+    aggregates = ", ".join(f"{expression} AS {alias}" for alias, expression in PLAYER_AGGREGATES.items())
+    query = (
+        f"SELECT player_name, {aggregates} FROM {qualified_table(schema_name, table_name)}{where} "
+        f"GROUP BY player_name ORDER BY total_points DESC, player_name"
+    )
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return fetch_frame(_pool, query, params, schema={"avg_cost": pl.Float64})
+
+
+@versioned_cache
+def load_top_players_by_position(_pool, schema_name, table_name, season, teams, positions, n=10) -> pl.DataFrame:
+    """
+    The `n` players with the most total points in each position, in one query.
+    """
+    where, params = build_filters(season, teams, positions)
+    query = (
+        f"SELECT position, player_name, total_points FROM ("
+        f"SELECT position, player_name, SUM(total_points) AS total_points, "
+        f"ROW_NUMBER() OVER (PARTITION BY position ORDER BY SUM(total_points) DESC, player_name) AS rank "
+        f"FROM {qualified_table(schema_name, table_name)}{where} GROUP BY position, player_name"
+        f") ranked WHERE rank <= %s ORDER BY position, rank"
+    )
+    return fetch_frame(_pool, query, params + [n])
+
+
+@versioned_cache
+def load_team_totals(_pool, schema_name, table_name, season, teams, positions) -> pl.DataFrame:
+    where, params = build_filters(season, teams, positions)
+    query = (
+        f"SELECT team, SUM(total_points) AS total_points FROM {qualified_table(schema_name, table_name)}{where} "
+        f"GROUP BY team ORDER BY total_points DESC"
+    )
+    return fetch_frame(_pool, query, params)
 
 
 @st.cache_resource
-def connect_to_postgres(database, host, user, password, port):
+def get_connection_pool(database, host, user, password, port):
     try:
-        connection = psycopg2.connect(
-            database=database,
-            host=host,
-            user=user,
-            password=password,
-            port=port
-        )
-        print('Connection to PG established, Connection object returned.')
-        return connection  # Return the connection object, not the cursor
+        return get_postgres_pool(database, host, user, password, port)
     except Exception as e:
         print('Error: ', e)
-        return None
\ No newline at end of file
+        return None
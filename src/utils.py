@@ -1,13 +1,31 @@
 import os
+import re
+import csv
+import glob
+import json
+import time
+import hashlib
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
 import urllib3
 from minio import Minio
 from minio.error import S3Error
 from dotenv import load_dotenv
 import io
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import multiprocessing
+import numpy as np
 import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 import psycopg2
+from psycopg2 import extensions, pool as pg_pool
 from sqlalchemy import create_engine
 
+from src.components.schemas import INGESTION_RUNS_COLUMNS, INGESTION_RUNS_PRIMARY_KEY, INGESTION_RUNS_TABLE
+
 # TODO - import most of these from my shared repo insteaD? 
 
 def connect_to_postgres(database, host, user, password, port):
@@ -25,6 +43,91 @@ def connect_to_postgres(database, host, user, password, port):
         print('Error: ', e)
         return None
 
+class PostgresConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections with a context-manager checkout.
+
+    `connection()` blocks (up to `timeout` seconds) while all `maxconn` connections are in
+    use, health-checks the connection it hands out (closed or broken connections are
+    replaced), commits on success, rolls back on error and always returns it to the pool.
+    """
+    def __init__(self, minconn: int, maxconn: int, **connect_kwargs):
+        self.maxconn = maxconn
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def _checkout(self):
+        for _ in range(self.maxconn + 1):
+            connection = self._pool.getconn()
+            try:
+                if connection.closed:
+                    raise psycopg2.InterfaceError("connection already closed")
+                if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1;")
+                connection.rollback()  # leave the connection idle, outside the ping transaction
+                return connection
+            except (psycopg2.InterfaceError, psycopg2.OperationalError):
+                self._pool.putconn(connection, close=True)
+        raise psycopg2.OperationalError("Could not check out a healthy PostgreSQL connection")
+
+    @contextmanager
+    def connection(self, timeout: float = 30):
+        if not self._slots.acquire(timeout=timeout):
+            raise pg_pool.PoolError(f"No PostgreSQL connection available within {timeout}s")
+        connection = None
+        try:
+            connection = self._checkout()
+            yield connection
+            connection.commit()
+        except Exception:
+            if connection is not None and not connection.closed:
+                connection.rollback()
+            raise
+        finally:
+            if connection is not None:
+                self._pool.putconn(connection, close=bool(connection.closed))
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_postgres_pools = {}
+_postgres_pools_lock = threading.Lock()
+
+
+def get_postgres_pool(database, host, user, password, port, minconn=None, maxconn=None) -> PostgresConnectionPool:
+    """
+    Return the process-wide connection pool for these connection settings, creating it on
+    first use with PG_POOL_MIN (default 1) and PG_POOL_MAX (default 10) connections.
+    """
+    key = (database, host, user, password, str(port))
+    with _postgres_pools_lock:
+        if key not in _postgres_pools:
+            _postgres_pools[key] = PostgresConnectionPool(
+                minconn if minconn is not None else int(os.getenv('PG_POOL_MIN', 1)),
+                maxconn if maxconn is not None else int(os.getenv('PG_POOL_MAX', 10)),
+                database=database,
+                host=host,
+                user=user,
+                password=password,
+                port=port,
+            )
+            print('Connection pool to PG established.')
+        return _postgres_pools[key]
+
+
+@contextmanager
+def postgres_connection(database, host, user, password, port):
+    """
+    Check out a pooled connection for the duration of a `with` block.
+    """
+    with get_postgres_pool(database, host, user, password, port).connection() as connection:
+        yield connection
+
+
 def query_postgres(cursor, query):
     cursor.execute(query)
     cursor.connection.commit()
@@ -32,23 +135,416 @@ def query_postgres(cursor, query):
     # cursor.connection.close()
 
 
-def connect_to_minio(endpoint, access_key, secret_key):
-    try:
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def create_table_query(table_name: str, columns: dict, primary_key: str, partition_column: str = None) -> str:
+    """
+    Build a CREATE TABLE IF NOT EXISTS statement from a {column: PostgreSQL type} mapping,
+    with a SERIAL surrogate primary key in front. With `partition_column` the table is
+    list-partitioned on it, and the column joins the primary key as Postgres requires.
+    """
+    column_definitions = ",\n".join(
+        f"    {quote_identifier(name)} {sql_type}" for name, sql_type in columns.items()
+    )
+    if partition_column is None:
+        return (
+            f"CREATE TABLE IF NOT EXISTS {table_name} (\n"
+            f"    {primary_key} SERIAL PRIMARY KEY,\n"
+            f"{column_definitions}\n"
+            f");"
+        )
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table_name} (\n"
+        f"    {primary_key} SERIAL,\n"
+        f"{column_definitions},\n"
+        f"    PRIMARY KEY ({primary_key}, {quote_identifier(partition_column)})\n"
+        f") PARTITION BY LIST ({quote_identifier(partition_column)});"
+    )
+
+
+def season_partition_name(table_name: str, season: str) -> str:
+    return f"{table_name}_p{re.sub(r'[^0-9A-Za-z]', '_', season)}"
+
+
+def ensure_season_partitions(cursor, table_name: str, seasons):
+    """
+    Create the list partition of `table_name` for each season that doesn't have one yet.
+    """
+    for season in seasons:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {season_partition_name(table_name, season)} PARTITION OF {table_name} FOR VALUES IN (%s);",
+            (season,),
+        )
+
+
+def fill_missing_season(df: pd.DataFrame, partition_column: str = 'season') -> pd.DataFrame:
+    """
+    Return `df` with missing `partition_column` values set to `UNSCHEDULED_SEASON`, as they are
+    stored: the partition column is part of the primary key, so it can't hold NULLs.
+    """
+    if not df[partition_column].isna().any():
+        return df
+    return df.assign(**{partition_column: df[partition_column].fillna(UNSCHEDULED_SEASON)})
+
+
+def create_partitioned_table(cursor, table_name: str, columns: dict, primary_key: str, partition_column: str = 'season'):
+    """
+    Create `table_name` partitioned by `partition_column` if it doesn't exist: one list
+    partition per value (see `ensure_season_partitions`) plus a DEFAULT partition for values
+    that have none. The partition column is part of the primary key and can't be NULL; rows
+    without a season are stored as `UNSCHEDULED_SEASON` (see `fill_missing_season`).
+
+    An existing unpartitioned table is migrated in the same transaction: it is renamed
+    aside, its rows are copied into the new partitioned table (keeping their surrogate ids,
+    moving the sequence past them and labelling missing seasons), the views on it (e.g. the
+    dbt models) are re-pointed at the new table like in `swap_in_shadow_table`, and it is
+    dropped.
+    """
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (table_name,))
+    row = cursor.fetchone()
+    legacy_table = None
+    views = []
+    if row is not None and row[0] == 'r':
+        legacy_table = f"{table_name}__unpartitioned"
+        views = _dependent_views(cursor, table_name)
+        cursor.execute(f"ALTER TABLE {table_name} RENAME TO {legacy_table};")
+        _rename_table_relations(cursor, legacy_table, table_name, legacy_table)
+
+    cursor.execute(create_table_query(table_name, columns, primary_key, partition_column=partition_column))
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table_name}_pdefault PARTITION OF {table_name} DEFAULT;")
+
+    if legacy_table is not None:
+        partition = quote_identifier(partition_column)
+        cursor.execute(f"SELECT DISTINCT COALESCE({partition}, %s) FROM {legacy_table};", (UNSCHEDULED_SEASON,))
+        ensure_season_partitions(cursor, table_name, [value for (value,) in cursor.fetchall()])
+
+        column_list = ", ".join([primary_key] + [quote_identifier(name) for name in columns])
+        select_list = ", ".join(
+            [primary_key] + [f"COALESCE({partition}, %s)" if name == partition_column else quote_identifier(name) for name in columns]
+        )
+        cursor.execute(f"INSERT INTO {table_name} ({column_list}) SELECT {select_list} FROM {legacy_table};", (UNSCHEDULED_SEASON,))
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE((SELECT max({primary_key}) FROM {table_name}), 0) + 1, false);",
+            (table_name, primary_key),
+        )
+        _repoint_views(cursor, views)
+        cursor.execute(f"DROP TABLE {legacy_table};")
+        print(f"Migrated '{table_name}' to a table partitioned by {partition_column}.")
+
+    cursor.connection.commit()
+
+
+class _DataFrameCSVStream(io.RawIOBase):
+    """
+    File-like view of a DataFrame as CSV, rendered `chunk_size` rows at a time as COPY reads it.
+    """
+    def __init__(self, df: pd.DataFrame, columns: dict, chunk_size: int):
+        self._df = df
+        self._columns = columns
+        self._chunk_size = chunk_size
+        self._position = 0
+        self._chunk = io.BytesIO()
+
+    def readable(self):
+        return True
+
+    def _render_next_chunk(self) -> bytes:
+        chunk = self._df.iloc[self._position:self._position + self._chunk_size].reindex(columns=list(self._columns))
+        self._position += self._chunk_size
+        for name, sql_type in self._columns.items():
+            # INTEGER columns that picked up NaNs are floats in pandas; COPY rejects '1.0'
+            if sql_type == 'INTEGER' and pd.api.types.is_float_dtype(chunk[name]):
+                chunk[name] = chunk[name].round().astype('Int64')
+        return chunk.to_csv(index=False, header=False, na_rep='', quoting=csv.QUOTE_MINIMAL).encode()
+
+    def read(self, size=-1):
+        parts = []
+        remaining = size
+        while True:
+            data = self._chunk.read(remaining)
+            parts.append(data)
+            if size >= 0:
+                remaining -= len(data)
+                if remaining == 0:
+                    break
+            if self._position >= len(self._df):
+                break
+            self._chunk = io.BytesIO(self._render_next_chunk())
+        return b''.join(parts)
+
+
+def copy_dataframe_to_postgres(connection, df: pd.DataFrame, table_name: str, columns: dict, chunk_size: int = 50_000) -> int:
+    """
+    Bulk-load a DataFrame into `table_name` with COPY FROM STDIN and return the rows loaded.
+
+    `columns` is the table's {column: PostgreSQL type} definition: exactly those columns are
+    sent, in that order, and columns missing from the frame load as NULL. The CSV is rendered
+    lazily in chunks of `chunk_size` rows, so only one chunk is buffered next to the frame.
+    The caller owns the transaction; nothing is committed here.
+    """
+    column_list = ", ".join(quote_identifier(name) for name in columns)
+    copy_query = f"COPY {table_name} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '')"
+    with connection.cursor() as cursor:
+        cursor.copy_expert(copy_query, _DataFrameCSVStream(df, columns, chunk_size))
+        row_count = cursor.rowcount if cursor.rowcount >= 0 else len(df)
+    print(f"Copied {row_count} rows into '{table_name}'")
+    return row_count
+
+
+def upsert_dataframe_to_postgres(connection, df: pd.DataFrame, table_name: str, columns: dict, key_columns,
+                                 chunk_size: int = 50_000) -> dict:
+    """
+    Merge a DataFrame into `table_name` on its natural key and return
+    {'inserted', 'updated', 'unchanged'} row counts.
+
+    The frame is COPYed into a temporary staging table, then merged with
+    INSERT ... ON CONFLICT (key_columns) DO UPDATE. Rows whose values are identical to the
+    stored ones are skipped by the conflict WHERE clause, so only new and changed rows are
+    written. A unique index on `key_columns` must exist (see `create_natural_key_index`). The
+    staging table lives in the session's temporary schema. The caller owns the transaction.
+    """
+    # always qualified with pg_temp, so the drop can never hit a permanent table of that name
+    stage_table = f"pg_temp.{table_name.rsplit('.', 1)[-1]}__stage"
+    column_names = [quote_identifier(name) for name in columns]
+    key_names = [quote_identifier(name) for name in key_columns]
+    update_names = [name for name in column_names if name not in key_names]
+    column_list = ", ".join(column_names)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {stage_table};")
+        cursor.execute(f"CREATE TEMP TABLE {stage_table} ON COMMIT DROP AS SELECT {column_list} FROM {table_name} WITH NO DATA;")
+        staged = copy_dataframe_to_postgres(connection, df, stage_table, columns, chunk_size=chunk_size)
+
+        update_set = ", ".join(f"{name} = EXCLUDED.{name}" for name in update_names)
+        current_values = ", ".join(f"{table_name}.{name}" for name in update_names)
+        new_values = ", ".join(f"EXCLUDED.{name}" for name in update_names)
+        cursor.execute(f"""
+            WITH upserted AS (
+                INSERT INTO {table_name} ({column_list})
+                SELECT {column_list} FROM {stage_table}
+                ON CONFLICT ({", ".join(key_names)}) DO UPDATE SET {update_set}
+                WHERE ({current_values}) IS DISTINCT FROM ({new_values})
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted;
+        """)
+        inserted, updated = cursor.fetchone()
+
+    counts = {'inserted': inserted, 'updated': updated, 'unchanged': staged - inserted - updated}
+    print(f"Upserted into '{table_name}': {counts}")
+    return counts
+
+
+def create_natural_key_index(cursor, table_name: str, key_columns, primary_key: str):
+    """
+    Create the unique index on `key_columns` that `upsert_dataframe_to_postgres` conflicts on.
+
+    The index is NULLS NOT DISTINCT (Postgres 15+), so a row with a missing key component
+    conflicts with its stored copy instead of being inserted again on every upsert. Rows that
+    break the key in the existing table are deleted first, keeping the one with the highest
+    `primary_key` (the latest load). An index created without NULLS NOT DISTINCT is rebuilt.
+    The caller owns the transaction.
+    """
+    index_name = f"{table_name}_natural_key_idx"
+    key_list = ", ".join(quote_identifier(column) for column in key_columns)
+    cursor.execute("SELECT indnullsnotdistinct FROM pg_index WHERE indexrelid = to_regclass(%s);", (index_name,))
+    row = cursor.fetchone()
+    if row is not None and row[0]:
+        return
+    if row is not None:
+        cursor.execute(f"DROP INDEX {index_name};")
+
+    cursor.execute(f"""
+        DELETE FROM {table_name} WHERE {primary_key} IN (
+            SELECT {primary_key} FROM (
+                SELECT {primary_key}, ROW_NUMBER() OVER (PARTITION BY {key_list} ORDER BY {primary_key} DESC) AS copy
+                FROM {table_name}
+            ) copies WHERE copy > 1
+        );
+    """)
+    if cursor.rowcount > 0:
+        print(f"Deleted {cursor.rowcount} rows of '{table_name}' that duplicate a natural key.")
+    cursor.execute(f"CREATE UNIQUE INDEX {index_name} ON {table_name} ({key_list}) NULLS NOT DISTINCT;")
+
+
+def _rename_table_relations(cursor, table_name: str, from_prefix: str, to_prefix: str):
+    # rename the indexes (incl. the primary key constraint), owned sequences and partitions
+    # (recursively, with their own indexes) of a table so their names follow it through a swap
+    cursor.execute("""
+        SELECT 'INDEX', c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass
+        UNION ALL
+        SELECT 'SEQUENCE', c.relname FROM pg_depend d JOIN pg_class c ON c.oid = d.objid
+        WHERE d.refobjid = %s::regclass AND c.relkind = 'S' AND d.deptype = 'a'
+        UNION ALL
+        SELECT 'TABLE', c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass;
+    """, (table_name, table_name, table_name))
+    for kind, name in cursor.fetchall():
+        if not name.startswith(from_prefix):
+            continue
+        new_name = to_prefix + name[len(from_prefix):]
+        cursor.execute(f"ALTER {kind} {quote_identifier(name)} RENAME TO {quote_identifier(new_name)};")
+        if kind == 'TABLE':
+            _rename_table_relations(cursor, new_name, from_prefix, to_prefix)
+
+
+def _dependent_views(cursor, table_name: str) -> list:
+    # (name, definition) of the views selecting from a table, with the definitions rendered
+    # while the table still has its name. Materialized views can't be re-pointed in place.
+    cursor.execute("""
+        SELECT DISTINCT c.oid, c.oid::regclass::text, c.relkind, pg_get_viewdef(c.oid)
+        FROM pg_depend d JOIN pg_rewrite r ON r.oid = d.objid JOIN pg_class c ON c.oid = r.ev_class
+        WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = %s::regclass AND c.oid <> d.refobjid
+        ORDER BY c.oid;
+    """, (table_name,))
+    views = []
+    for _, name, kind, definition in cursor.fetchall():
+        if kind != 'v':
+            raise ValueError(f"Cannot swap '{table_name}': materialized view {name} depends on it")
+        views.append((name, definition))
+    return views
+
+
+def _repoint_views(cursor, views: list):
+    # Postgres binds views to the table, not its name, so after a rename they still read the
+    # renamed table; recreating them from their definitions binds them to the table now named so
+    for name, definition in views:
+        cursor.execute(f"CREATE OR REPLACE VIEW {name} AS {definition}")
+
+
+def swap_in_shadow_table(connection, table_name: str, shadow_table: str, lock_timeout: str = '5s'):
+    """
+    Atomically replace `table_name` with a fully loaded and indexed `shadow_table`.
+
+    Inside one transaction the live table is renamed to `<table>__old` (replacing the
+    previous one), the shadow table takes its name, and their indexes and sequences are
+    renamed along. Readers see either the old or the new table, never a partial one, and
+    only wait for the brief rename locks; `lock_timeout` bounds that wait. Views on the table
+    (e.g. the dbt models over the staging tables) are re-pointed at the new table in the same
+    transaction, so `<table>__old` is left without dependents; a materialized view on it stops
+    the swap. `rollback_shadow_swap` swaps the old table back.
+    """
+    old_table = f"{table_name}__old"
+    with connection.cursor() as cursor:
+        cursor.execute(f"SET LOCAL lock_timeout = '{lock_timeout}';")
+        views = _dependent_views(cursor, table_name)
+        cursor.execute(f"DROP TABLE IF EXISTS {old_table};")
+        cursor.execute(f"ALTER TABLE {table_name} RENAME TO {old_table};")
+        _rename_table_relations(cursor, old_table, table_name, old_table)
+        cursor.execute(f"ALTER TABLE {shadow_table} RENAME TO {table_name};")
+        _rename_table_relations(cursor, table_name, shadow_table, table_name)
+        _repoint_views(cursor, views)
+    connection.commit()
+    print(f"Swapped '{shadow_table}' in as '{table_name}', previous version kept as '{old_table}'.")
+
+
+def rollback_shadow_swap(connection, table_name: str, lock_timeout: str = '5s'):
+    """
+    Undo the last `swap_in_shadow_table` by swapping `<table>__old` back in, views included.
+    The rolled back table is kept as `<table>__old` in turn.
+    """
+    old_table = f"{table_name}__old"
+    swap_table = f"{table_name}__rollback"
+    with connection.cursor() as cursor:
+        cursor.execute(f"SET LOCAL lock_timeout = '{lock_timeout}';")
+        views = _dependent_views(cursor, table_name)
+        cursor.execute(f"ALTER TABLE {table_name} RENAME TO {swap_table};")
+        _rename_table_relations(cursor, swap_table, table_name, swap_table)
+        cursor.execute(f"ALTER TABLE {old_table} RENAME TO {table_name};")
+        _rename_table_relations(cursor, table_name, old_table, table_name)
+        cursor.execute(f"ALTER TABLE {swap_table} RENAME TO {old_table};")
+        _rename_table_relations(cursor, old_table, swap_table, old_table)
+        _repoint_views(cursor, views)
+    connection.commit()
+    print(f"Rolled '{table_name}' back to its previous version.")
+
+
+def record_ingestion_run(cursor, table_name: str, row_count: int, runs_table: str = INGESTION_RUNS_TABLE) -> int:
+    """
+    Append a row for a completed load of `table_name` to `runs_table` (created if needed) and
+    return its run id. Run it in the transaction that publishes the data, so readers never see
+    a run before its data.
+    """
+    cursor.execute(create_table_query(runs_table, INGESTION_RUNS_COLUMNS, INGESTION_RUNS_PRIMARY_KEY))
+    cursor.execute(
+        f"INSERT INTO {runs_table} (table_name, row_count, finished_at) VALUES (%s, %s, now()) RETURNING {INGESTION_RUNS_PRIMARY_KEY};",
+        (table_name, row_count),
+    )
+    return cursor.fetchone()[0]
+
+
+_minio_clients = {}
+_minio_clients_lock = threading.Lock()
+
+
+def _build_minio_http_client(max_pool_size: int) -> urllib3.PoolManager:
+    return urllib3.PoolManager(
+        maxsize=max_pool_size,  # keep-alive connections per host, matched to fetch concurrency
+        timeout=urllib3.Timeout(connect=10, read=300),
+        cert_reqs='CERT_NONE', # TODO - make these work with true
+        retries=urllib3.Retry(
+            total=5,
+            backoff_factor=0.2,
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=None,  # MinIO requests are idempotent, retry all of them
+        ),
+    )
+
+
+def get_minio_client(endpoint, access_key, secret_key, max_pool_size=None):
+    """
+    Return the process-wide MinIO client for these credentials, creating it on first use.
+
+    Every client shares one urllib3 PoolManager with keep-alive connections, retries with
+    exponential backoff on connection errors and 5xx responses, and a pool of
+    `max_pool_size` connections (MINIO_MAX_POOL_SIZE, default 16). A caller that needs more
+    concurrency than the registered pool allows gets a client with a larger pool.
+    """
+    pool_size = max(max_pool_size or 0, int(os.getenv('MINIO_MAX_POOL_SIZE', 16)))
+    key = (endpoint, access_key, secret_key)
+    with _minio_clients_lock:
+        registered = _minio_clients.get(key)
+        if registered is not None and registered[1] >= pool_size:
+            return registered[0]
+
         client = Minio(endpoint,
                         access_key=access_key, # user id
                         secret_key=secret_key, # service password
                         secure=False, # TODO - make these work with true
-                        cert_check=False,
+                        http_client=_build_minio_http_client(pool_size),
                     )
-        
-        
-        print('Connected to MinIO')
+        _minio_clients[key] = (client, pool_size)
+        print(f'Connected to MinIO (pool size {pool_size})')
         return client
+
+
+def connect_to_minio(endpoint, access_key, secret_key):
+    try:
+        return get_minio_client(endpoint, access_key, secret_key)
     
     except S3Error as e:
         print("S3 Error: ", e)
         return None
 
+def _content_type(file_path: str) -> str:
+    # Determine the content type based on the file extension
+    content_type = 'application/octet-stream'
+    if file_path.endswith('.py'):
+        content_type = 'text/x-python'
+    elif file_path.endswith('.csv'):
+        content_type = 'text/csv'
+    elif file_path.endswith('.json'):
+        content_type = 'application/json'
+    elif file_path.endswith('.txt'):
+        content_type = 'text/plain'
+    elif file_path.endswith('.parquet'):
+        content_type = 'application/vnd.apache.parquet'
+    # Add more content types as needed
+    return content_type
+
 def upload_to_minio(client: Minio, file_path: str, destination_bucket: str, destination_folder_path: str=""):
     if client is None:
         print("Failed to connect to MinIO")
@@ -62,17 +558,7 @@ def upload_to_minio(client: Minio, file_path: str, destination_bucket: str, dest
             client.make_bucket(bucket_name)
             print(f"Created bucket '{bucket_name}'")
 
-        # Determine the content type based on the file extension
-        content_type = 'application/octet-stream'
-        if file_path.endswith('.py'):
-            content_type = 'text/x-python'
-        elif file_path.endswith('.csv'):
-            content_type = 'text/csv'
-        elif file_path.endswith('.json'):
-            content_type = 'application/json'
-        elif file_path.endswith('.txt'):
-            content_type = 'text/plain'
-        # Add more content types as needed
+        content_type = _content_type(file_path)
 
         with open(file_path, 'rb') as file_data:
             file_size = os.path.getsize(file_path)
@@ -93,24 +579,586 @@ def upload_to_minio(client: Minio, file_path: str, destination_bucket: str, dest
         print("Error: ", e)
 
 
-def fetch_from_minio(endpoint, access_key, secret_key, object_name):
-    client = connect_to_minio(endpoint, access_key, secret_key)
+def _local_etag(file_path: str, part_size: int) -> str:
+    """
+    Compute the ETag MinIO assigns to a file uploaded with `part_size`: the MD5 of the body
+    for single-part uploads, or the MD5 of the concatenated part MD5s plus '-<parts>' for
+    multipart uploads.
+    """
+    part_digests = []
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(part_size), b''):
+            part_digests.append(hashlib.md5(chunk).digest())
+
+    if len(part_digests) <= 1:
+        return part_digests[0].hex() if part_digests else hashlib.md5(b'').hexdigest()
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+
+def _resolve_upload_paths(paths) -> list:
+    if isinstance(paths, (list, tuple)):
+        return [os.path.abspath(path) for path in paths]
+    if os.path.isdir(paths):
+        return sorted(
+            os.path.join(root, name) for root, _, files in os.walk(paths) for name in files
+        )
+    return sorted(os.path.abspath(path) for path in glob.glob(paths, recursive=True) if os.path.isfile(path))
+
 
+def upload_batch_to_minio(client: Minio, paths, destination_bucket: str, destination_folder_path: str = "",
+                          max_workers: int = 4, part_size: int = 16 * 1024 ** 2, num_parallel_uploads: int = 4,
+                          skip_unchanged: bool = True, remove_local: bool = False) -> list:
+    """
+    Upload a directory, glob pattern or list of files to a bucket concurrently.
+
+    The bucket is checked once for the whole batch and listed once to get the remote ETags;
+    files whose ETag already matches the remote object are skipped. Files larger than
+    `part_size` go up as multipart uploads with `num_parallel_uploads` parts in flight, on
+    top of `max_workers` files uploading at once. Files from a directory keep their path
+    relative to it. Returns one summary dict per file with status, bytes, seconds and MB/s.
+    """
     if client is None:
         print("Failed to connect to MinIO")
+        return []
+
+    file_paths = _resolve_upload_paths(paths)
+    base_dir = os.path.abspath(paths) if isinstance(paths, str) and os.path.isdir(paths) else None
+
+    def object_name_for(file_path):
+        relative_path = os.path.relpath(file_path, base_dir) if base_dir else os.path.basename(file_path)
+        return os.path.join(destination_folder_path, relative_path).replace("\\", "/")
+
+    if not client.bucket_exists(destination_bucket):
+        client.make_bucket(destination_bucket)
+        print(f"Created bucket '{destination_bucket}'")
+
+    remote_etags = {}
+    if skip_unchanged:
+        prefix = destination_folder_path or None
+        remote_etags = {obj.object_name: obj.etag for obj in client.list_objects(destination_bucket, prefix=prefix, recursive=True)}
+
+    def upload_one(file_path):
+        object_name = object_name_for(file_path)
+        file_size = os.path.getsize(file_path)
+        summary = {'file': file_path, 'object_name': object_name, 'bytes': file_size, 'seconds': 0.0, 'mb_per_s': 0.0}
+
+        remote_etag = remote_etags.get(object_name)
+        if remote_etag and remote_etag.strip('"') == _local_etag(file_path, part_size):
+            summary['status'] = 'skipped'
+            return summary
+
+        start = time.perf_counter()
+        client.fput_object(
+            destination_bucket, object_name, file_path, content_type=_content_type(file_path),
+            part_size=part_size, num_parallel_uploads=num_parallel_uploads,
+        )
+        elapsed = time.perf_counter() - start
+        summary.update(status='uploaded', seconds=elapsed, mb_per_s=file_size / 1024 ** 2 / elapsed if elapsed else 0.0)
+
+        if remove_local:
+            os.remove(file_path)
+        return summary
+
+    summaries = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(upload_one, file_path): file_path for file_path in file_paths}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {'file': file_path, 'object_name': object_name_for(file_path), 'status': 'failed',
+                           'bytes': os.path.getsize(file_path), 'seconds': 0.0, 'mb_per_s': 0.0, 'error': str(e)}
+            summaries.append(summary)
+            print(f"{summary['status'].capitalize()} '{summary['object_name']}' ({summary['bytes']} bytes, {summary['mb_per_s']:.1f} MB/s)")
+
+    summaries.sort(key=lambda summary: summary['file'])
+    uploaded = [summary for summary in summaries if summary['status'] == 'uploaded']
+    total_bytes = sum(summary['bytes'] for summary in uploaded)
+    print(f"Batch upload to '{destination_bucket}': {len(uploaded)} uploaded, "
+          f"{sum(summary['status'] == 'skipped' for summary in summaries)} skipped, "
+          f"{sum(summary['status'] == 'failed' for summary in summaries)} failed, {total_bytes} bytes.")
+    return summaries
+
+
+def coerce_columns(df: pd.DataFrame, column_types: dict) -> pd.DataFrame:
+    """
+    Coerce columns to 'numeric', 'int' (nullable Int64), 'float', 'datetime' or 'boolean'.
+    Missing columns are ignored and columns that already have the target type (e.g. when read
+    from typed Parquet) are left untouched, so the coercion costs nothing on typed input.
+    """
+    for column, dtype in column_types.items():
+        if column not in df.columns:
+            continue
+        series = df[column]
+        if dtype == 'numeric':
+            if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                df[column] = pd.to_numeric(series, errors='coerce')
+        elif dtype == 'int':
+            if series.dtype != 'Int64':
+                df[column] = pd.to_numeric(series, errors='coerce').astype('Int64')
+        elif dtype == 'float':
+            if not pd.api.types.is_float_dtype(series):
+                df[column] = pd.to_numeric(series, errors='coerce')
+        elif dtype == 'datetime':
+            if not pd.api.types.is_datetime64_any_dtype(series):
+                df[column] = pd.to_datetime(series, errors='coerce')
+        elif dtype == 'boolean':
+            if not pd.api.types.is_bool_dtype(series):
+                df[column] = series.astype(bool)
+    return df
+
+
+def _fits_float32(series: pd.Series) -> bool:
+    # float32 is safe when every distinct value reads back from its float32 text form unchanged,
+    # e.g. 2.3 (written to CSV as '2.3') but not 1/3 ('0.33333334')
+    values = series.dropna().unique().astype('float64')
+    return bool(np.array_equal(values.astype('float32').astype(str).astype('float64'), values))
+
+
+def compact_dtypes(df: pd.DataFrame, categorical_columns=None, max_category_ratio: float = 0.5) -> pd.DataFrame:
+    """
+    Shrink a DataFrame's memory footprint before it is loaded or handed to model code, and
+    print its memory usage before and after.
+
+    String columns become categoricals (one copy of each distinct value plus small integer
+    codes): the `categorical_columns` if given, otherwise every string column whose distinct
+    values are at most `max_category_ratio` of its rows. Integer columns, nullable ones
+    included, are downcast to the smallest integer type that holds their range, and float
+    columns to float32 when that keeps every value exactly as it is written out (typical for
+    the one-decimal FPL stats). Boolean and datetime columns are left alone.
+    """
+    before = df.memory_usage(deep=True).sum()
+    df = df.copy(deep=False)
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            if series.dtype != 'float32' and _fits_float32(series):
+                df[column] = series.astype('float32')
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if categorical_columns is not None:
+                if column in categorical_columns:
+                    df[column] = series.astype('category')
+            elif series.nunique(dropna=True) <= max_category_ratio * len(series):
+                df[column] = series.astype('category')
+
+    after = df.memory_usage(deep=True).sum()
+    print(f"Compacted dtypes: {before / 2**20:.1f} MiB -> {after / 2**20:.1f} MiB ({len(df)} rows)")
+    return df
+
+
+def _polars_cast(column: str, source_dtype, dtype: str) -> pl.Expr:
+    expr = pl.col(column)
+    is_text = source_dtype == pl.Utf8
+    if dtype in ('numeric', 'float'):
+        return expr.cast(pl.Float64, strict=False)
+    if dtype == 'int':
+        # go through Float64 so text like '1.0' parses the way pd.to_numeric does
+        return expr.cast(pl.Float64, strict=False).cast(pl.Int64, strict=False) if is_text else expr.cast(pl.Int64, strict=False)
+    if dtype == 'datetime':
+        return expr.str.to_datetime(strict=False, time_zone='UTC') if is_text else expr.cast(pl.Datetime('us', 'UTC'), strict=False)
+    if dtype == 'boolean':
+        return expr.str.to_lowercase().is_in(['true', '1', '1.0']) if is_text else expr.cast(pl.Boolean, strict=False)
+    if dtype == 'str':
+        return expr.cast(pl.Utf8, strict=False)
+    raise ValueError(f"Unknown column type '{dtype}' for column '{column}'")
+
+
+def cast_polars_columns(lf: pl.LazyFrame, column_types: dict) -> pl.LazyFrame:
+    """
+    Polars counterpart of `coerce_columns`, adding a 'str' type. Text columns (e.g. from a CSV
+    scanned without schema inference) are parsed; typed columns (from Parquet) are cast, so
+    sources with different physical types end up with one schema. Missing columns are ignored.
+    """
+    schema = lf.collect_schema()
+    casts = [_polars_cast(column, schema[column], dtype) for column, dtype in column_types.items() if column in schema]
+    return lf.with_columns(casts) if casts else lf
+
+
+# Month in which a new Premier League season starts; fixtures before it belong to the previous season
+SEASON_CUTOVER_MONTH = 7
+
+# Season stored for rows without a kickoff time, e.g. postponed fixtures that have no new date yet
+UNSCHEDULED_SEASON = 'unscheduled'
+
+
+def _polars_season_label(kickoff_time: pl.Expr, cutover_month: int) -> pl.Expr:
+    start_year = kickoff_time.dt.year() - (kickoff_time.dt.month() < cutover_month).cast(pl.Int32)
+    end_year = ((start_year + 1) % 100).cast(pl.Utf8).str.zfill(2)
+    # pl.format yields null when any input is null, so a null kickoff gives a null season
+    return pl.format("{}-{}", start_year, end_year).alias('season')
+
+
+def derive_season(kickoff_time, cutover_month: int = SEASON_CUTOVER_MONTH):
+    """
+    Label each kickoff time with its season, e.g. '2024-25' for both 2024-08-16 and 2025-05-25.
+
+    Works on a pandas Series, a Polars Series or a Polars expression and returns the same kind
+    of object. Kickoffs in or after `cutover_month` start a new season. Missing kickoff times
+    (NaT / null) get a missing season instead of a made-up label.
+    """
+    if not 1 <= cutover_month <= 12:
+        raise ValueError(f"cutover_month must be between 1 and 12, got {cutover_month}")
+
+    if isinstance(kickoff_time, pl.Expr):
+        return _polars_season_label(kickoff_time, cutover_month)
+    if isinstance(kickoff_time, pl.Series):
+        return kickoff_time.to_frame().select(
+            _polars_season_label(pl.col(kickoff_time.name), cutover_month)
+        ).to_series()
+
+    if not pd.api.types.is_datetime64_any_dtype(kickoff_time):
+        kickoff_time = pd.to_datetime(kickoff_time, errors='coerce', utc=True)
+    start_year = kickoff_time.dt.year - (kickoff_time.dt.month < cutover_month)
+    end_year = ((start_year + 1) % 100).astype('Int64').astype(str).str.zfill(2)
+    labels = start_year.astype('Int64').astype(str) + '-' + end_year
+    return labels.where(kickoff_time.notna(), None).rename('season')
+
+
+def map_partitions(df: pd.DataFrame, partition_key, func, *args, max_workers: int = 1) -> pd.DataFrame:
+    """
+    Apply `func(partition, *args)` to each partition of `df` by `partition_key` (a Series or
+    array aligned with the rows) and concatenate the results in sorted key order, missing keys
+    last, so the output doesn't depend on scheduling.
+
+    With more than one worker the partitions are transformed in a process pool; `max_workers=0`
+    uses every CPU. Workers are spawned rather than forked, which is safe next to the thread
+    pools of Polars and pyarrow, so `func` must be a picklable module-level function.
+    """
+    key = partition_key.to_numpy() if isinstance(partition_key, pd.Series) else partition_key
+    partitions = [partition for _, partition in df.groupby(key, sort=True, dropna=False)]
+    if not partitions:
+        return func(df, *args)
+
+    workers = min(max_workers or os.cpu_count() or 1, len(partitions))
+    if workers <= 1:
+        results = [func(partition, *args) for partition in partitions]
+    else:
+        print(f"Transforming {len(partitions)} partitions on {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            # map returns results in submission order, whichever worker finishes first
+            results = list(executor.map(func, partitions, *[[arg] * len(partitions) for arg in args]))
+    return pd.concat(results)
+
+
+def upload_csv_as_parquet(client: Minio, file_path: str, destination_bucket: str, column_types: dict = None,
+                          destination_folder_path: str = "", row_group_size: int = 10_000):
+    """
+    Convert a CSV to typed Parquet and upload it partitioned by season.
+
+    Columns are typed with `coerce_columns(column_types)` and the rows are sorted by
+    kickoff_time, so the row-group statistics let readers prune on time. One object is
+    written per season under `<folder>/season=<season>/<name>.parquet`. Returns the
+    uploaded object names.
+    """
+    if client is None:
+        print("Failed to connect to MinIO")
+        return []
+
+    df = coerce_columns(pd.read_csv(file_path), column_types or {})
+    if 'kickoff_time' in df.columns and pd.api.types.is_datetime64_any_dtype(df['kickoff_time']):
+        df = df.sort_values('kickoff_time', kind='stable', ignore_index=True)
+        seasons = derive_season(df['kickoff_time']).fillna('unknown')
+    else:
+        seasons = pd.Series('unknown', index=df.index)
+
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    uploaded = []
+    try:
+        if not client.bucket_exists(destination_bucket):
+            client.make_bucket(destination_bucket)
+            print(f"Created bucket '{destination_bucket}'")
+
+        for season, season_df in df.groupby(seasons, sort=True):
+            buffer = io.BytesIO()
+            table = pa.Table.from_pandas(season_df, preserve_index=False)
+            pq.write_table(table, buffer, row_group_size=row_group_size, compression='zstd')
+            size = buffer.tell()
+            buffer.seek(0)
+
+            object_name = os.path.join(destination_folder_path, f"season={season}", f"{base_name}.parquet").replace("\\", "/")
+            client.put_object(destination_bucket, object_name, buffer, size, content_type='application/vnd.apache.parquet')
+            uploaded.append(object_name)
+            print(f"Uploaded '{object_name}' ({len(season_df)} rows) to bucket '{destination_bucket}'")
+
+    except S3Error as e:
+        print("S3 Error: ", e)
+    except Exception as e:
+        print("Error: ", e)
+
+    return uploaded
+
+
+class MinioObjectCache:
+    """
+    Content-addressed on-disk cache for MinIO object bodies.
+
+    Entries are keyed by (bucket, object name, ETag), so a re-uploaded object gets a new
+    key and stale bodies are never served. The cache is bounded to `max_bytes`: the total
+    size is kept as a running count, and only once a `put` takes it past the bound is the
+    directory scanned and the least recently used entries (by file mtime, refreshed on every
+    hit) evicted, down to `evict_to` of the bound so the next puts don't scan again. Hit and
+    miss counters are kept for reporting what the cache saves.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3, evict_to: float = 0.9):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.evict_to = evict_to
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, bucket_name: str, object_name: str, etag: str) -> str:
+        etag = etag.strip('"')
+        key = hashlib.sha256(f"{bucket_name}/{object_name}@{etag}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, bucket_name: str, object_name: str, etag: str):
+        """
+        Return the local path of a cached object body, or None on a miss.
+        """
+        path = self._path(bucket_name, object_name, etag)
+        try:
+            os.utime(path)  # mark as recently used
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += size
+        return path
+
+    def put(self, bucket_name: str, object_name: str, etag: str, data: bytes) -> str:
+        """
+        Store an object body and return its local path, evicting old entries if needed.
+        """
+        tmp_path = self.temp_path(bucket_name, object_name, etag)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        return self.put_file(bucket_name, object_name, etag, tmp_path)
+
+    def temp_path(self, bucket_name: str, object_name: str, etag: str) -> str:
+        """
+        Return a unique scratch path next to the entry, for writing a body while it streams in.
+        """
+        path = self._path(bucket_name, object_name, etag)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{uuid.uuid4().hex}.tmp"
+
+    def put_file(self, bucket_name: str, object_name: str, etag: str, tmp_path: str) -> str:
+        """
+        Move a fully written scratch file into the cache and return the entry's path.
+        """
+        path = self._path(bucket_name, object_name, etag)
+        size = os.path.getsize(tmp_path)
+        with self._lock:
+            try:
+                self._total_bytes -= os.path.getsize(path)  # an entry written concurrently
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+            self._total_bytes += size
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+        return path
+
+    def _entries(self) -> list:
+        # (mtime, size, path) of every entry; a full directory scan
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in `evict_to` of `max_bytes`.
+        The scan also resyncs the running size, e.g. with entries another process wrote.
+        """
+        with self._lock:
+            entries = self._entries()
+            total_size = sum(size for _, size, _ in entries)
+            target = self.max_bytes * self.evict_to
+            for _, size, path in sorted(entries):
+                if total_size <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total_size -= size
+                except FileNotFoundError:
+                    pass
+            self._total_bytes = total_size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+# Default of the `cache` arguments: use `get_default_cache()`. None turns the cache off for a call.
+DEFAULT_CACHE = object()
+
+
+def get_default_cache():
+    """
+    Return the process-wide object cache configured by MINIO_CACHE_DIR and
+    MINIO_CACHE_MAX_BYTES, or None when MINIO_CACHE_DIR is unset or empty: the cache is
+    opt-in, e.g. MINIO_CACHE_DIR=~/.cache/fpl/minio.
+    """
+    global _default_cache
+    cache_dir = os.path.expanduser(os.getenv('MINIO_CACHE_DIR', ''))
+    if not cache_dir:
         return None
+    with _default_cache_lock:
+        if _default_cache is None or _default_cache.cache_dir != cache_dir:
+            max_bytes = int(os.getenv('MINIO_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+            _default_cache = MinioObjectCache(cache_dir, max_bytes=max_bytes)
+        return _default_cache
 
-    bucket_name = 'hemnet-listings'
 
+class _TeeReader(io.RawIOBase):
+    """
+    Read-only stream over an HTTP response that copies every chunk it hands out to `sink`,
+    so a body can be parsed and written to the cache in the same pass.
+    """
+    def __init__(self, raw, sink):
+        self._raw = raw
+        self._sink = sink
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._raw.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        if self._sink is not None:
+            self._sink.write(data)
+        return n
+
+
+def read_csv_from_minio(client: Minio, bucket_name: str, object_name: str, usecols=None, dtype=None,
+                        etag=None, cache=None) -> pd.DataFrame:
+    """
+    Parse a CSV object straight from the MinIO response without buffering the whole body.
+
+    The parser reads the response stream in blocks as it arrives, so the raw body is never
+    held next to the DataFrame. `usecols` and `dtype` are passed to `pd.read_csv`, so unused
+    columns are skipped while parsing instead of being dropped afterwards. When a cache and
+    ETag are given, hits are parsed from the local file and misses are written to the cache
+    while they stream in.
+    """
+    read_kwargs = {'usecols': usecols, 'dtype': dtype}
+
+    if cache is not None and etag:
+        cached_path = cache.get(bucket_name, object_name, etag)
+        if cached_path is not None:
+            return pd.read_csv(cached_path, **read_kwargs)
+
+    tmp_path = cache.temp_path(bucket_name, object_name, etag) if cache is not None and etag else None
+    response = client.get_object(bucket_name, object_name)
     try:
-        response = client.get_object(bucket_name, object_name)
-        data = response.read()
+        with open(tmp_path, 'wb') if tmp_path else nullcontext() as sink:
+            df = pd.read_csv(io.BufferedReader(_TeeReader(response, sink)), **read_kwargs)
+            if sink is not None:
+                # drain whatever the parser did not need (e.g. a trailing newline) so the cached body is complete
+                for chunk in iter(lambda: response.read(64 * 1024), b''):
+                    sink.write(chunk)
+    except Exception:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        response.close()
         response.release_conn()
+
+    if tmp_path:
+        cache.put_file(bucket_name, object_name, etag, tmp_path)
+    return df
+
+
+def _cached_object_path(client: Minio, bucket_name: str, object_name: str, etag: str, cache) -> str:
+    cached_path = cache.get(bucket_name, object_name, etag)
+    if cached_path is not None:
+        return cached_path
+
+    tmp_path = cache.temp_path(bucket_name, object_name, etag)
+    response = client.get_object(bucket_name, object_name)
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in iter(lambda: response.read(64 * 1024), b''):
+                f.write(chunk)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        response.close()
+        response.release_conn()
+    return cache.put_file(bucket_name, object_name, etag, tmp_path)
+
+
+def read_parquet_from_minio(client: Minio, bucket_name: str, object_name: str, columns=None, filters=None,
+                            etag=None, cache=None) -> pd.DataFrame:
+    """
+    Read a Parquet object, decoding only the requested columns and the row groups whose
+    statistics can satisfy `filters` (pyarrow syntax, e.g. [('kickoff_time', '>=', ts)]).
+    `columns` is a list or a predicate on column names, like `usecols` for CSVs. Parquet
+    needs random access, so the body is read from the disk cache when one is given.
+    """
+    if cache is not None and etag:
+        source = _cached_object_path(client, bucket_name, object_name, etag, cache)
+    else:
+        response = client.get_object(bucket_name, object_name)
+        try:
+            source = io.BytesIO(response.read())
+        finally:
+            response.close()
+            response.release_conn()
+
+    if callable(columns):
+        columns = [name for name in pq.read_schema(source).names if columns(name)]
+    return pq.read_table(source, columns=columns, filters=filters).to_pandas()
+
+
+def fetch_from_minio(endpoint, access_key, secret_key, object_name, cache=DEFAULT_CACHE, usecols=None, dtype=None):
+    client = get_minio_client(endpoint, access_key, secret_key)
+
+    if client is None:
+        print("Failed to connect to MinIO")
+        return None
+
+    bucket_name = 'hemnet-listings'
+    cache = get_default_cache() if cache is DEFAULT_CACHE else cache
+
+    try:
+        etag = client.stat_object(bucket_name, object_name).etag if cache is not None else None
+        df = read_csv_from_minio(client, bucket_name, object_name, usecols=usecols, dtype=dtype, etag=etag, cache=cache)
         print(f"Fetched '{object_name}' from bucket '{bucket_name}'")
-        
-        # Convert bytes data to a pandas DataFrame
-        data_stream = io.BytesIO(data)
-        df = pd.read_csv(data_stream)
         return df
 
     except S3Error as e:
@@ -120,33 +1168,219 @@ def fetch_from_minio(endpoint, access_key, secret_key, object_name):
         print("Error: ", e)
         return None
     
-def fetch_all_from_minio(endpoint, access_key, secret_key, bucket_name=''):
-    client = connect_to_minio(endpoint, access_key, secret_key)
+def read_object_from_minio(client: Minio, bucket_name: str, object_name: str, etag=None, cache=None,
+                           usecols=None, dtype=None, filters=None) -> pd.DataFrame:
+    """
+    Read one CSV or Parquet object (by its '.parquet' extension) with `read_csv_from_minio` or
+    `read_parquet_from_minio`; `usecols` is the column projection of either.
+    """
+    if object_name.endswith('.parquet'):
+        return read_parquet_from_minio(client, bucket_name, object_name, columns=usecols, filters=filters, etag=etag, cache=cache)
+    return read_csv_from_minio(client, bucket_name, object_name, usecols=usecols, dtype=dtype, etag=etag, cache=cache)
+
+
+def fetch_all_from_minio(endpoint, access_key, secret_key, bucket_name='', max_workers=8, return_errors=False,
+                         object_names=None, cache=DEFAULT_CACHE, usecols=None, dtype=None, filters=None):
+    """
+    Fetch every object in a bucket and return a {object_name: DataFrame} mapping.
+
+    Objects are downloaded and parsed concurrently on a bounded pool of `max_workers`
+    threads (1 gives the old sequential behaviour). A failing object no longer discards
+    the whole fetch: the error is reported for that object and the other objects are
+    still returned. With `return_errors=True` a (dataframes, errors) tuple is returned,
+    where errors maps object names to the exception raised for them. Pass `object_names`
+    to fetch only those objects instead of the whole bucket. Bodies are read through the
+    on-disk object cache (`cache`, defaulting to `get_default_cache()`; None reads every body
+    from MinIO), keyed by ETag, and
+    parsed straight from the response stream; `usecols` and `dtype` are passed
+    on to `read_csv_from_minio`. `.parquet` objects are read with `read_parquet_from_minio`,
+    using `usecols` as the column projection and `filters` for row-group pruning.
+    """
+    client = get_minio_client(endpoint, access_key, secret_key, max_pool_size=max_workers)
 
     if client is None:
         print("Failed to connect to MinIO")
         return None
 
-    dataframes = {}
+    cache = get_default_cache() if cache is DEFAULT_CACHE else cache
 
+    # a single listing gives the ETags the cache is keyed on
     try:
-        objects = client.list_objects(bucket_name, recursive=True)
-        for obj in objects:
-            response = client.get_object(bucket_name, obj.object_name)
-            data = response.read()
-            response.release_conn()
-            
-            # Convert bytes data to a pandas DataFrame
-            data_stream = io.BytesIO(data)
-            df = pd.read_csv(data_stream)
-            dataframes[obj.object_name] = df
-            print(f"Fetched '{obj.object_name}' from bucket '{bucket_name}'")
+        etags = {obj.object_name: getattr(obj, 'etag', None) for obj in client.list_objects(bucket_name, recursive=True)}
+    except S3Error as e:
+        print("S3 Error: ", e)
+        return None
+    except Exception as e:
+        print("Error: ", e)
+        return None
+
+    if object_names is None:
+        object_names = list(etags)
+
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(
+                read_object_from_minio, client, bucket_name, object_name, etags.get(object_name), cache,
+                usecols=usecols, dtype=dtype, filters=filters,
+            ): object_name
+            for object_name in object_names
+        }
+        for future in as_completed(futures):
+            object_name = futures[future]
+            try:
+                results[object_name] = future.result()
+                print(f"Fetched '{object_name}' from bucket '{bucket_name}'")
+            except Exception as e:
+                errors[object_name] = e
+                print(f"Error fetching '{object_name}' from bucket '{bucket_name}': {e}")
+
+    if errors:
+        print(f"Failed to fetch {len(errors)} of {len(object_names)} objects from bucket '{bucket_name}'")
+    if cache is not None:
+        print(f"MinIO cache stats: {cache.stats()}")
 
+    # keep the listing order so downstream concatenation stays deterministic
+    dataframes = {name: results[name] for name in object_names if name in results}
+
+    if return_errors:
+        return dataframes, errors
+    return dataframes
+
+
+def _scan_source(source, is_parquet: bool) -> pl.LazyFrame:
+    if is_parquet:
+        return pl.scan_parquet(source)
+    return pl.scan_csv(source, infer_schema=False)
+
+
+def scan_sources(sources: list, columns=None, column_types: dict = None) -> pl.LazyFrame:
+    """
+    Build one Polars LazyFrame over CSV and Parquet sources.
+
+    Each source is a path (the format follows the '.parquet' extension) or a
+    `(path_or_bytes, is_parquet)` pair. CSVs are scanned without schema inference and every
+    source is typed with `cast_polars_columns(column_types)` before the sources are stacked,
+    so files with different column sets or inferred types combine into one schema.
+    `columns` is a list or a predicate on column names; the projection is applied per source
+    so the scans only parse the columns that are used. Nothing is read until the frame is
+    collected.
+    """
+    frames = []
+    for source in sources:
+        if isinstance(source, tuple):
+            source, is_parquet = source
+        else:
+            is_parquet = str(source).endswith('.parquet')
+        lf = _scan_source(source, is_parquet)
+        if columns is not None:
+            keep = columns if callable(columns) else set(columns).__contains__
+            lf = lf.select([name for name in lf.collect_schema().names() if keep(name)])
+        frames.append(cast_polars_columns(lf, column_types or {}))
+    return pl.concat(frames, how='diagonal_relaxed')
+
+
+def _object_source(client: Minio, bucket_name: str, object_name: str, etag, cache) -> tuple:
+    is_parquet = object_name.endswith('.parquet')
+    if cache is not None and etag:
+        return _cached_object_path(client, bucket_name, object_name, etag, cache), is_parquet
+    response = client.get_object(bucket_name, object_name)
+    try:
+        return response.read(), is_parquet
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def scan_all_from_minio(endpoint, access_key, secret_key, bucket_name='', max_workers=8, object_names=None,
+                        cache=DEFAULT_CACHE, columns=None, column_types: dict = None):
+    """
+    Lazy counterpart of `fetch_all_from_minio`: download the objects of a bucket into the disk
+    cache concurrently and return a single LazyFrame over them (see `scan_sources`), or None
+    if the bucket can't be listed or has no objects. Without a cache the bodies are held in
+    memory. A failing object raises instead of being skipped, since a partial scan would
+    silently drop data.
+    """
+    client = get_minio_client(endpoint, access_key, secret_key, max_pool_size=max_workers)
+    if client is None:
+        print("Failed to connect to MinIO")
+        return None
+
+    cache = get_default_cache() if cache is DEFAULT_CACHE else cache
+    try:
+        etags = {obj.object_name: getattr(obj, 'etag', None) for obj in client.list_objects(bucket_name, recursive=True)}
     except S3Error as e:
         print("S3 Error: ", e)
         return None
     except Exception as e:
         print("Error: ", e)
         return None
-    
-    return dataframes
\ No newline at end of file
+
+    if object_names is None:
+        object_names = list(etags)
+    if not object_names:
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # map keeps the listing order, so the stacked frame is deterministic
+        sources = list(executor.map(
+            lambda object_name: _object_source(client, bucket_name, object_name, etags.get(object_name), cache),
+            object_names,
+        ))
+    print(f"Scanning {len(sources)} objects from bucket '{bucket_name}'")
+    return scan_sources(sources, columns=columns, column_types=column_types)
+
+
+def list_minio_objects(client: Minio, bucket_name: str) -> dict:
+    """
+    List a bucket as {object_name: {'etag', 'size', 'last_modified'}}, the format stored in
+    ingestion manifests.
+    """
+    objects = {}
+    for obj in client.list_objects(bucket_name, recursive=True):
+        objects[obj.object_name] = {
+            'etag': obj.etag,
+            'size': obj.size,
+            'last_modified': obj.last_modified.isoformat() if obj.last_modified else None,
+        }
+    return objects
+
+
+def load_manifest(path: str) -> dict:
+    """
+    Load the manifest written by the last successful ingestion run, or {} if there is none.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: dict):
+    """
+    Persist a manifest atomically so an interrupted write never leaves a truncated file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    print(f"Saved ingestion manifest to '{path}'")
+
+
+def diff_manifest(previous: dict, current: dict):
+    """
+    Compare two bucket listings and return (changed, removed) object names. An object counts
+    as changed when it is new or its ETag or size differs from the previous run.
+    """
+    changed = [
+        name for name, meta in current.items()
+        if name not in previous
+        or previous[name].get('etag') != meta.get('etag')
+        or previous[name].get('size') != meta.get('size')
+    ]
+    removed = [name for name in previous if name not in current]
+    return changed, removed
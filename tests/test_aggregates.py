@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import sys
+from contextlib import nullcontext
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from src.components.aggregates import player_season_aggregate_query, refresh_player_season_aggregates
+from src.components.data_ingestion_gameweeks import DataIngestion
+from src.components.schemas import AGG_PLAYER_SEASON_COLUMNS, AGG_PLAYER_SEASON_GRAIN
+
+
+def _staged_gameweeks():
+    return pd.DataFrame({
+        'season': ['2023-24'] * 4 + ['2024-25'],
+        'team': ['Chelsea', 'Chelsea', 'Arsenal', 'Arsenal', 'Arsenal'],
+        'position': ['MID'] * 5,
+        'player_name': ['Jorginho', 'Jorginho', 'Jorginho', 'Rice', 'Rice'],
+        'gameweek': [1, 2, 3, 1, 1],
+        'kickoff_time': ['2023-08-12 12:30:00', '2023-08-19 15:00:00', '2023-08-26 15:00:00', '2023-08-12 12:30:00', '2024-08-17 15:00:00'],
+        'total_points': [2, 6, 1, 3, 8],
+        'goals_scored': [0, 1, 0, 0, 1],
+        'assists': [0, 0, 1, 0, 0],
+        'minutes_played': [90, 90, 20, 90, 90],
+        'player_cost': [50.0, 50.0, None, 65.0, 65.0],
+        'ict_index': [3.0, 7.5, 1.0, 4.0, 9.0],
+    })
+
+
+def test_aggregate_query_rolls_gameweeks_up_to_the_player_season_grain():
+    # the INSERT ... SELECT is plain SQL, so sqlite can check what it computes
+    connection = sqlite3.connect(":memory:")
+    _staged_gameweeks().to_sql("stg_gameweeks", connection, index=False)
+    connection.execute(f"CREATE TABLE agg_player_season ({', '.join(AGG_PLAYER_SEASON_COLUMNS)})")
+
+    connection.execute(player_season_aggregate_query("stg_gameweeks", "agg_player_season", filtered=False))
+
+    cube = pd.read_sql("SELECT * FROM agg_player_season", connection).sort_values(list(AGG_PLAYER_SEASON_GRAIN), ignore_index=True)
+    assert len(cube) == 4
+    jorginho_chelsea = cube[(cube['team'] == 'Chelsea')].iloc[0]
+    assert jorginho_chelsea[['appearances', 'total_points', 'goals_scored', 'minutes_played', 'latest_gameweek']].tolist() == [2, 8, 1, 180, 2]
+    assert jorginho_chelsea['avg_ict_index'] == 5.25
+    # a missing cost is left out of the mean, and the sums and counts roll up across teams
+    jorginho_arsenal = cube[(cube['team'] == 'Arsenal') & (cube['player_name'] == 'Jorginho')].iloc[0]
+    assert jorginho_arsenal[['player_cost_count', 'ict_index_count']].tolist() == [0, 1]
+    assert cube['total_points'].sum() == _staged_gameweeks()['total_points'].sum()
+
+
+def test_refresh_replaces_only_the_given_seasons():
+    cursor = MagicMock()
+
+    refresh_player_season_aggregates(cursor, "stg_gameweeks", "agg_player_season", ['2024-25'])
+    statements = [call.args for call in cursor.execute.call_args_list]
+    assert statements[-2] == ("DELETE FROM agg_player_season WHERE season = ANY(%s);", (['2024-25'],))
+    assert statements[-1][0].endswith("FROM stg_gameweeks WHERE season = ANY(%s) GROUP BY \"season\", \"team\", \"position\", \"player_name\";")
+
+    cursor.reset_mock()
+    refresh_player_season_aggregates(cursor, "stg_gameweeks", "agg_player_season")
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert statements[-2] == "TRUNCATE TABLE agg_player_season;"
+
+
+def test_ingestion_refreshes_all_seasons_after_a_full_refresh_and_loaded_ones_otherwise(monkeypatch):
+    refreshed, sources = [], []
+    monkeypatch.setattr(
+        "src.components.data_ingestion_gameweeks.refresh_player_season_aggregates",
+        lambda cursor, source_table, aggregate_table, seasons: (refreshed.append(seasons), sources.append(source_table)),
+    )
+    ingestion = DataIngestion()
+
+    ingestion.config.load_mode = 'full'
+    ingestion._refresh_aggregates(MagicMock(), ['2024-25'])
+    ingestion._incremental_run = True
+    ingestion._refresh_aggregates(MagicMock(), ['2024-25'])
+    ingestion._incremental_run = False
+    ingestion.config.load_mode = 'upsert'
+    ingestion._refresh_aggregates(MagicMock(), ['2023-24', '2024-25'])
+
+    assert refreshed == [None, ['2024-25'], ['2023-24', '2024-25']]
+    # the cube is built from the dbt fact model, not the raw staged rows
+    assert set(sources) == {'dbt_ohempel.fact_player_performance'}
+
+
+def test_refresh_is_skipped_until_the_dbt_fact_model_exists(monkeypatch):
+    refreshed = []
+    monkeypatch.setattr(
+        "src.components.data_ingestion_gameweeks.refresh_player_season_aggregates", lambda *args: refreshed.append(args))
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (None,)
+
+    DataIngestion()._refresh_aggregates(cursor, ['2024-25'])
+
+    assert refreshed == []
+    assert cursor.execute.call_args.args == ("SELECT to_regclass(%s);", ('dbt_ohempel.fact_player_performance',))
+
+
+def test_a_failed_refresh_still_records_the_committed_load(monkeypatch):
+    def broken_refresh(*args):
+        raise RuntimeError("relation is broken")
+    monkeypatch.setattr("src.components.data_ingestion_gameweeks.refresh_player_season_aggregates", broken_refresh)
+    recorded = []
+    monkeypatch.setattr(
+        "src.components.ingestion.record_ingestion_run", lambda cursor, table_name, row_count: recorded.append(row_count))
+    connection = MagicMock()
+    monkeypatch.setattr("src.components.ingestion.postgres_connection", lambda *args: nullcontext(connection))
+    ingestion = DataIngestion()
+    monkeypatch.setattr(ingestion, "_create_table_if_not_exists", lambda cursor, table_name: None)
+    monkeypatch.setattr(ingestion, "_create_indexes", lambda cursor, table_name: None)
+    monkeypatch.setattr(ingestion, "_load", lambda conn, cursor, chunks: sum(len(chunk) for chunk in chunks))
+
+    with pytest.raises(RuntimeError, match="relation is broken"):
+        ingestion._load_to_postgres([_staged_gameweeks()])
+
+    # the refresh is rolled back, the run of the already committed load is recorded
+    assert recorded == [5]
+    connection.rollback.assert_called_once()
+    connection.commit.assert_called_once()
@@ -0,0 +1,183 @@
+import os
+import sys
+import time
+from contextlib import nullcontext
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from src import utils
+from src.components.teams import TeamIndex
+from src.components.data_ingestion_fixtures import (
+    RAW_FIXTURE_COLUMNS, RAW_FIXTURE_COLUMN_TYPES, DataIngestion,
+)
+
+
+def _raw_fixtures(seasons, fixtures_per_season, seed=0):
+    # fixtures.csv-like rows, including a re-published fixture that the dedup keeps once
+    rng = np.random.default_rng(seed)
+    rows = []
+    for season in range(seasons):
+        start = pd.Timestamp(f"{2019 + season}-08-10T14:00:00Z")
+        for fixture in range(1, fixtures_per_season + 1):
+            team_h, team_a = rng.choice(np.arange(1, 21), size=2, replace=False)
+            rows.append({
+                'code': season * 10_000 + fixture,
+                'event': fixture // 10 + 1,
+                'finished': 'True',
+                'finished_provisional': 'True',
+                'id': fixture,
+                'kickoff_time': (start + pd.Timedelta(days=fixture // 10)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'minutes': 90,
+                'provisional_start_time': 'False',
+                'started': 'True',
+                'team_a': team_a,
+                'team_a_score': float(rng.integers(0, 4)),
+                'team_h': team_h,
+                'team_h_score': float(rng.integers(0, 4)),
+                'stats': "[{'identifier': 'goals_scored'}]",
+                'team_h_difficulty': int(rng.integers(1, 6)),
+                'team_a_difficulty': int(rng.integers(1, 6)),
+                'pulse_id': season * 10_000 + fixture + 1,
+            })
+    df = pd.DataFrame(rows)
+    return pd.concat([df, df.iloc[[0]].assign(minutes=45)], ignore_index=True)
+
+
+def _teams(seasons):
+    return pd.DataFrame([
+        {'id': team_id, 'name': f"Team {team_id}", 'season': f"{2019 + season}-{(20 + season) % 100:02d}"}
+        for season in range(seasons) for team_id in range(1, 21)
+    ])
+
+
+def _run_both_engines(tmp_path, seasons, fixtures_per_season):
+    fixtures_path = str(tmp_path / "fixtures.csv")
+    _raw_fixtures(seasons, fixtures_per_season).to_csv(fixtures_path, index=False)
+    teams_df = _teams(seasons)
+    ingestion = DataIngestion()
+
+    started = time.perf_counter()
+    pandas_df = ingestion._assign_team_names(ingestion._transform_and_dedupe_data(
+        pd.read_csv(fixtures_path, usecols=RAW_FIXTURE_COLUMNS.__contains__)), teams_df)
+    pandas_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    polars_df = ingestion._assign_team_names(ingestion._transform_and_dedupe_lazy(
+        utils.scan_sources([fixtures_path], columns=RAW_FIXTURE_COLUMNS.__contains__, column_types=RAW_FIXTURE_COLUMN_TYPES),
+    ), teams_df)
+    polars_seconds = time.perf_counter() - started
+
+    return pandas_df, pandas_seconds, polars_df, polars_seconds
+
+
+def test_polars_transform_matches_pandas_transform(tmp_path):
+    pandas_df, _, polars_df, _ = _run_both_engines(tmp_path, seasons=2, fixtures_per_season=30)
+
+    assert list(polars_df.columns) == list(pandas_df.columns)
+    pandas_df['kickoff_time'] = pandas_df['kickoff_time'].dt.as_unit('us')
+    pd.testing.assert_frame_equal(polars_df, pandas_df, check_dtype=False)
+    assert polars_df['minutes'].iloc[-1] == 45
+
+
+def test_polars_transform_benchmark(tmp_path):
+    pandas_df, pandas_seconds, polars_df, polars_seconds = _run_both_engines(tmp_path, seasons=6, fixtures_per_season=380)
+
+    print(f"fixture transform for {len(pandas_df)} rows: pandas {pandas_seconds:.3f}s, polars {polars_seconds:.3f}s")
+    assert len(pandas_df) == len(polars_df)
+
+
+def test_parallel_transform_matches_single_process_transform():
+    df = _raw_fixtures(seasons=3, fixtures_per_season=30)
+    ingestion = DataIngestion()
+    expected = ingestion._transform(df.copy())
+
+    ingestion.config.transform_workers = 0
+    result = ingestion._transform(df.copy())
+
+    assert result['season'].is_monotonic_increasing
+    pd.testing.assert_frame_equal(
+        result.sort_values('code', ignore_index=True), expected.sort_values('code', ignore_index=True))
+
+
+def test_fixture_without_kickoff_time_is_loaded_as_unscheduled(monkeypatch):
+    raw = _raw_fixtures(seasons=1, fixtures_per_season=3)
+    raw.loc[1, 'kickoff_time'] = None
+    ingestion = DataIngestion()
+    ingestion.config.postgres_table_name = 'stg_fixtures'
+    transformed_df = ingestion._assign_team_names(ingestion._transform_and_dedupe_data(raw), _teams(1))
+    assert transformed_df['season'].isna().sum() == 1
+
+    copied = {}
+    cursor = MagicMock()
+    cursor.rowcount = -1
+    cursor.fetchone.return_value = (1,)
+    cursor.copy_expert.side_effect = lambda query, stream: copied.setdefault("body", stream.read().decode())
+    connection = MagicMock()
+    connection.cursor.return_value.__enter__.return_value = cursor
+    monkeypatch.setattr("src.components.ingestion.postgres_connection", lambda *args: nullcontext(connection))
+
+    assert ingestion._load_to_postgres([transformed_df]) == len(transformed_df)
+
+    partitions = [call.args[1] for call in cursor.execute.call_args_list if "PARTITION OF stg_fixtures FOR VALUES" in call.args[0]]
+    assert (utils.UNSCHEDULED_SEASON,) in partitions
+    assert sorted(line.split(",")[3] for line in copied["body"].splitlines()) == ['2019-20', '2019-20', utils.UNSCHEDULED_SEASON]
+
+
+def test_local_teams_are_completed_from_the_bucket_for_seasons_not_bundled(monkeypatch):
+    bucket_teams = pd.DataFrame({'season': ['2024-25', '2025-26'], 'id': [1, 1], 'name': ['The Arsenal', 'Arsenal']})
+    fetched = []
+    def fetch_all_from_minio(*args, object_names, **kwargs):
+        fetched.append(object_names)
+        return {'teams.csv': bucket_teams}, {}
+    monkeypatch.setattr("src.components.data_ingestion_fixtures.fetch_all_from_minio", fetch_all_from_minio)
+    monkeypatch.setattr("src.components.data_ingestion_fixtures.connect_to_minio", lambda *args: MagicMock())
+    monkeypatch.setattr(
+        "src.components.data_ingestion_fixtures.list_minio_objects",
+        lambda client, bucket_name: dict.fromkeys(['teams.csv', 'teams_2024_25.csv', 'teams_2025_26.csv'], {'etag': 'a'}))
+    ingestion = DataIngestion()
+    ingestion.config.teams_source = 'local'
+
+    # every season bundled: the bucket isn't read
+    assert len(ingestion._fetch_teams([], pd.Series(['2023-24', '2024-25']))) == 20 * 6
+    assert fetched == []
+
+    team_index = TeamIndex(ingestion._fetch_teams([], pd.Series(['2024-25', '2025-26'])))
+
+    # only the objects that may hold the missing season are read, and the bundled files win where they have the season
+    assert fetched == [['teams.csv', 'teams_2025_26.csv']]
+    assert team_index.lookup(['2024-25', '2025-26'], [1, 1]).tolist() == ['Arsenal', 'Arsenal']
+    assert len(team_index) == 20 * 6 + 1
+
+
+def test_local_teams_source_leaves_the_teams_bucket_out_of_the_incremental_diff(monkeypatch, tmp_path):
+    listings = {'fixtures': {'2019-20.csv': {'etag': 'a'}}, 'teams': {'teams.csv': {'etag': 'b'}}}
+    monkeypatch.setattr("src.components.ingestion.connect_to_minio", lambda *args: MagicMock())
+    monkeypatch.setattr("src.components.ingestion.list_minio_objects", lambda client, bucket_name: listings[bucket_name])
+    ingestion = DataIngestion()
+    ingestion.config.teams_source, ingestion.config.incremental = 'local', True
+    ingestion.manifest_path = str(tmp_path / "manifest.json")
+    utils.save_manifest(ingestion.manifest_path, {'fixtures': listings['fixtures']})
+    listings['teams'] = {'teams.csv': {'etag': 'c'}}
+
+    assert ingestion._plan_fetch() == {'fixtures': []}
+    assert ingestion._incremental_run
+    assert ingestion._current_manifest == {'fixtures': listings['fixtures']}
+
+    # with TEAMS_SOURCE=minio the changed teams force a full refresh
+    ingestion.config.teams_source = 'minio'
+    assert ingestion._plan_fetch() == {'fixtures': ['2019-20.csv'], 'teams': ['teams.csv']}
+    assert not ingestion._incremental_run
+
+
+def test_transform_fails_early_for_a_season_without_teams():
+    ingestion = DataIngestion()
+
+    with pytest.raises(Exception, match="No teams for season\\(s\\) 2019-20"):
+        ingestion._assign_team_names(ingestion._transform_and_dedupe_data(_raw_fixtures(seasons=1, fixtures_per_season=3)), _teams(2).iloc[20:])
@@ -0,0 +1,255 @@
+import io
+import os
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from src import utils
+from src.components import data_ingestion_gameweeks
+from src.components.data_ingestion_gameweeks import (
+    FIXTURE_KEYS, RAW_GAMEWEEK_COLUMNS, RAW_GAMEWEEK_COLUMN_TYPES, DataIngestion, resolve_opponent_teams,
+)
+from src.components.schemas import STG_GAMEWEEKS_COLUMNS
+
+
+def _legacy_opponent_teams(df):
+    # The groupby/apply implementation resolve_opponent_teams replaced, written as an explicit
+    # loop over the groups so it behaves the same on every pandas version.
+    def identify_opponent_team(group):
+        group['opponent_team'] = group['team'].apply(
+            lambda x: group['team'].unique()[1] if x == group['team'].unique()[0] and len(group['team'].unique()) == 2
+            else (group['team'].unique()[0] if len(group['team'].unique()) == 2 else None))
+        return group
+
+    groups = [identify_opponent_team(group.copy()) for _, group in df.groupby(FIXTURE_KEYS, sort=True)]
+    return pd.concat(groups)
+
+
+def _gameweeks(seasons, fixtures_per_season, players_per_team, seed=0):
+    rng = np.random.default_rng(seed)
+    teams = [f"Team {i}" for i in range(20)]
+    rows = []
+    for season in range(seasons):
+        start = pd.Timestamp(f"{2019 + season}-08-10T14:00:00Z")
+        for fixture in range(1, fixtures_per_season + 1):
+            kickoff = start + pd.Timedelta(days=fixture // 10, hours=fixture % 10)
+            home, away = rng.choice(teams, size=2, replace=False)
+            for team in (home, away):
+                for player in range(players_per_team):
+                    rows.append({
+                        'player_name': f"{team} player {player}",
+                        'team': team,
+                        'kickoff_time': kickoff,
+                        'seasonal_fixture_id': fixture,
+                    })
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def test_resolve_opponent_teams_matches_legacy_output():
+    kickoff = pd.Timestamp("2023-08-12T14:00:00Z")
+    df = pd.DataFrame({
+        'player_name': ['a', 'b', 'c', 'd', 'e', 'f', 'g'],
+        'team': ['Arsenal', 'Chelsea', 'Arsenal', 'Chelsea', 'Fulham', 'Brentford', 'Wolves'],
+        'kickoff_time': [kickoff, kickoff, kickoff, kickoff, kickoff, pd.NaT, kickoff],
+        # fixture 2 only has one team (incomplete data); the NaT row is dropped
+        'seasonal_fixture_id': [1, 1, 1, 1, 2, 3, 3],
+    })
+
+    result = resolve_opponent_teams(df)
+    expected = _legacy_opponent_teams(df)
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert result.set_index('player_name')['opponent_team'].to_dict() == {
+        'a': 'Chelsea', 'b': 'Arsenal', 'c': 'Chelsea', 'd': 'Arsenal', 'e': None, 'g': None,
+    }
+
+
+def test_resolve_opponent_teams_is_faster_on_multiple_seasons():
+    df = _gameweeks(seasons=3, fixtures_per_season=380, players_per_team=15)
+
+    started = time.perf_counter()
+    expected = _legacy_opponent_teams(df)
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = resolve_opponent_teams(df)
+    vectorized_seconds = time.perf_counter() - started
+
+    print(f"opponent teams for {len(df)} rows: legacy {legacy_seconds:.3f}s, vectorized {vectorized_seconds:.3f}s")
+    # without missing opponents newer pandas infers a string dtype for the legacy column
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert vectorized_seconds < legacy_seconds
+
+
+def _raw_gameweeks(seasons, fixtures_per_season, players_per_team, seed=0):
+    # merged_gw.csv-like rows, including a duplicated row and a row without a kickoff time
+    df = _gameweeks(seasons, fixtures_per_season, players_per_team, seed).rename(
+        columns={'player_name': 'name', 'seasonal_fixture_id': 'fixture'})
+    rng = np.random.default_rng(seed)
+    n = len(df)
+    df['kickoff_time'] = df['kickoff_time'].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    df['GW'] = df['fixture'] // 10 + 1
+    df['round'] = df['GW']
+    df['position'] = rng.choice(['GK', 'DEF', 'MID', 'FWD'], size=n)
+    df['was_home'] = rng.choice(['True', 'False'], size=n)
+    df['starts'] = rng.integers(0, 2, size=n)
+    df['value'] = rng.integers(40, 130, size=n)
+    df['xP'] = rng.random(n).round(1)
+    df['creativity'] = rng.random(n).round(1) * 10
+    for column in ['total_points', 'minutes', 'goals_scored', 'assists', 'bonus', 'bps', 'team_a_score',
+                   'team_h_score', 'selected', 'transfers_in', 'transfers_out', 'element']:
+        df[column] = rng.integers(0, 10, size=n)
+    df = pd.concat([df, df.iloc[[0]]], ignore_index=True)
+    df.loc[len(df)] = {**df.iloc[1].to_dict(), 'name': 'No kickoff', 'kickoff_time': None}
+    return df
+
+
+def _write_seasons(tmp_path, df):
+    paths = []
+    for i, rows in enumerate(np.array_split(np.arange(len(df)), 3)):
+        path = tmp_path / f"merged_gw_{i}.csv"
+        df.iloc[rows].to_csv(path, index=False)
+        paths.append(str(path))
+    return paths
+
+
+def _run_both_engines(paths):
+    ingestion = DataIngestion()
+
+    started = time.perf_counter()
+    df = pd.concat([pd.read_csv(path, usecols=RAW_GAMEWEEK_COLUMNS.__contains__) for path in paths], ignore_index=True)
+    pandas_df = ingestion._transform_and_dedupe_data(df)
+    pandas_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    lf = utils.scan_sources(paths, columns=RAW_GAMEWEEK_COLUMNS.__contains__, column_types=RAW_GAMEWEEK_COLUMN_TYPES)
+    polars_df = ingestion._transform_and_dedupe_lazy(lf)
+    polars_seconds = time.perf_counter() - started
+
+    return pandas_df, pandas_seconds, polars_df, polars_seconds
+
+
+def _comparable(df):
+    df = df[sorted(df.columns)].sort_values(['kickoff_time', 'seasonal_fixture_id', 'player_name'], ignore_index=True)
+    df['kickoff_time'] = df['kickoff_time'].dt.as_unit('us')
+    return df
+
+
+def test_polars_transform_matches_pandas_transform(tmp_path):
+    paths = _write_seasons(tmp_path, _raw_gameweeks(seasons=1, fixtures_per_season=40, players_per_team=3))
+
+    pandas_df, _, polars_df, _ = _run_both_engines(paths)
+
+    assert list(pandas_df.columns) == list(polars_df.columns)
+    assert set(polars_df.columns) <= set(STG_GAMEWEEKS_COLUMNS)
+    pd.testing.assert_frame_equal(_comparable(polars_df), _comparable(pandas_df), check_dtype=False)
+
+
+def test_polars_transform_benchmark(tmp_path):
+    paths = _write_seasons(tmp_path, _raw_gameweeks(seasons=3, fixtures_per_season=380, players_per_team=15))
+
+    pandas_df, pandas_seconds, polars_df, polars_seconds = _run_both_engines(paths)
+
+    print(f"gameweek transform for {len(pandas_df)} rows: pandas {pandas_seconds:.3f}s, polars {polars_seconds:.3f}s")
+    assert len(pandas_df) == len(polars_df)
+
+
+class _Response(io.BytesIO):
+    def release_conn(self):
+        pass
+
+
+def test_streaming_chunks_match_batch_transform_across_objects():
+    df = _raw_gameweeks(seasons=2, fixtures_per_season=20, players_per_team=2)
+    first_season = df['kickoff_time'].fillna('') < '2020-07'
+    # a season re-published in a later object with new points must win over the earlier copy
+    republished = df[first_season].assign(total_points=99)
+    objects = {
+        "2019-20/merged_gw.csv": df[first_season],
+        "2020-21/merged_gw.csv": df[~first_season],
+        "2019-20/merged_gw_fix.csv": republished,
+    }
+    bodies = {name: frame.to_csv(index=False).encode() for name, frame in objects.items()}
+    client = MagicMock()
+    client.get_object.side_effect = lambda bucket_name, object_name: _Response(bodies[object_name])
+
+    ingestion = DataIngestion()
+    batch_df = ingestion._transform_and_dedupe_data(pd.concat(
+        [pd.read_csv(io.BytesIO(body), usecols=RAW_GAMEWEEK_COLUMNS.__contains__) for body in bodies.values()], ignore_index=True))
+    with patch.object(data_ingestion_gameweeks, "get_minio_client", return_value=client):
+        chunks = list(ingestion._stream_transformed_chunks(list(objects)))
+
+    # newest object first; the original copy of the re-published season is fully deduplicated away
+    assert len(chunks[-1]) == 0
+    streamed_df = pd.concat(chunks, ignore_index=True)
+    key = list(data_ingestion_gameweeks.STREAMING_DEDUP_KEY)
+    pd.testing.assert_frame_equal(
+        streamed_df.sort_values(key, ignore_index=True), batch_df.sort_values(key, ignore_index=True), check_dtype=False)
+    assert (streamed_df['total_points'] == 99).sum() == len(chunks[0])
+
+
+def test_streaming_reads_through_the_minio_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("MINIO_CACHE_DIR", str(tmp_path / "minio"))
+    body = _raw_gameweeks(seasons=1, fixtures_per_season=10, players_per_team=2).to_csv(index=False).encode()
+    client = MagicMock()
+    client.get_object.side_effect = lambda bucket_name, object_name: _Response(body)
+    ingestion = DataIngestion()
+    ingestion._current_manifest = {"gameweeks": {"2019-20.csv": {"etag": "a"}}}
+
+    with patch.object(data_ingestion_gameweeks, "get_minio_client", return_value=client):
+        first = list(ingestion._stream_transformed_chunks(["2019-20.csv"]))
+        second = list(ingestion._stream_transformed_chunks(["2019-20.csv"]))
+
+    # the second pass is served from the disk cache
+    assert client.get_object.call_count == 1
+    pd.testing.assert_frame_equal(second[0], first[0])
+
+def test_parallel_transform_matches_single_process_transform(tmp_path):
+    paths = _write_seasons(tmp_path, _raw_gameweeks(seasons=3, fixtures_per_season=40, players_per_team=3))
+    df = pd.concat([pd.read_csv(path, usecols=RAW_GAMEWEEK_COLUMNS.__contains__) for path in paths], ignore_index=True)
+    ingestion = DataIngestion()
+    expected = ingestion._transform(df.copy())
+
+    ingestion.config.transform_workers = 2
+    result = ingestion._transform(df.copy())
+
+    # seasons never share fixtures, so the season-ordered partitions reproduce the single-process order
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_a_failed_object_aborts_the_run_before_the_load(tmp_path, monkeypatch):
+    monkeypatch.setenv("MINIO_CACHE_DIR", "")
+    body = _raw_gameweeks(seasons=1, fixtures_per_season=10, players_per_team=2).to_csv(index=False).encode()
+    client = MagicMock()
+    client.list_objects.return_value = [SimpleNamespace(object_name=name, etag=name) for name in ("2019-20.csv", "2020-21.csv")]
+    def get_object(bucket_name, object_name):
+        if object_name == "2020-21.csv":
+            raise ValueError("boom")
+        return _Response(body)
+    client.get_object.side_effect = get_object
+
+    ingestion = DataIngestion()
+    ingestion.config.streaming, ingestion.config.transform_engine = False, 'pandas'
+    ingestion.config.postgres_table_name = "stg_gameweeks"
+    ingestion.config.pipeline_cache_dir = str(tmp_path / "pipeline")
+    ingestion.manifest_path = str(tmp_path / "manifest.json")
+    monkeypatch.setattr(ingestion, "_plan", lambda: {"gameweeks": {"2019-20.csv": "a", "2020-21.csv": "b"}})
+    loaded = []
+    monkeypatch.setattr(ingestion, "_load_to_postgres", loaded.append)
+
+    with patch.object(utils, "get_minio_client", return_value=client):
+        with pytest.raises(Exception, match="Failed to fetch 1 of 2 objects from bucket 'gameweeks': 2020-21.csv"):
+            ingestion.ingest_data()
+
+    # a full refresh would otherwise truncate and reload without the failed object's season
+    assert loaded == []
+    assert not os.path.exists(ingestion.manifest_path)
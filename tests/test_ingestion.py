@@ -0,0 +1,52 @@
+import os
+import sys
+from contextlib import nullcontext
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from src.components.ingestion import IngestionConfig, StagingIngestion
+from src.components.validation import NotNull
+
+
+class _PlayersIngestion(StagingIngestion):
+    # a dataset only declares its table and its transform
+    bucket_name = "players"
+    table_name = "stg_players"
+    columns = {'player_name': 'TEXT', 'season': 'TEXT'}
+    primary_key = "player_id"
+    natural_key = ('player_name', 'season')
+    indexes = {'season': ('season',)}
+    raw_columns = {'player_name', 'season'}
+    rules = [NotNull(('player_name',))]
+
+    def _transform_and_dedupe_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.drop_duplicates(keep='last')
+
+
+def test_a_declared_dataset_replaces_each_loaded_season_once_in_incremental_runs(monkeypatch):
+    cursor = MagicMock()
+    cursor.rowcount = -1
+    cursor.fetchone.return_value = (1,)
+    connection = MagicMock()
+    connection.cursor.return_value.__enter__.return_value = cursor
+    monkeypatch.setattr("src.components.ingestion.postgres_connection", lambda *args: nullcontext(connection))
+    ingestion = _PlayersIngestion(IngestionConfig(postgres_table_name="stg_players", pipeline_cache_dir=""))
+    ingestion._incremental_run = True
+
+    chunks = [
+        pd.DataFrame({'player_name': ['Salah', 'Kane'], 'season': ['2024-25', '2023-24']}),
+        pd.DataFrame({'player_name': ['Saka'], 'season': ['2024-25']}),
+    ]
+    assert ingestion._load_to_postgres(ingestion._validate_data(chunk) for chunk in chunks) == 3
+
+    statements = [call.args for call in cursor.execute.call_args_list]
+    assert ("DELETE FROM stg_players WHERE season = ANY(%s);", (['2023-24', '2024-25'],)) in statements
+    assert sum(statement[0].startswith("DELETE FROM stg_players") for statement in statements) == 1
+    assert ('CREATE INDEX IF NOT EXISTS stg_players_season_idx ON stg_players ("season");',) in statements
+    assert not any("TRUNCATE" in statement[0] for statement in statements)
+    connection.commit.assert_called()
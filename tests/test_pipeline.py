@@ -0,0 +1,159 @@
+import importlib.util
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from src.components.pipeline import Pipeline, Stage, StopPipeline
+from src.utils import compact_dtypes, copy_dataframe_to_postgres
+
+
+def _pipeline(cache_dir, listing, calls, transform_params=None):
+    def plan():
+        calls.append('plan')
+        return dict(listing)
+
+    def fetch(planned):
+        calls.append('fetch')
+        return pd.DataFrame({'object': list(planned), 'points': range(len(planned))})
+
+    def transform(df):
+        calls.append('transform')
+        return df.assign(points=df['points'] * 2)
+
+    def load(df):
+        calls.append('load')
+        return len(df)
+
+    return Pipeline('stg_test', [
+        Stage('plan', plan, cache=False, fingerprint_output=True),
+        Stage('fetch', fetch, inputs=('plan',)),
+        Stage('transform', transform, inputs=('fetch',), params=transform_params or {}),
+        Stage('load', load, inputs=('transform',), cache=False),
+    ], str(cache_dir))
+
+
+def test_rerun_skips_cached_stages_until_an_input_changes(tmp_path):
+    listing = {'2023-24/gw.csv': 'etag-1', '2024-25/gw.csv': 'etag-2'}
+    calls = []
+    first = _pipeline(tmp_path, listing, calls).run()
+    assert calls == ['plan', 'fetch', 'transform', 'load']
+    assert first['load'] == 2
+
+    calls.clear()
+    second = _pipeline(tmp_path, listing, calls).run()
+    # unchanged objects: the transform output is read back from the cache for the load
+    assert calls == ['plan', 'load']
+    pd.testing.assert_frame_equal(second['transform'], first['transform'])
+
+    calls.clear()
+    _pipeline(tmp_path, listing, calls, transform_params={'engine': 'polars'}).run()
+    assert calls == ['plan', 'transform', 'load']
+
+    calls.clear()
+    _pipeline(tmp_path, {**listing, '2024-25/gw.csv': 'etag-3'}, calls).run()
+    assert calls == ['plan', 'fetch', 'transform', 'load']
+
+
+def test_run_records_stage_metrics(tmp_path):
+    pipeline = _pipeline(tmp_path, {'gw.csv': 'etag-1'}, [])
+    pipeline.run()
+
+    assert [metrics.stage for metrics in pipeline.metrics] == ['plan', 'fetch', 'transform', 'load']
+    assert pipeline.metrics[-1].rows == 1
+    assert all(metrics.seconds >= 0 and not metrics.cached for metrics in pipeline.metrics)
+
+    pipeline.run()
+    assert [metrics.cached for metrics in pipeline.metrics] == [False, True, True, False]
+
+    with open(tmp_path / 'stg_test' / 'runs.jsonl') as f:
+        runs = [json.loads(line) for line in f]
+    assert len(runs) == 2
+    assert runs[1]['stages'][2]['cached'] is True
+
+
+def test_stop_pipeline_skips_remaining_stages(tmp_path):
+    def plan():
+        raise StopPipeline("nothing new")
+
+    calls = []
+    outputs = Pipeline('stg_test', [
+        Stage('plan', plan, cache=False, fingerprint_output=True),
+        Stage('load', lambda planned: calls.append('load'), inputs=('plan',), cache=False),
+    ], str(tmp_path)).run()
+
+    assert outputs == {}
+    assert calls == []
+
+
+def test_changing_a_stage_s_code_invalidates_its_cached_output(tmp_path):
+    module_path = tmp_path / "stage_code.py"
+    module_path.write_text("def transform(df):\n    return df.assign(points=df['points'] * 2)\n")
+    spec = importlib.util.spec_from_file_location("stage_code", module_path)
+    stage_code = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(stage_code)
+
+    calls = []
+    def transform(df):
+        calls.append('transform')
+        return stage_code.transform(df)
+    def pipeline():
+        return Pipeline('stg_test', [
+            Stage('fetch', lambda: pd.DataFrame({'points': [1, 2]})),
+            Stage('transform', transform, inputs=('fetch',), code=('stage_code',)),
+        ], str(tmp_path / "cache"))
+
+    sys.modules['stage_code'] = stage_code
+    try:
+        pipeline().run()
+        pipeline().run()
+        assert calls == ['transform']
+
+        # a deployed fix to the transform's helpers reruns it instead of loading the stale output
+        module_path.write_text("def transform(df):\n    return df.assign(points=df['points'] * 3)\n")
+        pipeline().run()
+        assert calls == ['transform', 'transform']
+    finally:
+        del sys.modules['stage_code']
+
+
+def test_cached_compacted_frame_loads_like_the_original(tmp_path):
+    frame = compact_dtypes(pd.DataFrame({
+        'player_name': ['Salah', 'Salah', 'Saka', 'Saka'],
+        'season': ['2023-24'] * 4,
+        'total_points': pd.array([12, None, 2, 7], dtype='Int64'),
+        'ict_index': [10.5, 3.0, None, 7.5],
+    }))
+    assert isinstance(frame['player_name'].dtype, pd.CategoricalDtype)
+    written = []
+    def pipeline():
+        return Pipeline('stg_test', [
+            Stage('transform', lambda: frame),
+            Stage('load', lambda df: written.append(_copy_body(df)), inputs=('transform',), cache=False),
+        ], str(tmp_path))
+
+    first = pipeline().run()
+    second = pipeline().run()
+
+    assert second['transform'] is not frame  # read back from Parquet
+    pd.testing.assert_frame_equal(second['transform'], first['transform'])
+    assert list(second['transform'].dtypes.astype(str)) == ['category', 'category', 'Int8', 'float32']
+    assert written[1] == written[0] == "Salah,2023-24,12,10.5\nSalah,2023-24,,3.0\nSaka,2023-24,2,\nSaka,2023-24,7,7.5\n"
+
+
+def _copy_body(df):
+    # what copy_dataframe_to_postgres streams to COPY for the frame
+    copied = {}
+    cursor = MagicMock()
+    cursor.rowcount = -1
+    cursor.copy_expert.side_effect = lambda query, stream: copied.setdefault("body", stream.read().decode())
+    connection = MagicMock()
+    connection.cursor.return_value.__enter__.return_value = cursor
+    copy_dataframe_to_postgres(connection, df, "stg_test", {'player_name': 'TEXT', 'season': 'TEXT', 'total_points': 'INTEGER', 'ict_index': 'FLOAT'})
+    return copied["body"]
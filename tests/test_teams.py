@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from src.components.teams import TeamIndex, load_team_index, season_from_filename
+
+
+def test_season_from_filename():
+    assert season_from_filename("src/data/teams/teams_2019_20.csv") == "2019-20"
+    with pytest.raises(ValueError):
+        season_from_filename("teams.csv")
+
+
+def test_bundled_team_index_is_keyed_by_season_and_id():
+    team_index = load_team_index()
+
+    assert load_team_index() is team_index
+    assert len(team_index) == 20 * 6
+    assert set(team_index.teams_df['season']) == {'2019-20', '2020-21', '2021-22', '2022-23', '2023-24', '2024-25'}
+    assert team_index.lookup(['2019-20', '2019-20', '2019-20', None], [1, 2, 99, 1]).tolist() == ['Arsenal', 'Aston Villa', None, None]
+
+
+def test_assign_names_matches_the_merges_it_replaced():
+    teams_df = load_team_index().teams_df
+    fixtures = pd.DataFrame({
+        'season': ['2019-20', '2023-24', '2024-25', None, '2030-31'],
+        'team_h': pd.array([1, 20, 7, 1, 1], dtype='Int64'),
+        'team_a': pd.array([2, 1, None, 2, 2], dtype='Int64'),
+    })
+
+    result = load_team_index().assign_names(fixtures, {'team_h': 'team_h_name', 'team_a': 'team_a_name'})
+
+    expected = fixtures
+    for column in ('team_h', 'team_a'):
+        expected = expected.merge(
+            teams_df.rename(columns={'name': f"{column}_name"}), left_on=[column, 'season'], right_on=['id', 'season'], how='left'
+        ).drop(columns=['id'])
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_updated_entries_override_the_bundled_ones():
+    team_index = load_team_index().updated(pd.DataFrame({
+        'season': ['2019-20', '2025-26'], 'id': [1, 1], 'name': ['The Arsenal', 'Arsenal'],
+    }))
+
+    assert team_index.lookup(['2019-20', '2019-20', '2025-26'], [1, 2, 1]).tolist() == ['The Arsenal', 'Aston Villa', 'Arsenal']
+    # the cached bundled index is left untouched
+    assert load_team_index().lookup(['2019-20'], [1]).tolist() == ['Arsenal']
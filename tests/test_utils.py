@@ -0,0 +1,461 @@
+import io
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import pandas as pd
+import polars as pl
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from src import utils
+
+
+class _Response(io.BytesIO):
+    def release_conn(self):
+        pass
+
+
+def _mock_minio_client(objects):
+    client = MagicMock()
+    client.list_objects.return_value = [SimpleNamespace(object_name=name, etag=f"etag-{name}") for name in objects]
+
+    def get_object(bucket_name, object_name):
+        body = objects[object_name]
+        if isinstance(body, Exception):
+            raise body
+        return _Response(body)
+
+    client.get_object.side_effect = get_object
+    return client
+
+
+def test_fetch_all_from_minio_reports_failed_objects(monkeypatch):
+    monkeypatch.setenv("MINIO_CACHE_DIR", "")
+    client = _mock_minio_client({
+        "gw_1.csv": b"name,GW\nPlayer1,1\n",
+        "gw_2.csv": ValueError("boom"),
+        "gw_3.csv": b"name,GW\nPlayer2,3\n",
+    })
+
+    with patch.object(utils, "get_minio_client", return_value=client):
+        dfs, errors = utils.fetch_all_from_minio("endpoint", "key", "secret", "gameweeks", max_workers=4, return_errors=True)
+
+    assert list(dfs) == ["gw_1.csv", "gw_3.csv"]
+    assert list(errors) == ["gw_2.csv"]
+    pd.testing.assert_frame_equal(dfs["gw_3.csv"], pd.DataFrame({"name": ["Player2"], "GW": [3]}))
+
+
+def test_diff_manifest_detects_new_changed_and_removed_objects():
+    previous = {
+        "gw_22_23.csv": {"etag": "a", "size": 10},
+        "gw_23_24.csv": {"etag": "b", "size": 20},
+        "gw_old.csv": {"etag": "c", "size": 30},
+    }
+    current = {
+        "gw_22_23.csv": {"etag": "a", "size": 10},
+        "gw_23_24.csv": {"etag": "b2", "size": 20},
+        "gw_24_25.csv": {"etag": "d", "size": 40},
+    }
+
+    changed, removed = utils.diff_manifest(previous, current)
+
+    assert changed == ["gw_23_24.csv", "gw_24_25.csv"]
+    assert removed == ["gw_old.csv"]
+
+
+def test_manifest_round_trip(tmp_path):
+    path = tmp_path / "manifests" / "stg_gameweeks.json"
+    manifest = {"gameweeks": {"gw_24_25.csv": {"etag": "d", "size": 40, "last_modified": None}}}
+
+    assert utils.load_manifest(str(path)) == {}
+    utils.save_manifest(str(path), manifest)
+    assert utils.load_manifest(str(path)) == manifest
+
+
+def test_fetch_all_from_minio_reads_repeat_fetches_from_cache(tmp_path):
+    client = _mock_minio_client({"gw_1.csv": b"name,GW\nPlayer1,1\n"})
+    cache = utils.MinioObjectCache(str(tmp_path))
+
+    with patch.object(utils, "get_minio_client", return_value=client):
+        first = utils.fetch_all_from_minio("endpoint", "key", "secret", "gameweeks", cache=cache)
+        second = utils.fetch_all_from_minio("endpoint", "key", "secret", "gameweeks", cache=cache)
+
+    assert client.get_object.call_count == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    pd.testing.assert_frame_equal(first["gw_1.csv"], second["gw_1.csv"])
+
+
+def test_scan_all_from_minio_stacks_typed_sources_lazily(tmp_path):
+    parquet = io.BytesIO()
+    pl.DataFrame({"name": ["Player3"], "GW": [3.0], "kickoff_time": [None]}).write_parquet(parquet)
+    client = _mock_minio_client({
+        "gw_1.csv": b"name,GW,kickoff_time,unused\nPlayer1,1,2024-08-17T14:00:00Z,x\n",
+        "gw_2.csv": b"GW,name\n2.0,Player2\n",
+        "season=2024-25/gw_3.parquet": parquet.getvalue(),
+    })
+    cache = utils.MinioObjectCache(str(tmp_path))
+
+    with patch.object(utils, "get_minio_client", return_value=client):
+        lf = utils.scan_all_from_minio("endpoint", "key", "secret", "gameweeks", cache=cache,
+                                       columns=["name", "GW", "kickoff_time"],
+                                       column_types={"GW": "int", "kickoff_time": "datetime"})
+
+    df = lf.collect()
+    assert df.columns == ["name", "GW", "kickoff_time"]
+    assert df["name"].to_list() == ["Player1", "Player2", "Player3"]
+    assert df["GW"].dtype == pl.Int64 and df["GW"].to_list() == [1, 2, 3]
+    assert df["kickoff_time"].dtype == pl.Datetime("us", "UTC")
+    assert df["kickoff_time"].null_count() == 2
+
+
+def test_default_cache_is_opt_in_and_none_turns_it_off_for_a_call(tmp_path, monkeypatch):
+    client = _mock_minio_client({"gw_1.csv": b"name,GW\nPlayer1,1\n"})
+    monkeypatch.delenv("MINIO_CACHE_DIR", raising=False)
+    assert utils.get_default_cache() is None
+
+    monkeypatch.setenv("MINIO_CACHE_DIR", str(tmp_path))
+    with patch.object(utils, "get_minio_client", return_value=client):
+        utils.fetch_all_from_minio("endpoint", "key", "secret", "gameweeks")
+        utils.fetch_all_from_minio("endpoint", "key", "secret", "gameweeks", cache=None)
+        utils.fetch_all_from_minio("endpoint", "key", "secret", "gameweeks")
+
+    # the uncached call went to MinIO, the third was a hit of the first
+    assert client.get_object.call_count == 2
+    assert utils.get_default_cache().stats()["hits"] == 1
+
+
+def test_object_cache_only_scans_the_directory_when_over_budget(tmp_path):
+    cache = utils.MinioObjectCache(str(tmp_path), max_bytes=20)
+    with patch.object(cache, "evict", wraps=cache.evict) as evict:
+        for name in ("a.csv", "b.csv", "c.csv", "d.csv"):
+            cache.put("gameweeks", name, "1", b"12345")
+        assert evict.call_count == 0
+        cache.put("gameweeks", "e.csv", "1", b"12345")
+        assert evict.call_count == 1
+
+    # evicted down to 90% of the bound, and a new instance counts what is left
+    assert utils.MinioObjectCache(str(tmp_path), max_bytes=20)._total_bytes == cache._total_bytes == 15
+
+
+def test_object_cache_evicts_least_recently_used(tmp_path):
+    cache = utils.MinioObjectCache(str(tmp_path), max_bytes=10)
+    first = cache.put("gameweeks", "a.csv", "1", b"12345")
+    os.utime(first, (1, 1))
+    cache.put("gameweeks", "b.csv", "1", b"12345")
+    cache.put("gameweeks", "c.csv", "1", b"12345")
+
+    assert cache.get("gameweeks", "a.csv", "1") is None
+    assert cache.get("gameweeks", "c.csv", "1") is not None
+
+
+def test_read_csv_from_minio_streams_projection_and_fills_cache(tmp_path):
+    client = _mock_minio_client({"gw_1.csv": b"name,GW,round\nPlayer1,1,1\nPlayer2,1,1\n"})
+    cache = utils.MinioObjectCache(str(tmp_path))
+
+    df = utils.read_csv_from_minio(
+        client, "gameweeks", "gw_1.csv", usecols=["name", "GW"], dtype={"GW": "int16"},
+        etag="etag-gw_1.csv", cache=cache,
+    )
+
+    assert list(df.columns) == ["name", "GW"]
+    assert df["GW"].dtype == "int16"
+    with open(cache.get("gameweeks", "gw_1.csv", "etag-gw_1.csv"), "rb") as f:
+        assert f.read() == b"name,GW,round\nPlayer1,1,1\nPlayer2,1,1\n"
+
+
+def test_parquet_upload_partitions_by_season_and_reads_back_typed(tmp_path):
+    csv_path = tmp_path / "merged_gw.csv"
+    csv_path.write_text(
+        "name,value,kickoff_time,was_home\n"
+        "Player1,55,2024-05-19T15:00:00Z,True\n"
+        "Player1,56,2024-08-17T14:00:00Z,False\n"
+        "Player2,100,2024-08-17T14:00:00Z,True\n"
+    )
+    uploaded = {}
+    client = MagicMock()
+    client.bucket_exists.return_value = True
+    client.put_object.side_effect = lambda bucket, name, data, size, content_type: uploaded.__setitem__(name, data.read())
+
+    object_names = utils.upload_csv_as_parquet(client, str(csv_path), "gameweeks", {"value": "numeric", "kickoff_time": "datetime", "was_home": "boolean"})
+
+    assert object_names == ["season=2023-24/merged_gw.parquet", "season=2024-25/merged_gw.parquet"]
+
+    client = _mock_minio_client(uploaded)
+    df = utils.read_parquet_from_minio(
+        client, "gameweeks", "season=2024-25/merged_gw.parquet",
+        columns=lambda name: name != "was_home", filters=[("value", ">", 60)],
+    )
+    assert list(df.columns) == ["name", "value", "kickoff_time"]
+    assert df["name"].tolist() == ["Player2"]
+    assert pd.api.types.is_datetime64_any_dtype(df["kickoff_time"])
+
+
+def test_derive_season_handles_cutover_month_and_missing_kickoffs():
+    kickoff = pd.Series(pd.to_datetime(
+        ["2024-08-16T19:00:00Z", "2025-05-25T15:00:00Z", None, "2020-07-04T11:30:00Z"], utc=True))
+
+    assert utils.derive_season(kickoff).tolist()[:2] == ["2024-25", "2024-25"]
+    assert utils.derive_season(kickoff).isna().tolist() == [False, False, True, False]
+    # the 2019-20 season ran into July 2020
+    assert utils.derive_season(kickoff, cutover_month=8)[3] == "2019-20"
+
+    polars_kickoff = pl.from_pandas(kickoff.rename("kickoff_time"))
+    expected = ["2024-25", "2024-25", None, "2020-21"]
+    assert utils.derive_season(polars_kickoff).to_list() == expected
+    frame = pl.DataFrame({"kickoff_time": polars_kickoff}).with_columns(utils.derive_season(pl.col("kickoff_time")))
+    assert frame["season"].to_list() == expected
+
+
+def test_compact_dtypes_shrinks_frame_without_changing_values():
+    n = 10_000
+    df = pd.DataFrame({
+        "player_name": [f"Player {i % 500}" for i in range(n)],
+        "total_points": pd.Series(range(n)) % 20,
+        "selected": pd.Series(range(n)) * 1_000,
+        "gameweek": pd.array([None] + [1] * (n - 1), dtype="Int64"),
+        "xP": (pd.Series(range(n)) % 70) / 10,
+        "precise": pd.Series(range(n)) / 3,
+        "was_home": [True, False] * (n // 2),
+    })
+
+    compacted = utils.compact_dtypes(df)
+
+    assert compacted["player_name"].dtype == "category"
+    assert compacted["total_points"].dtype == "int8"
+    assert compacted["selected"].dtype == "int32"
+    assert compacted["gameweek"].dtype == "Int8"
+    assert compacted["xP"].dtype == "float32"
+    assert compacted["precise"].dtype == "float64"  # float32 would lose precision
+    assert compacted["was_home"].dtype == bool
+    assert compacted.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum() / 2
+    pd.testing.assert_frame_equal(compacted, df, check_dtype=False, check_categorical=False, rtol=1e-6)
+
+
+def test_coerce_columns_skips_columns_that_are_already_typed():
+    df = pd.DataFrame({"value": [55, 56], "kickoff_time": ["2024-08-17T14:00:00Z", "bad"], "event": ["1", None]})
+
+    df = utils.coerce_columns(df, {"value": "numeric", "kickoff_time": "datetime", "event": "int", "missing": "float"})
+
+    assert df["value"].dtype == "int64"
+    assert df["kickoff_time"].isna().tolist() == [False, True]
+    assert df["event"].dtype == "Int64"
+
+
+def test_upload_batch_skips_files_whose_etag_matches_remote(tmp_path):
+    (tmp_path / "gw_1.csv").write_bytes(b"name,GW\nPlayer1,1\n")
+    (tmp_path / "gw_2.csv").write_bytes(b"name,GW\nPlayer2,2\n")
+    client = MagicMock()
+    client.bucket_exists.return_value = True
+    client.list_objects.return_value = [
+        SimpleNamespace(object_name="backfill/gw_1.csv", etag=utils._local_etag(str(tmp_path / "gw_1.csv"), 5 * 1024 ** 2)),
+    ]
+
+    summaries = utils.upload_batch_to_minio(client, str(tmp_path), "gameweeks", "backfill", part_size=5 * 1024 ** 2)
+
+    assert [(s["object_name"], s["status"]) for s in summaries] == [("backfill/gw_1.csv", "skipped"), ("backfill/gw_2.csv", "uploaded")]
+    client.bucket_exists.assert_called_once_with("gameweeks")
+    assert client.fput_object.call_count == 1
+
+
+def test_local_etag_matches_multipart_format(tmp_path):
+    path = tmp_path / "big.csv"
+    path.write_bytes(b"a" * 10)
+
+    assert utils._local_etag(str(path), 4).endswith("-3")
+    assert utils._local_etag(str(path), 16) == "e09c80c42fda55f9d992e59ca6b3307d"
+
+
+def test_get_minio_client_is_shared_and_grows_pool_for_concurrency(monkeypatch):
+    monkeypatch.setattr(utils, "_minio_clients", {})
+    monkeypatch.setenv("MINIO_MAX_POOL_SIZE", "4")
+
+    first = utils.get_minio_client("localhost:9000", "key", "secret")
+    assert utils.connect_to_minio("localhost:9000", "key", "secret") is first
+    assert utils.get_minio_client("localhost:9000", "key", "secret", max_pool_size=2) is first
+
+    larger = utils.get_minio_client("localhost:9000", "key", "secret", max_pool_size=32)
+    assert larger is not first
+    assert utils.get_minio_client("localhost:9000", "key", "secret") is larger
+
+
+def _mock_pg_connection():
+    copied = {}
+    cursor = MagicMock()
+    cursor.rowcount = -1
+
+    def copy_expert(query, stream):
+        chunks = iter(lambda: stream.read(7), b"")
+        copied["query"], copied["body"] = query, b"".join(chunks).decode()
+
+    cursor.copy_expert.side_effect = copy_expert
+    connection = MagicMock()
+    connection.cursor.return_value.__enter__.return_value = cursor
+    return connection, copied
+
+
+def test_copy_dataframe_to_postgres_streams_mapped_columns_in_chunks():
+    df = pd.DataFrame({
+        "player_name": ["Player1", "Player2", "Player3"],
+        "goals_scored": [1.0, None, 2.0],
+        "extra": ["dropped", "dropped", "dropped"],
+    })
+    connection, copied = _mock_pg_connection()
+
+    row_count = utils.copy_dataframe_to_postgres(
+        connection, df, "stg_gameweeks", {"player_name": "TEXT", "goals_scored": "INTEGER", "xP": "NUMERIC"}, chunk_size=2,
+    )
+
+    assert row_count == 3
+    assert copied["query"] == 'COPY stg_gameweeks ("player_name", "goals_scored", "xP") FROM STDIN WITH (FORMAT csv, NULL \'\')'
+    assert copied["body"] == "Player1,1,\nPlayer2,,\nPlayer3,2,\n"
+    connection.commit.assert_not_called()
+
+
+def test_upsert_dataframe_to_postgres_counts_inserted_updated_and_unchanged():
+    connection, copied = _mock_pg_connection()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = (1, 1)
+    df = pd.DataFrame({"pulse_id": [1, 2, 3], "code": [10, 20, 30], "team_h_score": [1.0, 2.0, None]})
+
+    counts = utils.upsert_dataframe_to_postgres(
+        connection, df, "stg_fixtures", {"pulse_id": "INTEGER", "code": "INTEGER", "team_h_score": "FLOAT"}, ("pulse_id", "code"),
+    )
+
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+    merge_query = cursor.execute.call_args_list[-1].args[0]
+    assert 'ON CONFLICT ("pulse_id", "code") DO UPDATE SET "team_h_score" = EXCLUDED."team_h_score"' in merge_query
+    assert 'WHERE (stg_fixtures."team_h_score") IS DISTINCT FROM (EXCLUDED."team_h_score")' in merge_query
+    assert copied["query"].startswith("COPY pg_temp.stg_fixtures__stage ")
+    assert cursor.execute.call_args_list[0].args[0] == "DROP TABLE IF EXISTS pg_temp.stg_fixtures__stage;"
+
+
+def test_create_natural_key_index_dedupes_and_rebuilds_an_index_that_lets_nulls_repeat():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (False,)
+    cursor.rowcount = 2
+
+    utils.create_natural_key_index(cursor, "stg_fixtures", ("pulse_id", "code", "season"), "fixture_id")
+
+    statements = [call.args[0].strip() for call in cursor.execute.call_args_list]
+    assert statements[1] == "DROP INDEX stg_fixtures_natural_key_idx;"
+    assert 'PARTITION BY "pulse_id", "code", "season" ORDER BY fixture_id DESC' in statements[2]
+    assert statements[3] == 'CREATE UNIQUE INDEX stg_fixtures_natural_key_idx ON stg_fixtures ("pulse_id", "code", "season") NULLS NOT DISTINCT;'
+
+    # an existing NULLS NOT DISTINCT index is kept as is
+    cursor.reset_mock()
+    cursor.fetchone.return_value = (True,)
+    utils.create_natural_key_index(cursor, "stg_fixtures", ("pulse_id", "code", "season"), "fixture_id")
+    assert cursor.execute.call_count == 1
+
+
+def test_swap_in_shadow_table_renames_tables_and_their_relations_in_one_transaction():
+    connection, _ = _mock_pg_connection()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchall.side_effect = [
+        [(16500, '"dbt".fact_player_performance', 'v', " SELECT player_name\n   FROM stg_gameweeks;")],
+        [("INDEX", "stg_gameweeks_pkey"), ("SEQUENCE", "stg_gameweeks_player_performance_id_seq")],
+        [("INDEX", "stg_gameweeks__shadow_natural_key_idx")],
+    ]
+
+    utils.swap_in_shadow_table(connection, "stg_gameweeks", "stg_gameweeks__shadow")
+
+    statements = [call.args[0] for call in cursor.execute.call_args_list if not call.args[0].lstrip().startswith("SELECT")]
+    assert statements == [
+        "SET LOCAL lock_timeout = '5s';",
+        "DROP TABLE IF EXISTS stg_gameweeks__old;",
+        "ALTER TABLE stg_gameweeks RENAME TO stg_gameweeks__old;",
+        'ALTER INDEX "stg_gameweeks_pkey" RENAME TO "stg_gameweeks__old_pkey";',
+        'ALTER SEQUENCE "stg_gameweeks_player_performance_id_seq" RENAME TO "stg_gameweeks__old_player_performance_id_seq";',
+        "ALTER TABLE stg_gameweeks__shadow RENAME TO stg_gameweeks;",
+        'ALTER INDEX "stg_gameweeks__shadow_natural_key_idx" RENAME TO "stg_gameweeks_natural_key_idx";',
+        # the dbt view is re-bound to the swapped in table, leaving __old without dependents
+        'CREATE OR REPLACE VIEW "dbt".fact_player_performance AS  SELECT player_name\n   FROM stg_gameweeks;',
+    ]
+    connection.commit.assert_called_once()
+
+
+def test_swap_in_shadow_table_refuses_a_table_with_a_materialized_view():
+    connection, _ = _mock_pg_connection()
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = [(16500, "fact_player_performance", 'm', " SELECT 1;")]
+
+    with pytest.raises(ValueError, match="materialized view fact_player_performance"):
+        utils.swap_in_shadow_table(connection, "stg_gameweeks", "stg_gameweeks__shadow")
+
+    assert not any("RENAME" in call.args[0] for call in cursor.execute.call_args_list)
+    connection.commit.assert_not_called()
+
+
+def test_postgres_pool_replaces_broken_connections_and_returns_them(monkeypatch):
+    broken, healthy = MagicMock(closed=1), MagicMock(closed=0)
+    healthy.get_transaction_status.return_value = utils.extensions.TRANSACTION_STATUS_IDLE
+    inner_pool = MagicMock()
+    inner_pool.getconn.side_effect = [broken, healthy]
+    monkeypatch.setattr(utils.pg_pool, "ThreadedConnectionPool", MagicMock(return_value=inner_pool))
+
+    pool = utils.PostgresConnectionPool(1, 2, database="fpl")
+    with pool.connection() as connection:
+        assert connection is healthy
+
+    inner_pool.putconn.assert_any_call(broken, close=True)
+    inner_pool.putconn.assert_called_with(healthy, close=False)
+    healthy.commit.assert_called_once()
+
+
+def test_create_table_query_partitions_by_season():
+    query = utils.create_table_query("stg_fixtures", {"code": "INTEGER", "season": "TEXT"}, "fixture_id", partition_column="season")
+
+    assert query == (
+        "CREATE TABLE IF NOT EXISTS stg_fixtures (\n"
+        "    fixture_id SERIAL,\n"
+        '    "code" INTEGER,\n'
+        '    "season" TEXT,\n'
+        '    PRIMARY KEY (fixture_id, "season")\n'
+        ') PARTITION BY LIST ("season");'
+    )
+    assert utils.season_partition_name("stg_fixtures", "2024-25") == "stg_fixtures_p2024_25"
+
+
+def test_create_partitioned_table_migrates_an_unpartitioned_table_and_its_views():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = ('r',)
+    cursor.fetchall.side_effect = [
+        [(16500, '"dbt".fact_player_performance', 'v', " SELECT player_name\n   FROM stg_gameweeks;")],
+        [("INDEX", "stg_gameweeks_pkey")],
+        [("2019-20",), (utils.UNSCHEDULED_SEASON,)],
+    ]
+
+    utils.create_partitioned_table(cursor, "stg_gameweeks", {"player_name": "TEXT", "season": "TEXT"}, "player_performance_id")
+
+    statements = [call.args[0] for call in cursor.execute.call_args_list if not call.args[0].lstrip().startswith("SELECT")]
+    assert statements[:2] == [
+        "ALTER TABLE stg_gameweeks RENAME TO stg_gameweeks__unpartitioned;",
+        'ALTER INDEX "stg_gameweeks_pkey" RENAME TO "stg_gameweeks__unpartitioned_pkey";',
+    ]
+    assert statements[2].endswith(') PARTITION BY LIST ("season");')
+    assert statements[-3].startswith('INSERT INTO stg_gameweeks (player_performance_id, "player_name", "season") SELECT ')
+    # the dbt view followed the rename; it is re-bound to the new table before the legacy table is dropped
+    assert statements[-2:] == [
+        'CREATE OR REPLACE VIEW "dbt".fact_player_performance AS  SELECT player_name\n   FROM stg_gameweeks;',
+        "DROP TABLE stg_gameweeks__unpartitioned;",
+    ]
+    partitions = [call.args[1] for call in cursor.execute.call_args_list if "PARTITION OF stg_gameweeks FOR VALUES" in call.args[0]]
+    assert partitions == [("2019-20",), (utils.UNSCHEDULED_SEASON,)]
+    cursor.connection.commit.assert_called_once()
+
+def test_record_ingestion_run_returns_the_new_run_id():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (7,)
+
+    assert utils.record_ingestion_run(cursor, "stg_gameweeks", 1200) == 7
+    create, insert = cursor.execute.call_args_list
+    assert create.args[0].startswith("CREATE TABLE IF NOT EXISTS ingestion_runs (\n    run_id SERIAL PRIMARY KEY,")
+    assert insert.args == (
+        "INSERT INTO ingestion_runs (table_name, row_count, finished_at) VALUES (%s, %s, now()) RETURNING run_id;",
+        ("stg_gameweeks", 1200),
+    )
@@ -0,0 +1,66 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from src.components import data_ingestion_fixtures, data_ingestion_gameweeks
+from src.components.data_ingestion_gameweeks import RAW_GAMEWEEK_COLUMNS
+from src.components.validation import (
+    FIXTURE_RULES, GAMEWEEK_RULES, DataValidationError, InRange, NotNull, References, Unique, validate,
+)
+from test_data_ingestion_fixtures import _raw_fixtures, _teams
+from test_data_ingestion_gameweeks import _raw_gameweeks
+
+
+def test_transformed_data_passes_the_dataset_rules():
+    raw = pd.read_csv(io.StringIO(_raw_gameweeks(seasons=2, fixtures_per_season=20, players_per_team=2).to_csv(index=False)),
+                      usecols=RAW_GAMEWEEK_COLUMNS.__contains__)
+    gameweeks = data_ingestion_gameweeks.DataIngestion()
+    gameweeks_df = gameweeks._compact(gameweeks._transform(raw))
+    assert validate(gameweeks_df, 'stg_gameweeks', GAMEWEEK_RULES).passed
+
+    teams_df = _teams(2)
+    fixtures = data_ingestion_fixtures.DataIngestion()
+    fixtures_df = fixtures._assign_team_names(fixtures._transform(_raw_fixtures(seasons=2, fixtures_per_season=20)), teams_df)
+    assert validate(fixtures_df, 'stg_fixtures', FIXTURE_RULES, references={'teams': teams_df}).passed
+
+
+def test_report_counts_every_broken_rule():
+    df = pd.DataFrame({
+        'code': [1, 1, 3, 4],
+        'season': ['2023-24', '2023-24', '2023-24', None],
+        'team_h': pd.array([1, 2, 99, 99], dtype='Int64'),
+        'team_h_difficulty': [1, 5, 6, None],
+    })
+    teams = pd.DataFrame({'id': [1, 2], 'season': ['2023-24', '2023-24']})
+    rules = [
+        Unique(('code',)),
+        NotNull(('season',)),
+        InRange('team_h_difficulty', 1, 5),
+        References('team_h', reference='teams', reference_column='id', by=('season',)),
+    ]
+
+    report = validate(df, 'stg_fixtures', rules, references={'teams': teams})
+
+    # the row without a season can't be matched to a team, so only the first 99 is a broken reference
+    assert [result.failed_rows for result in report.results] == [2, 1, 1, 1]
+    assert report.results[3].sample[0]['code'] == 3
+    with pytest.raises(DataValidationError, match="failed 4 of 4 validation rules"):
+        report.raise_for_failures()
+
+
+def test_validate_data_fails_before_the_load():
+    teams_df = _teams(1)
+    fixtures = data_ingestion_fixtures.DataIngestion()
+    fixtures_df = fixtures._assign_team_names(fixtures._transform(_raw_fixtures(seasons=1, fixtures_per_season=10)), teams_df)
+    fixtures_df.loc[0, 'team_a_difficulty'] = 9
+
+    with pytest.raises(DataValidationError) as excinfo:
+        data_ingestion_fixtures.DataIngestion()._validate_data(fixtures_df, teams_df)
+    assert [result.rule for result in excinfo.value.report.failures] == ['in_range(team_a_difficulty, 1, 5)']
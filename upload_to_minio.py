@@ -1,4 +1,5 @@
-from src.utils import upload_to_minio, connect_to_minio
+from src.utils import upload_to_minio, upload_csv_as_parquet, upload_batch_to_minio, connect_to_minio
+from src.components.schemas import GAMEWEEK_COLUMN_TYPES
 from dotenv import load_dotenv
 import os
 
@@ -7,6 +8,15 @@ load_dotenv()
 MINIO_ENDPOINT = os.getenv('MINIO_ENDPOINT')
 MINIO_ACCESS_KEY = os.getenv('MINIO_ACCESS_KEY')
 MINIO_SECRET = os.getenv('MINIO_SECRET_KEY')
+# 'parquet' converts the CSV to typed Parquet partitioned by season before uploading
+MINIO_UPLOAD_FORMAT = os.getenv('MINIO_UPLOAD_FORMAT', 'csv')
+# a directory or glob (e.g. 'backfill/*.csv') uploads a whole backfill concurrently
+MINIO_UPLOAD_BATCH = os.getenv('MINIO_UPLOAD_BATCH')
 
 client = connect_to_minio(endpoint=MINIO_ENDPOINT, access_key=MINIO_ACCESS_KEY, secret_key=MINIO_SECRET)
-upload_to_minio(client=client, file_path="merged_gw_24_25.csv", destination_bucket="gameweeks")
\ No newline at end of file
+if MINIO_UPLOAD_BATCH:
+    upload_batch_to_minio(client=client, paths=MINIO_UPLOAD_BATCH, destination_bucket="gameweeks")
+elif MINIO_UPLOAD_FORMAT == 'parquet':
+    upload_csv_as_parquet(client=client, file_path="merged_gw_24_25.csv", destination_bucket="gameweeks", column_types=GAMEWEEK_COLUMN_TYPES)
+else:
+    upload_to_minio(client=client, file_path="merged_gw_24_25.csv", destination_bucket="gameweeks")